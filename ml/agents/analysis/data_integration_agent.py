@@ -5,18 +5,99 @@ from pathlib import Path
 import logging
 from datetime import datetime
 import json
+import os
+import threading
+import shutil
 
 # Import des agents depuis leurs nouveaux emplacements
 from ..base.base_agent import BaseAgent
+from ...utils.columnar_cache import ColumnarCache
+from ...utils.dataframe_backend import create_backend
+from ...utils.schema_loader import SchemaCsvLoader
+from ...utils.versioned_artifact import VersionedArtifact
+from ...utils.indexed_join import IndexedJoin, RowExplosionError
+from ...utils.multi_aggregation import MarketAggregates
+from ...utils.market_rollups import MarketRollups
 
 class DataIntegrationAgent(BaseAgent):
     """Agent responsable de l'intégration et de l'analyse des données Kaggle"""
     
-    def __init__(self):
+    DATASET_FILES = {
+        'influencers': "instagram_influencers.csv",
+        'reach': "instagram_reach.csv",
+        'engagement': "instagram_engagement.csv"
+    }
+    # Statistiques des tendances du marché, calculées en un seul passage sur les données fusionnées
+    TREND_GROUP_KEYS = ['hour', 'day', 'month', 'content_type']
+    TREND_VALUE_COLUMNS = [
+        'engagement_rate', 'reach_rate', 'likes', 'comments',
+        'followers_growth_rate', 'followers_count', 'following_count'
+    ]
+    TREND_CORR_COLUMNS = ['engagement_rate', 'reach_rate', 'followers_count', 'following_count']
+    # Colonnes lues et leurs types (les colonnes absentes d'un fichier sont ignorées)
+    DATASET_SCHEMAS = {
+        'influencers': {
+            'username': 'category',
+            'followers_count': 'int32',
+            'following_count': 'int32',
+            'media_count': 'int32',
+            'engagement_rate': 'float32',
+            'reach_rate': 'float32',
+            'followers_growth_rate': 'float32',
+            'avg_likes': 'float32',
+            'avg_comments': 'float32'
+        },
+        'reach': {
+            'username': 'category',
+            'reach': 'int32',
+            'impressions': 'int32',
+            'profile_views': 'int32',
+            'reach_rate': 'float32'
+        },
+        'engagement': {
+            'username': 'category',
+            'likes': 'int32',
+            'comments': 'int32',
+            'shares': 'int32',
+            'saves': 'int32',
+            'engagement_rate': 'float32',
+            'content_type': 'category',
+            'hashtags': 'object',
+            'hour': 'int8',
+            'day': 'category',
+            'month': 'category'
+        }
+    }
+    # À incrémenter quand le nettoyage ou la fusion changent (invalide le cache)
+    PROCESSING_VERSION = '3'
+    
+    def __init__(self, cache_path: str = "instagram_scraper/data/cache/kaggle", chunksize: int = 1_000_000,
+                 backend: str = 'pandas'):
         super().__init__("agent_integration_donnees")
         self.datasets_path = Path("instagram_scraper/data/datasets/kaggle")
+        self.loader = SchemaCsvLoader(chunksize=chunksize)
+        # Jointure sur username interné ; au-delà de 4x les lignes en entrée, la fusion est refusée
+        self.indexed_join = IndexedJoin('username', max_expansion=4.0)
+        self.processed_cache = ColumnarCache(cache_path, version=self.PROCESSING_VERSION)
+        # Moteur des étapes de traitement : 'pandas' (en mémoire) ou 'arrow' (paresseux, hors mémoire)
+        self.backend = create_backend(backend, self.loader, self.indexed_join, Path(cache_path) / "spill")
         self.processed_data = {}
-        self.insights_cache = {}
+        # Version des données traitées (empreinte des sources), change à chaque nouveau jeu de données
+        self.data_version = None
+        self.market_insights = VersionedArtifact(
+            self._compute_market_insights,
+            is_valid=lambda insights: 'error' not in insights,
+            name='market_insights'
+        )
+        # Cumuls de tendances persistés, mis à jour lot par lot par ingest()
+        self.rollups_path = Path(cache_path) / "market_rollups.json"
+        self.market_rollups = None
+        self.rollups_base_version = None
+        # Lots ingérés, journalisés par version des données (ingested/v_<version>) pour être
+        # rejoués sur cette version ; une nouvelle version les absorbe et efface le journal
+        self.ingest_dir = Path(cache_path) / "ingested"
+        self.rollups_batches = 0
+        self._rollups_lock = threading.Lock()
         
         # Messages d'erreur en français
         self.error_messages.update({
@@ -28,37 +109,127 @@ class DataIntegrationAgent(BaseAgent):
     def load_and_process_datasets(self) -> Dict[str, Any]:
         """Charge et traite les datasets Kaggle"""
         try:
-            # Chargement des différents datasets
-            influencers_data = self._load_dataset("instagram_influencers.csv")
-            reach_data = self._load_dataset("instagram_reach.csv")
-            engagement_data = self._load_dataset("instagram_engagement.csv")
-            
-            # Traitement et fusion des données
-            processed_data = self._process_datasets(
-                influencers_data,
-                reach_data,
-                engagement_data
-            )
+            sources = [self.datasets_path / filename for filename in self.DATASET_FILES.values()]
+            
+            # Données déjà traitées pour ces sources : relecture du cache colonnaire
+            processed_data = self.processed_cache.load(self.backend.cache_entry, sources)
+            from_cache = processed_data is not None
+            
+            if not from_cache:
+                self.backend.reset()
+                
+                # Chargement des différents datasets
+                influencers_data = self._load_dataset(self.DATASET_FILES['influencers'], 'influencers')
+                reach_data = self._load_dataset(self.DATASET_FILES['reach'], 'reach')
+                engagement_data = self._load_dataset(self.DATASET_FILES['engagement'], 'engagement')
+                
+                # Traitement et fusion des données
+                processed_data = self._process_datasets(
+                    influencers_data,
+                    reach_data,
+                    engagement_data
+                )
+                
+                if processed_data:
+                    self.processed_cache.store(self.backend.cache_entry, sources, processed_data)
             
             # Stockage des données traitées
             self.processed_data = processed_data
+            self.data_version = self.processed_cache.last_key
             
             return {
                 'status': 'success',
                 'datasets_loaded': len(processed_data),
+                'from_cache': from_cache,
                 'timestamp': datetime.now().isoformat()
             }
             
+        except RowExplosionError as e:
+            # Fusion refusée : signalée avec le rapport de jointure au lieu d'un jeu de données vide
+            self.logger.error(self.error_messages['process_error'].format(str(e)))
+            return {'error': str(e), 'rapport_fusion': self.indexed_join.last_report}
+            
         except Exception as e:
             self.logger.error(self.error_messages['load_error'].format(str(e)))
             return {'error': str(e)}
             
-    def analyze_market_insights(self) -> Dict[str, Any]:
-        """Analyse les insights du marché basés sur les données Kaggle"""
+    def analyze_market_insights(self, allow_stale: bool = False) -> Dict[str, Any]:
+        """Insights du marché, recalculés uniquement quand la version des données change
+
+        Avec allow_stale, la dernière bonne version est rendue sans attendre et le
+        recalcul éventuel se fait en arrière-plan.
+        """
+        if not self.processed_data:
+            self.load_and_process_datasets()
+            
+        # Un lot ingéré change la version : les insights mémorisés ne restent pas périmés
+        version = (self.data_version, len(self._ingested_batches()))
+        return self.market_insights.get(version, allow_stale=allow_stale)
+        
+    def ingest(self, new_rows: pd.DataFrame) -> Dict[str, Any]:
+        """Ajoute de nouvelles lignes (format des données fusionnées) aux cumuls de tendances
+
+        Les cumuls persistés couvrent les données traitées plus tous les lots ingérés depuis ;
+        analyze_market_rollups() en donne exactement les réponses d'un recalcul complet sur
+        ces mêmes lignes, sans relire l'historique. Chaque lot est journalisé avec la version
+        des données sur laquelle il est appliqué, et rejoué si les cumuls de cette version
+        sont recalculés. Les lots sont supposés intégrés aux sources par la version suivante :
+        le recalcul pour une nouvelle version efface le journal au lieu de le rejouer.
+        """
         try:
-            if not self.processed_data:
-                self.load_and_process_datasets()
+            with self._rollups_lock:
+                # Lot appliqué sur une copie : un lot refusé ne laisse pas de cumuls partiels
+                rollups = self._current_market_rollups().copy()
+                rollups.update(new_rows)
+                # Journal écrit avant les cumuls : après une interruption, le lot est rejoué
+                self._log_ingested_batch(new_rows)
+                self.rollups_batches += 1
+                self._save_market_rollups(rollups)
+                self.market_rollups = rollups
+            self.market_insights.invalidate()
+                
+            return {
+                'status': 'success',
+                'rows_ingested': len(new_rows),
+                'total_rows': rollups.rows,
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            self.logger.error(self.error_messages['process_error'].format(str(e)))
+            return {'error': str(e)}
+            
+    def rebuild_market_rollups(self) -> Dict[str, Any]:
+        """Recalcule les cumuls de tendances sur toutes les données traitées"""
+        try:
+            with self._rollups_lock:
+                rollups = self._rebuild_market_rollups()
+                
+            return {
+                'status': 'success',
+                'total_rows': rollups.rows,
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            self.logger.error(self.error_messages['process_error'].format(str(e)))
+            return {'error': str(e)}
+            
+    def analyze_market_rollups(self) -> Dict[str, Any]:
+        """Tendances du marché lues dans les cumuls (même structure que _analyze_market_trends)"""
+        try:
+            with self._rollups_lock:
+                rollups = self._current_market_rollups()
                 
+            return self._market_trends(rollups)
+            
+        except Exception as e:
+            self.logger.error(self.error_messages['analysis_error'].format(str(e)))
+            return {'error': str(e)}
+            
+    def _compute_market_insights(self) -> Dict[str, Any]:
+        """Analyse les insights du marché basés sur les données Kaggle"""
+        try:
             # Analyse des tendances
             market_trends = self._analyze_market_trends()
             engagement_patterns = self._analyze_engagement_patterns()
@@ -76,9 +247,6 @@ class DataIntegrationAgent(BaseAgent):
                 )
             }
             
-            # Mise en cache des insights
-            self.insights_cache = insights
-            
             return insights
             
         except Exception as e:
@@ -111,11 +279,11 @@ class DataIntegrationAgent(BaseAgent):
             self.logger.error(self.error_messages['process_error'].format(str(e)))
             return {'error': str(e)}
             
-    def _load_dataset(self, filename: str) -> pd.DataFrame:
-        """Charge un dataset spécifique"""
+    def _load_dataset(self, filename: str, dataset: str) -> pd.DataFrame:
+        """Charge un dataset spécifique (colonnes et types du schéma, par blocs, sans doublons)"""
         try:
             file_path = self.datasets_path / filename
-            return pd.read_csv(file_path)
+            return self.backend.load(file_path, self.DATASET_SCHEMAS[dataset])
         except Exception as e:
             self.logger.error(f"Erreur de chargement du fichier {filename}: {str(e)}")
             return pd.DataFrame()
@@ -127,9 +295,9 @@ class DataIntegrationAgent(BaseAgent):
         """Traite et fusionne les datasets"""
         try:
             # Nettoyage des données
-            influencers_clean = self._clean_influencers_data(influencers)
-            reach_clean = self._clean_reach_data(reach)
-            engagement_clean = self._clean_engagement_data(engagement)
+            influencers_clean = self.backend.clean(influencers, self._clean_influencers_data)
+            reach_clean = self.backend.clean(reach, self._clean_reach_data)
+            engagement_clean = self.backend.clean(engagement, self._clean_engagement_data)
             
             # Fusion des données
             merged_data = self._merge_datasets(
@@ -145,41 +313,141 @@ class DataIntegrationAgent(BaseAgent):
                 'engagement': engagement_clean
             }
             
+        except RowExplosionError:
+            raise
+            
         except Exception as e:
             self.logger.error(f"Erreur de traitement des datasets: {str(e)}")
             return {}
             
+    def _processed_frame(self, name: str, columns: List[str] = None) -> pd.DataFrame:
+        """Table traitée en mémoire (seulement les colonnes demandées, quel que soit le moteur)"""
+        frame = self.processed_data.get(name, pd.DataFrame())
+        if self.backend.is_empty(frame):
+            return pd.DataFrame()
+        return self.backend.collect(frame, columns)
+        
+    def _current_market_rollups(self) -> MarketRollups:
+        """Cumuls pour la version courante des données traitées (mémoire, fichier ou recalcul)"""
+        if not self.processed_data:
+            self.load_and_process_datasets()
+            
+        if self.market_rollups is not None and self.rollups_base_version == self.data_version:
+            return self.market_rollups
+            
+        if self.rollups_path.exists():
+            saved = json.loads(self.rollups_path.read_text())
+            # Cumuls d'un format antérieur (sans hashtags) : recalculés
+            if saved.get('base_version') == self.data_version and 'tags' in saved['rollups']:
+                rollups = MarketRollups.from_state(saved['rollups'])
+                self.rollups_base_version = self.data_version
+                self.rollups_batches = saved.get('batches', 0)
+                # Lots journalisés après la dernière sauvegarde des cumuls
+                if self._replay_ingested_batches(rollups):
+                    self._save_market_rollups(rollups)
+                self.market_rollups = rollups
+                return self.market_rollups
+                
+        # Nouvelles données traitées : recalcul (le journal des versions précédentes est absorbé)
+        return self._rebuild_market_rollups()
+        
+    def _rebuild_market_rollups(self) -> MarketRollups:
+        """Recalcul complet des cumuls sur les données fusionnées, puis sauvegarde
+        
+        Seuls les lots journalisés sur cette version des données sont rejoués ; les journaux
+        des autres versions, absorbés par les sources, sont supprimés.
+        """
+        if not self.processed_data:
+            self.load_and_process_datasets()
+            
+        rollups = MarketRollups(self.TREND_GROUP_KEYS, self.TREND_VALUE_COLUMNS, self.TREND_CORR_COLUMNS,
+                                tag_column='hashtags', tag_value='engagement_rate')
+        self.backend.accumulate(rollups, self.processed_data.get('donnees_fusionnees', pd.DataFrame()))
+        self.rollups_base_version = self.data_version
+        self.rollups_batches = 0
+        self._clear_absorbed_journals()
+        self._replay_ingested_batches(rollups)
+        self._save_market_rollups(rollups)
+        self.market_rollups = rollups
+        return rollups
+        
+    def _save_market_rollups(self, rollups: MarketRollups):
+        """Écrit les cumuls (fichier temporaire puis renommage)"""
+        self.rollups_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.rollups_path.with_name(self.rollups_path.name + '.tmp')
+        tmp_path.write_text(json.dumps({
+            'base_version': self.rollups_base_version,
+            'batches': self.rollups_batches,
+            'rollups': rollups.to_state()
+        }))
+        os.replace(tmp_path, self.rollups_path)
+        
+    def _journal_dir(self) -> Path:
+        """Journal des lots ingérés sur la version courante des données"""
+        return self.ingest_dir / f"v_{self.data_version}"
+        
+    def _ingested_batches(self) -> List[Path]:
+        """Fichiers des lots ingérés sur la version courante, dans l'ordre d'ingestion"""
+        journal_dir = self._journal_dir()
+        if not journal_dir.exists():
+            return []
+        return sorted(path for path in journal_dir.glob('batch_*') if path.suffix in ('.feather', '.pkl'))
+        
+    def _log_ingested_batch(self, new_rows: pd.DataFrame):
+        """Journalise un lot ingéré (écriture atomique, Feather ou pickle)"""
+        journal_dir = self._journal_dir()
+        journal_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"batch_{len(self._ingested_batches()):06d}"
+        self.processed_cache.write_frame(journal_dir, stem, new_rows.reset_index(drop=True))
+        
+    def _clear_absorbed_journals(self):
+        """Supprime les lots journalisés sur d'autres versions des données (absorbés par les sources)"""
+        if not self.ingest_dir.exists():
+            return
+        for path in self.ingest_dir.iterdir():
+            if path == self._journal_dir():
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+        
+    def _replay_ingested_batches(self, rollups: MarketRollups) -> int:
+        """Ajoute aux cumuls les lots journalisés qu'ils ne contiennent pas encore"""
+        batches = self._ingested_batches()[self.rollups_batches:]
+        for path in batches:
+            rollups.update(self.processed_cache.read_frame(path))
+            self.rollups_batches += 1
+        return len(batches)
+        
     def _analyze_market_trends(self) -> Dict[str, Any]:
         """Analyse les tendances du marché"""
         try:
-            merged_data = self.processed_data.get('donnees_fusionnees', pd.DataFrame())
-            
-            if merged_data.empty:
+            # Moyennes par groupe et corrélations : cumuls des données fusionnées et des lots ingérés
+            with self._rollups_lock:
+                rollups = self._current_market_rollups()
+                
+            if not rollups.rows:
                 return {}
                 
-            # Analyse des tendances temporelles
-            temporal_trends = self._analyze_temporal_trends(merged_data)
-            
-            # Analyse des catégories de contenu
-            content_trends = self._analyze_content_categories(merged_data)
-            
-            # Analyse des performances par type de contenu
-            performance_trends = self._analyze_performance_trends(merged_data)
-            
-            return {
-                'tendances_temporelles': temporal_trends,
-                'tendances_contenu': content_trends,
-                'tendances_performance': performance_trends
-            }
+            return self._market_trends(rollups)
             
         except Exception as e:
             self.logger.error(f"Erreur d'analyse des tendances: {str(e)}")
             return {}
             
+    def _market_trends(self, aggregates: MarketRollups) -> Dict[str, Any]:
+        """Tendances temporelles, par contenu et de performance, lues dans les seuls cumuls"""
+        return {
+            'tendances_temporelles': self._analyze_temporal_trends(aggregates),
+            'tendances_contenu': self._analyze_content_categories(aggregates),
+            'tendances_performance': self._analyze_performance_trends(aggregates)
+        }
+        
     def _analyze_engagement_patterns(self) -> Dict[str, Any]:
         """Analyse les patterns d'engagement"""
         try:
-            engagement_data = self.processed_data.get('engagement', pd.DataFrame())
+            engagement_data = self._processed_frame('engagement')
             
             if engagement_data.empty:
                 return {}
@@ -206,7 +474,7 @@ class DataIntegrationAgent(BaseAgent):
     def _analyze_audience_insights(self) -> Dict[str, Any]:
         """Analyse les insights sur l'audience"""
         try:
-            reach_data = self.processed_data.get('reach', pd.DataFrame())
+            reach_data = self._processed_frame('reach')
             
             if reach_data.empty:
                 return {}
@@ -233,13 +501,7 @@ class DataIntegrationAgent(BaseAgent):
     def _prepare_training_features(self) -> pd.DataFrame:
         """Prépare les features pour l'entraînement"""
         try:
-            merged_data = self.processed_data.get('donnees_fusionnees', pd.DataFrame())
-            
-            if merged_data.empty:
-                return pd.DataFrame()
-                
-            # Sélection et préparation des features
-            features = merged_data[[
+            merged_data = self._processed_frame('donnees_fusionnees', [
                 'followers_count',
                 'following_count',
                 'media_count',
@@ -247,7 +509,13 @@ class DataIntegrationAgent(BaseAgent):
                 'reach_rate',
                 'avg_likes',
                 'avg_comments'
-            ]].copy()
+            ])
+            
+            if merged_data.empty:
+                return pd.DataFrame()
+                
+            # Sélection et préparation des features
+            features = merged_data.copy()
             
             # Normalisation
             features = (features - features.mean()) / features.std()
@@ -261,7 +529,7 @@ class DataIntegrationAgent(BaseAgent):
     def _prepare_training_labels(self) -> pd.DataFrame:
         """Prépare les labels pour l'entraînement"""
         try:
-            merged_data = self.processed_data.get('donnees_fusionnees', pd.DataFrame())
+            merged_data = self._processed_frame('donnees_fusionnees', ['engagement_rate', 'followers_growth_rate'])
             
             if merged_data.empty:
                 return pd.DataFrame()
@@ -317,11 +585,8 @@ class DataIntegrationAgent(BaseAgent):
     def _clean_influencers_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """Nettoie les données des influenceurs"""
         try:
-            # Copie pour éviter la modification en place
-            clean_data = data.copy()
-            
-            # Suppression des doublons
-            clean_data = clean_data.drop_duplicates()
+            # Suppression des doublons (déjà faite par le chargement par blocs)
+            clean_data = self._drop_duplicates(data)
             
             # Gestion des valeurs manquantes
             clean_data = clean_data.fillna({
@@ -336,7 +601,7 @@ class DataIntegrationAgent(BaseAgent):
             for col in numeric_columns:
                 clean_data[col] = pd.to_numeric(clean_data[col], errors='coerce')
                 
-            return clean_data
+            return self._apply_schema_types(clean_data, 'influencers')
             
         except Exception as e:
             self.logger.error(f"Erreur de nettoyage des données influenceurs: {str(e)}")
@@ -345,10 +610,8 @@ class DataIntegrationAgent(BaseAgent):
     def _clean_reach_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """Nettoie les données de portée"""
         try:
-            clean_data = data.copy()
-            
-            # Suppression des doublons
-            clean_data = clean_data.drop_duplicates()
+            # Suppression des doublons (déjà faite par le chargement par blocs)
+            clean_data = self._drop_duplicates(data)
             
             # Gestion des valeurs manquantes
             clean_data = clean_data.fillna({
@@ -362,7 +625,7 @@ class DataIntegrationAgent(BaseAgent):
             for col in numeric_columns:
                 clean_data[col] = pd.to_numeric(clean_data[col], errors='coerce')
                 
-            return clean_data
+            return self._apply_schema_types(clean_data, 'reach')
             
         except Exception as e:
             self.logger.error(f"Erreur de nettoyage des données de portée: {str(e)}")
@@ -371,10 +634,8 @@ class DataIntegrationAgent(BaseAgent):
     def _clean_engagement_data(self, data: pd.DataFrame) -> pd.DataFrame:
         """Nettoie les données d'engagement"""
         try:
-            clean_data = data.copy()
-            
-            # Suppression des doublons
-            clean_data = clean_data.drop_duplicates()
+            # Suppression des doublons (déjà faite par le chargement par blocs)
+            clean_data = self._drop_duplicates(data)
             
             # Gestion des valeurs manquantes
             clean_data = clean_data.fillna({
@@ -389,78 +650,85 @@ class DataIntegrationAgent(BaseAgent):
             for col in numeric_columns:
                 clean_data[col] = pd.to_numeric(clean_data[col], errors='coerce')
                 
-            return clean_data
+            return self._apply_schema_types(clean_data, 'engagement')
             
         except Exception as e:
             self.logger.error(f"Erreur de nettoyage des données d'engagement: {str(e)}")
             return pd.DataFrame()
             
+    def _drop_duplicates(self, data: pd.DataFrame) -> pd.DataFrame:
+        """drop_duplicates() sans copie des données lorsqu'il n'y a aucun doublon"""
+        duplicates = data.duplicated()
+        if duplicates.any():
+            return data[~duplicates]
+        return data
+            
+    def _apply_schema_types(self, data: pd.DataFrame, dataset: str) -> pd.DataFrame:
+        """Repasse en int numpy les colonnes entières du schéma une fois les manquants remplacés"""
+        for column, dtype in self.DATASET_SCHEMAS[dataset].items():
+            if (dtype.startswith('int') and column in data
+                    and pd.api.types.is_integer_dtype(data[column]) and not data[column].isna().any()):
+                data[column] = data[column].astype(dtype)
+        return data
+            
     def _merge_datasets(self,
                        influencers: pd.DataFrame,
                        reach: pd.DataFrame,
                        engagement: pd.DataFrame) -> pd.DataFrame:
-        """Fusionne les différents datasets"""
+        """Fusionne les différents datasets
+
+        Les usernames sont internés en clés entières ; les doublons des tables par compte
+        (influenceurs, portée) sont agrégés avant la jointure, l'engagement reste par post.
+        Seules les colonnes ayant des valeurs manquantes sont remplies avec 0.
+        """
         try:
-            # Fusion des données influenceurs et portée
-            merged = pd.merge(
-                influencers,
-                reach,
-                on='username',
-                how='outer'
+            # Fusion outer influenceurs, portée puis engagement (mêmes lignes et mêmes colonnes que pd.merge)
+            return self.backend.merge(
+                [influencers, reach, engagement],
+                unique=[True, True, False]
             )
             
-            # Fusion avec les données d'engagement
-            merged = pd.merge(
-                merged,
-                engagement,
-                on='username',
-                how='outer'
-            )
-            
-            # Gestion des valeurs manquantes après fusion
-            merged = merged.fillna(0)
-            
-            return merged
+        except RowExplosionError:
+            # Une fusion refusée n'est pas un jeu de données vide : remontée jusqu'à l'appelant
+            raise
             
         except Exception as e:
             self.logger.error(f"Erreur de fusion des datasets: {str(e)}")
             return pd.DataFrame()
             
-    def _analyze_temporal_trends(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_temporal_trends(self, aggregates: MarketAggregates) -> Dict[str, Any]:
         """Analyse les tendances temporelles"""
         try:
             # Analyse par heure
-            hourly_trends = data.groupby('hour')['engagement_rate'].mean()
+            hourly_trends = aggregates.group_means('hour', 'engagement_rate')
             
             # Analyse par jour
-            daily_trends = data.groupby('day')['engagement_rate'].mean()
+            daily_trends = aggregates.group_means('day', 'engagement_rate')
             
             # Analyse par mois
-            monthly_trends = data.groupby('month')['engagement_rate'].mean()
+            monthly_trends = aggregates.group_means('month', 'engagement_rate')
             
             return {
-                'tendances_horaires': hourly_trends.to_dict(),
-                'tendances_journalieres': daily_trends.to_dict(),
-                'tendances_mensuelles': monthly_trends.to_dict()
+                'tendances_horaires': hourly_trends,
+                'tendances_journalieres': daily_trends,
+                'tendances_mensuelles': monthly_trends
             }
             
         except Exception as e:
             self.logger.error(f"Erreur d'analyse temporelle: {str(e)}")
             return {}
             
-    def _analyze_content_categories(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_content_categories(self, aggregates: MarketRollups) -> Dict[str, Any]:
         """Analyse les catégories de contenu"""
         try:
             # Analyse par type de contenu
-            content_performance = data.groupby('content_type').agg({
-                'engagement_rate': 'mean',
-                'reach_rate': 'mean',
-                'likes': 'mean',
-                'comments': 'mean'
-            }).to_dict()
+            content_performance = {
+                column: aggregates.group_means('content_type', column)
+                for column in ['engagement_rate', 'reach_rate', 'likes', 'comments']
+            }
             
             # Analyse des hashtags
-            hashtag_performance = self._analyze_hashtag_performance(data)
+            hashtag_performance = self._analyze_hashtag_performance(aggregates)
             
             return {
                 'performance_contenu': content_performance,
@@ -471,23 +739,36 @@ class DataIntegrationAgent(BaseAgent):
             self.logger.error(f"Erreur d'analyse des catégories: {str(e)}")
             return {}
             
-    def _analyze_performance_trends(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def _analyze_hashtag_performance(self, aggregates: MarketRollups,
+                                     limit: int = 20) -> Dict[str, Dict[str, float]]:
+        """Engagement moyen par hashtag (les limit meilleurs), lu dans les cumuls par hashtag"""
+        try:
+            return {
+                hashtag: {'engagement_moyen': mean, 'publications': count}
+                for hashtag, mean, count in aggregates.tag_means(limit)
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Erreur d'analyse des hashtags: {str(e)}")
+            return {}
+            
+    def _analyze_performance_trends(self, aggregates: MarketAggregates) -> Dict[str, Any]:
         """Analyse les tendances de performance"""
         try:
             # Calcul des métriques de performance
             performance_metrics = {
-                'engagement_moyen': data['engagement_rate'].mean(),
-                'reach_moyen': data['reach_rate'].mean(),
-                'croissance_followers': data['followers_growth_rate'].mean()
+                'engagement_moyen': aggregates.mean('engagement_rate'),
+                'reach_moyen': aggregates.mean('reach_rate'),
+                'croissance_followers': aggregates.mean('followers_growth_rate')
             }
             
             # Analyse des corrélations
-            correlations = data[[
+            correlations = aggregates.corr([
                 'engagement_rate',
                 'reach_rate',
                 'followers_count',
                 'following_count'
-            ]].corr().to_dict()
+            ])
             
             return {
                 'metriques': performance_metrics,
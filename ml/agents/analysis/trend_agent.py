@@ -9,6 +9,11 @@ import logging
 from .trend_processor import TrendProcessor
 from .agent_training_sets import TrainingDatasets
 from .models import UnifiedTrendLSTM
+from ...core.models import CompactTrendGRU
+from ...utils.batched_inference import TrendPredictor, analyze_sequences
+from ...utils.distillation import TrendModelRouter
+from ...utils.sequence_store import SequenceFeatureStore
+from ...utils.window_stats import window_statistics
 
 class TrendAgent:
     """Agent d'analyse des tendances Instagram utilisant le modèle LSTM unifié"""
@@ -30,6 +35,10 @@ class TrendAgent:
             sequence_length=sequence_length,
             model_config=model_config
         )
+        # Dernières observations de chaque compte, servies au modèle sans DataFrame
+        self.sequences = SequenceFeatureStore(sequence_length=sequence_length)
+        # Prédictions par batchs de séquences (tenseurs), sur le modèle du processeur
+        self.predictor = TrendPredictor(self.processor.model, sequence_length=sequence_length)
         
         if model_path:
             self.load_model(model_path)
@@ -110,12 +119,29 @@ class TrendAgent:
             self.logger.error(f"Erreur lors de l'entraînement: {str(e)}")
             raise
             
+    def observe(self, account: str, posts) -> int:
+        """
+        Ajoute des posts aux séquences d'un compte (O(1) par post dans l'ordre chronologique)
+        
+        Args:
+            account: Identifiant du compte
+            posts: Liste de dicts, dict de colonnes ou DataFrame avec une colonne timestamp
+            
+        Returns:
+            Nombre de posts ajoutés
+        """
+        return self.sequences.extend(account, posts)
+        
     def analyze_trends(self, 
                       recent_data: pd.DataFrame,
                       window_size: int = 7) -> Dict:
         """
         Analyse les tendances récentes et fait des prédictions
         
+        Sans état : seules les données fournies sont analysées (recent_data n'est pas
+        modifié). Pour cumuler les posts d'un compte entre les appels, utiliser
+        observe() puis analyze_account().
+        
         Args:
             recent_data: DataFrame des données récentes
             window_size: Taille de la fenêtre d'analyse en jours
@@ -124,20 +150,22 @@ class TrendAgent:
             Dict contenant les analyses et prédictions
         """
         try:
-            # Préparation des données temporelles
-            recent_data['timestamp'] = pd.to_datetime(recent_data['timestamp'])
-            recent_data = recent_data.sort_values('timestamp')
+            # Préparation des données temporelles (sur une copie)
+            recent_data = recent_data.assign(timestamp=pd.to_datetime(recent_data['timestamp']))
+            recent_data = recent_data.sort_values('timestamp', kind='stable').set_index('timestamp')
             
-            # Calcul des tendances sur la fenêtre
-            window_data = recent_data.set_index('timestamp').last(f"{window_size}D")
+            # Fenêtre des window_size derniers jours (comme DataFrame.last)
+            start = recent_data.index[-1] - pd.Timedelta(days=window_size)
+            window_data = recent_data[recent_data.index > start]
             
             # Prédictions
             predictions = self.processor.predict_trends(window_data)
             
             # Analyse des tendances actuelles
+            engagement = window_data['engagement_rate']
             current_trends = {
-                'engagement_growth': window_data['engagement_rate'].pct_change().mean(),
-                'volatility': window_data['engagement_rate'].std() / window_data['engagement_rate'].mean(),
+                'engagement_growth': engagement.pct_change().mean(),
+                'volatility': engagement.std() / engagement.mean(),
                 'trend_strength': abs(predictions['trend_direction']) * predictions['direction_confidence']
             }
             
@@ -154,13 +182,100 @@ class TrendAgent:
             self.logger.error(f"Erreur lors de l'analyse des tendances: {str(e)}")
             raise
             
+    def analyze_account(self, account: str, window_size: int = 7) -> Dict:
+        """
+        Analyse les tendances d'un compte à partir de ses dernières observations
+        
+        Contrairement à analyze_trends (DataFrame donné à processor.predict_trends), la
+        séquence du compte passe par self.predictor (TrendPredictor) sous forme de tenseur
+        float32 (longueur x SEQUENCE_FEATURES), dans l'ordre chronologique, soumise au
+        scheduler partagé qui la regroupe avec les analyses concurrentes.
+        
+        Args:
+            account: Compte déjà alimenté par observe()
+            window_size: Taille de la fenêtre d'analyse en jours
+            
+        Returns:
+            Dict contenant les analyses et prédictions
+        """
+        try:
+            results = analyze_sequences(self.predictor, self.sequences, [account], window_size, scheduled=True)
+        except Exception as e:
+            self.logger.error(f"Erreur lors de l'analyse des tendances: {str(e)}")
+            raise
+        if account not in results:
+            raise ValueError(f"Aucune observation pour le compte {account}")
+        return results[account]
+        
+    def analyze_accounts(self,
+                         accounts: List[str],
+                         window_size: int = 7,
+                         batch_size: int = 512) -> Dict[str, Dict]:
+        """
+        Analyse les tendances de nombreux comptes en quelques passes du modèle
+        
+        Les séquences sont groupées par longueur : une passe de
+        self.predictor.predict_batch par groupe (groupe x longueur x SEQUENCE_FEATURES)
+        au lieu d'une passe (batch de 1) par compte, avec les mêmes prédictions.
+        
+        Args:
+            accounts: Comptes déjà alimentés par observe()
+            window_size: Taille de la fenêtre d'analyse en jours
+            batch_size: Nombre maximal de séquences par passe
+            
+        Returns:
+            Dict compte -> analyses et prédictions (comptes sans observation ignorés)
+        """
+        try:
+            return analyze_sequences(self.predictor, self.sequences, accounts, window_size, batch_size)
+            
+        except Exception as e:
+            self.logger.error(f"Erreur lors de l'analyse des tendances: {str(e)}")
+            raise
+            
+    def window_statistics(self,
+                          data: pd.DataFrame,
+                          windows: Tuple[int, ...] = (7, 30, 90),
+                          column: str = 'engagement_rate') -> Dict[int, Dict[str, float]]:
+        """
+        Statistiques d'une métrique sur plusieurs fenêtres, en un seul tri des données
+        
+        Args:
+            data: DataFrame avec une colonne timestamp
+            windows: Tailles des fenêtres en jours
+            column: Métrique analysée
+            
+        Returns:
+            Dict fenêtre -> mean, std, volatility, growth, variation, observations
+        """
+        return window_statistics(data['timestamp'], data[column], windows)
+        
     def save_model(self, path: str, extra_data: Optional[Dict] = None):
         """Sauvegarde le modèle et les données associées"""
         self.processor.save_checkpoint(path, extra_data)
         
     def load_model(self, path: str):
-        """Charge un modèle pré-entraîné"""
+        """Charge un modèle pré-entraîné
+        
+        Si un routeur distillé (TrendModelRouter.save) a été sauvegardé à côté, sous
+        router_path(path), l'élève est servi par défaut pour analyze_account(s).
+        """
         self.processor.load_checkpoint(path)
+        router = self.router_path(path)
+        if router.exists():
+            self.load_router(router)
+            
+    @staticmethod
+    def router_path(model_path: str) -> Path:
+        """Emplacement du routeur distillé associé à un checkpoint du modèle complet"""
+        return Path(model_path).with_name('trend_router.pt')
+        
+    def load_router(self, path: str):
+        """Sert l'élève distillé (CompactTrendGRU), escaladé vers le modèle complet si incertain"""
+        student = CompactTrendGRU(input_size=len(self.sequences.features))
+        router = TrendModelRouter.load(path, student, self.processor.model)
+        self.predictor.unserve()
+        self.predictor = TrendPredictor(router, sequence_length=self.sequences.sequence_length)
         
     def get_performance_metrics(self) -> Dict:
         """Retourne les métriques de performance de l'agent"""
@@ -1,9 +1,10 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import torch
 import torch.nn as nn
 import numpy as np
 import logging
 from datetime import datetime, timedelta
+from pathlib import Path
 import pandas as pd
 
 # Import des agents et processeurs depuis leurs nouveaux emplacements
@@ -11,11 +12,18 @@ from ..base.base_agent import BaseAgent
 from ..analysis.data_integration_agent import DataIntegrationAgent
 from ...processors.training_processor import TrainingProcessor
 from ...processors.trend_processor import TrendProcessor
-from ...core.models import UnifiedTrendLSTM
+from ...core.models import CompactTrendGRU, UnifiedTrendLSTM
 from ...utils.data_validator import DataType
+from ...utils.distillation import TrendModelRouter, distill
+from ...utils.partitioned_history import PartitionedHistory
+from ...utils.batched_inference import TrendPredictor, analyze_sequences
+from ...utils.incremental_training import IncrementalTrainer
+from ...utils.sequence_store import SEQUENCE_FEATURES, SequenceFeatureStore
+from ...utils.sequence_windows import SequenceWindows
+from ...utils.window_stats import window_statistics
 
 class TrendAnalysisAgent(BaseAgent):
-    def __init__(self):
+    def __init__(self, dossier_historique: Optional[str] = None):
         super().__init__("agent_analyse_tendances")
         self.logger = logging.getLogger(__name__)
         
@@ -34,7 +42,22 @@ class TrendAnalysisAgent(BaseAgent):
             model_config=self.model_config
         )
         
+        # Dernières observations de chaque compte, servies au modèle sans DataFrame
+        self.sequences = SequenceFeatureStore(sequence_length=30)
+        
+        # Mises à jour incrémentales du modèle (créé au premier usage)
+        self.dossier_modele = Path('models/trend_analysis')
+        self.entraineur_incremental = None
+        
+        # Prédictions par batchs de séquences (tenseurs) : l'élève distillé s'il a été
+        # sauvegardé (escalade vers le modèle du processeur), sinon le modèle du processeur
+        self.chemin_routeur = self.dossier_modele / 'trend_router.pt'
+        self.predicteur = TrendPredictor(self._modele_servi(), sequence_length=30)
+        
+        # Historique par catégorie, partitionné par jour (PartitionedHistory) ;
+        # avec dossier_historique, les jours anciens sont gardés sur disque
         self.historique_tendances = {}
+        self.dossier_historique = dossier_historique
         self.seuil_opportunite = 0.7
         self.donnees_tendances = {}
         self.duree_max_historique = timedelta(days=90)  # 3 mois d'historique
@@ -91,9 +114,11 @@ class TrendAnalysisAgent(BaseAgent):
                     validation_split=0.2,
                     epochs=50,
                     batch_size=32,
-                    save_dir='models/trend_analysis'
+                    save_dir=str(self.dossier_modele)
                 )
                 self.logger.info(f"Modèle entraîné avec succès. MSE: {training_results['validation_metrics']['mse']:.4f}")
+                # Référence des mises à jour incrémentales et point de reprise
+                self._entraineur().set_baseline(training_results['validation_metrics'])
                 
             return {
                 'statut': 'succes',
@@ -112,6 +137,8 @@ class TrendAnalysisAgent(BaseAgent):
                 return self._analyser_tendances(message['donnees'])
             elif message['type'] == 'mise_a_jour_modele':
                 return self._mettre_a_jour_modele(message['donnees'])
+            elif message['type'] == 'distillation_modele':
+                return self._distiller_modele(message['donnees'])
             elif message['type'] == 'demande_insights':
                 return self._generer_insights(message['donnees'])
             else:
@@ -122,38 +149,132 @@ class TrendAnalysisAgent(BaseAgent):
             return {'erreur': str(e)}
             
     def _mettre_a_jour_modele(self, donnees: Dict[str, Any]) -> Dict[str, Any]:
-        """Met à jour le modèle avec de nouvelles données"""
+        """Met à jour le modèle avec de nouvelles données
+        
+        Par défaut, mise à jour incrémentale (reprise du checkpoint, nouvelles fenêtres
+        et échantillon des anciennes) ; donnees['mode'] == 'complet' réentraîne tout.
+        """
         try:
             if 'posts' not in donnees:
                 return {'erreur': 'Données de posts manquantes'}
                 
-            # Entraînement incrémental
-            resultats = self.trend_processor.train(
-                posts_df=donnees['posts'],
-                hashtags_df=donnees.get('hashtags'),
-                validation_split=0.2,
-                epochs=10,  # Moins d'époques pour l'entraînement incrémental
-                batch_size=32,
-                save_dir='models/trend_analysis'
-            )
+            if donnees.get('mode') == 'complet':
+                resultats = self.trend_processor.train(
+                    posts_df=donnees['posts'],
+                    hashtags_df=donnees.get('hashtags'),
+                    validation_split=0.2,
+                    epochs=10,
+                    batch_size=32,
+                    save_dir=str(self.dossier_modele)
+                )
+                self._entraineur().set_baseline(resultats['validation_metrics'])
+                
+                return {
+                    'statut': 'succes',
+                    'mode': 'complet',
+                    'metriques': resultats['validation_metrics']
+                }
+                
+            # Entraînement incrémental sur les fenêtres des nouveaux posts
+            fenetres = self._fenetres_entrainement(pd.DataFrame(donnees['posts']))
+            if not len(fenetres):
+                return {'erreur': 'Pas assez de posts pour former une séquence'}
+            dates_cibles = fenetres.target_times() if fenetres.times is not None else None
+            resultats = self._entraineur().update(*fenetres.tensors(), target_times=dates_cibles)
             
             return {
                 'statut': 'succes',
-                'metriques': resultats['validation_metrics']
+                'mode': 'incremental',
+                'metriques': resultats['validation_metrics'],
+                'metriques_reference': resultats['baseline_metrics'],
+                'ecart_reference': resultats['difference_baseline'],
+                'epoques': resultats['epochs'],
+                'duree_s': resultats['duration_s']
             }
             
         except Exception as e:
             self.logger.error(f"Erreur de mise à jour du modèle: {str(e)}")
             return {'erreur': str(e)}
             
+    def _modele_servi(self):
+        """Routeur de l'élève distillé s'il a été sauvegardé, sinon le modèle complet du processeur"""
+        if self.chemin_routeur.exists():
+            try:
+                return TrendModelRouter.load(
+                    self.chemin_routeur,
+                    CompactTrendGRU(input_size=self.model_config['input_size']),
+                    self.trend_processor.model
+                )
+            except Exception as e:
+                self.logger.error(f"Routeur de tendance illisible, modèle complet servi: {str(e)}")
+        return self.trend_processor.model
+        
+    def _distiller_modele(self, donnees: Dict[str, Any]) -> Dict[str, Any]:
+        """Distille l'élève sur les fenêtres des posts, calibre le routeur et le sert par défaut
+        
+        L'élève est ensuite servi pour toutes les séquences, sauf celles dont l'incertitude
+        dépasse le seuil (donnees['taux_escalade'] des fenêtres de calibration, 10 % par
+        défaut), escaladées au modèle complet. À relancer après un réentraînement complet.
+        """
+        try:
+            if 'posts' not in donnees:
+                return {'erreur': 'Données de posts manquantes'}
+                
+            fenetres = self._fenetres_entrainement(pd.DataFrame(donnees['posts']))
+            if len(fenetres) < 20:
+                return {'erreur': 'Pas assez de fenêtres pour distiller le modèle'}
+            features, cibles = fenetres.tensors()
+            
+            # Les dernières fenêtres calibrent le seuil d'escalade
+            n_calibration = max(len(features) // 10, 2)
+            eleve = CompactTrendGRU(input_size=self.model_config['input_size'])
+            resultats = distill(self.trend_processor.model, eleve,
+                                features[:-n_calibration], cibles[:-n_calibration])
+            routeur = TrendModelRouter(eleve, self.trend_processor.model)
+            seuil = routeur.calibrate(features[-n_calibration:], donnees.get('taux_escalade', 0.1))
+            
+            routeur.save(self.chemin_routeur)
+            self.predicteur.unserve()
+            self.predicteur = TrendPredictor(routeur, sequence_length=30)
+            
+            return {
+                'statut': 'succes',
+                'epoques': resultats['epochs'],
+                'perte_validation': resultats['validation_loss'][-1],
+                'seuil_incertitude': seuil
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Erreur de distillation du modèle: {str(e)}")
+            return {'erreur': str(e)}
+            
+    def _entraineur(self) -> IncrementalTrainer:
+        """Entraîneur incrémental du modèle du processeur de tendances"""
+        if self.entraineur_incremental is None:
+            self.entraineur_incremental = IncrementalTrainer(
+                self.trend_processor.model,
+                self.dossier_modele / 'incremental_checkpoint.pt'
+            )
+        return self.entraineur_incremental
+        
+    def _fenetres_entrainement(self, posts: pd.DataFrame) -> SequenceWindows:
+        """Fenêtres de 30 posts d'un même compte, dans l'ordre chronologique"""
+        if 'timestamp' in posts.columns:
+            posts = posts.sort_values('timestamp', kind='stable')
+        valeurs = posts.reindex(columns=list(SEQUENCE_FEATURES), fill_value=0)
+        valeurs = valeurs.apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+        comptes = posts['username'].to_numpy() if 'username' in posts.columns else None
+        dates = pd.to_datetime(posts['timestamp']).to_numpy() if 'timestamp' in posts.columns else None
+        return SequenceWindows(valeurs, sequence_length=30, groups=comptes, times=dates)
+        
     def _generer_insights(self, donnees: Dict[str, Any]) -> Dict[str, Any]:
         """Génère des insights détaillés sur les tendances"""
         try:
             # Analyse des tendances
             analyse = self._analyser_tendances(donnees)
             
-            # Enrichissement avec les insights Kaggle
-            insights_kaggle = self.agent_integration_donnees.analyze_market_insights()
+            # Enrichissement avec les insights Kaggle (dernière version calculée, sans attendre)
+            insights_kaggle = self.agent_integration_donnees.analyze_market_insights(allow_stale=True)
             
             # Fusion et analyse approfondie
             insights_detailles = self._fusionner_tous_insights(
@@ -182,15 +303,16 @@ class TrendAnalysisAgent(BaseAgent):
             if not self._valider_donnees_spider(donnees):
                 return {'erreur': 'Données invalides'}
                 
-            # Préparation des données pour l'analyse
-            df = pd.DataFrame(donnees)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            # Ajout des nouveaux posts à la séquence du compte (O(1) par post) ;
+            # les posts déjà vus (au plus tard le dernier stocké) sont ignorés
+            compte = self._compte_tendances(donnees)
+            self.sequences.extend(compte, donnees, only_new=True)
             
             # Analyse avec le processeur de tendances
-            trend_analysis = self.trend_processor.analyze_trends(df)
+            trend_analysis = self._analyser_sequence(compte)
             
-            # Intégration des insights Kaggle
-            insights_kaggle = self.agent_integration_donnees.analyze_market_insights()
+            # Intégration des insights Kaggle (dernière version calculée, sans attendre)
+            insights_kaggle = self.agent_integration_donnees.analyze_market_insights(allow_stale=True)
             
             # Fusion des résultats
             resultats = self._fusionner_tous_insights(
@@ -209,6 +331,7 @@ class TrendAnalysisAgent(BaseAgent):
             return {
                 'tendances': resultats,
                 'opportunites': opportunites,
+                'fenetres': self._statistiques_fenetres(donnees),
                 'confiance': trend_analysis['predictions']['confidence_score']
             }
             
@@ -216,6 +339,49 @@ class TrendAnalysisAgent(BaseAgent):
             self.logger.error(self.messages_erreur['analyse'].format(str(e)))
             return {'erreur': str(e)}
             
+    def _analyser_sequence(self, compte: Any, fenetre_jours: int = 7) -> Dict[str, Any]:
+        """Prédictions du modèle (TrendPredictor) et tendances actuelles à partir de la séquence du compte
+        
+        La séquence passe par le scheduler partagé : les analyses concurrentes d'autres
+        comptes sont regroupées en un batch.
+        """
+        resultats = analyze_sequences(self.predicteur, self.sequences, [compte], fenetre_jours, scheduled=True)
+        if compte not in resultats:
+            raise ValueError(f"Aucune observation pour le compte {compte}")
+        return resultats[compte]
+        
+    def analyser_tendances_comptes(self, comptes: List[Any], fenetre_jours: int = 7,
+                                   taille_lot: int = 512) -> Dict[Any, Dict[str, Any]]:
+        """Prédictions et tendances actuelles de nombreux comptes, une passe du modèle par
+        groupe de séquences de même longueur (scoring de toute la base de créateurs)"""
+        try:
+            return analyze_sequences(self.predicteur, self.sequences, comptes, fenetre_jours, taille_lot)
+            
+        except Exception as e:
+            self.logger.error(self.messages_erreur['analyse'].format(str(e)))
+            return {}
+            
+    def _statistiques_fenetres(self, donnees: Dict[str, Any],
+                               fenetres: tuple = (7, 30, 90)) -> Dict[int, Dict[str, float]]:
+        """Engagement sur les fenêtres de 7, 30 et 90 jours (un seul tri des posts)"""
+        if 'engagement_rate' not in donnees:
+            return {}
+        return window_statistics(donnees['timestamp'], donnees['engagement_rate'], fenetres)
+        
+    def _compte_tendances(self, donnees: Dict[str, Any]) -> Any:
+        """Compte auquel appartiennent les posts (un seul compte par appel)
+        
+        Les posts de plusieurs comptes sont refusés : leurs séquences et leurs tendances
+        ne doivent pas être mélangées (voir analyser_tendances_comptes pour plusieurs comptes).
+        """
+        comptes = donnees.get('username', 'inconnu')
+        if not isinstance(comptes, (list, tuple, np.ndarray, pd.Series)):
+            return comptes
+        distincts = pd.unique(pd.Series(comptes, dtype=object).fillna('inconnu'))
+        if len(distincts) > 1:
+            raise ValueError(f"Posts de plusieurs comptes dans un même appel : {list(distincts[:5])}")
+        return distincts[0] if len(distincts) else 'inconnu'
+        
     def _fusionner_tous_insights(self,
                            predictions: Dict[str, Any],
                            current_trends: Dict[str, Any],
@@ -783,26 +949,51 @@ class TrendAnalysisAgent(BaseAgent):
         return []
 
     def _stocker_historique_tendances(self, donnees_tendance: Dict[str, Any]) -> None:
-        """Stocke les données de tendance dans l'historique"""
+        """Stocke les données de tendance dans l'historique (partition du jour, O(1))"""
         try:
             if not donnees_tendance:
                 return
                 
             # Crée une entrée d'historique
+            horodatage = donnees_tendance.get('timestamp') or datetime.now().isoformat()
             entree_historique = {
-                'horodatage': datetime.now().isoformat(),
+                'horodatage': horodatage,
                 'donnees': donnees_tendance,
-                'score': self._calculer_score_tendance(donnees_tendance)
+                'score': self._calculate_trend_score(donnees_tendance)
             }
-    def _stocker_historique_tendances(self, donnees: Dict[str, Any]) -> None:
-        """Stocke l'historique des tendances"""
-        # Implémentation de la mise à jour de l'historique des tendances
-        pass
+            
+            categorie = donnees_tendance.get('categorie', 'general')
+            self._historique(categorie).append(entree_historique, horodatage)
+            self.donnees_tendances[categorie] = donnees_tendance
+            
+        except Exception as e:
+            self.logger.error(self.messages_erreur['historique'].format(str(e)))
 
     def _nettoyer_ancien_historique(self) -> None:
-        """Nettoie l'historique dépassant l'âge maximum"""
-        # Implémentation de la nettoyage de l'historique
-        pass
+        """Nettoie l'historique dépassant l'âge maximum (partitions entières retirées)"""
+        for historique in self.historique_tendances.values():
+            historique.expire()
+
+    def _historique(self, categorie: str) -> PartitionedHistory:
+        """Historique partitionné par jour d'une catégorie, créé au premier usage"""
+        if categorie not in self.historique_tendances:
+            self.historique_tendances[categorie] = PartitionedHistory(
+                retention=self.duree_max_historique,
+                spill_dir=self.dossier_historique
+            )
+        return self.historique_tendances[categorie]
+
+    def fermer(self):
+        """Libère les historiques et leurs partitions sur disque (à appeler à l'arrêt de l'agent)"""
+        for historique in self.historique_tendances.values():
+            historique.close()
+        self.historique_tendances.clear()
+        
+    def lire_historique(self, categorie: str, debut: Any = None, fin: Any = None) -> List[Dict[str, Any]]:
+        """Entrées d'historique d'une catégorie entre debut et fin, dans l'ordre chronologique"""
+        if categorie not in self.historique_tendances:
+            return []
+        return self.historique_tendances[categorie].range(debut, fin)
 
     def _fusionner_predictions_analyse(self, predictions: Dict, donnees: Dict) -> Dict:
         """Fusionne les prédictions ML avec l'analyse traditionnelle"""
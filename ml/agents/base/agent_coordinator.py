@@ -1,4 +1,6 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+import hashlib
+import json
 import logging
 from datetime import datetime
 
@@ -8,6 +10,7 @@ from ..analysis.competitor_analysis_agent import CompetitorAnalysisAgent
 from ..quality.quality_control_agent import QualityControlAgent
 from ..performance.performance_optimization_agent import PerformanceOptimizationAgent
 from ..strategy.content_strategy_agent import ContentStrategyAgent
+from ...utils.recommendation_resolver import IncrementalRecommendationResolver
 
 class AgentCoordinator:
     """Coordonne les interactions entre les agents"""
@@ -17,6 +20,11 @@ class AgentCoordinator:
         self.shared_memory = {}  # Mémoire partagée entre agents
         self.agent_states = {}   # État actuel de chaque agent
         
+        # Résolution incrémentale des recommandations (arrivent agent par agent)
+        self.resolveur_recommandations = IncrementalRecommendationResolver()
+        self.cles_recommandations = {}  # source -> (clé, identité, empreinte) des recommandations actives
+        self.nb_max_recommandations = 20
+        
         # Initialisation des agents
         self.trend_agent = TrendAnalysisAgent()
         self.competitor_agent = CompetitorAnalysisAgent()
@@ -95,6 +103,64 @@ class AgentCoordinator:
             'timestamp': datetime.now(),
             'confidence': self._calculate_confidence(insights)
         }
+        self._mettre_a_jour_recommandations(source, insights)
+        
+    def _mettre_a_jour_recommandations(self, source: str, insights: Dict[str, Any]):
+        """Remplace les recommandations d'un agent sans tout re-résoudre"""
+        if self._synchroniser_recommandations(source, insights):
+            self.shared_memory['recommandations_resolues'] = self.resolveur_recommandations.top_k(
+                self.nb_max_recommandations
+            )
+            
+    def _synchroniser_recommandations(self, source: str, insights: Dict[str, Any]) -> bool:
+        """Reporte les recommandations d'un agent dans le résolveur incrémental
+        
+        Une recommandation est reconnue par son identité (clé de fusion) et son empreinte
+        (contenu) : une recommandation inchangée n'est pas touchée, quelle que soit sa
+        position ; une recommandation modifiée remplace celle de même identité ; les autres
+        sont ajoutées ou retirées. Rend True si le résolveur a changé.
+        """
+        recommandations = insights.get('recommendations') if isinstance(insights, dict) else None
+        if not isinstance(recommandations, list):
+            return False
+            
+        # Recommandations déjà présentes, par (identité, empreinte) puis par identité
+        inchangees: Dict[Tuple[Any, str], List[int]] = {}
+        for cle, identite, empreinte in self.cles_recommandations.get(source, []):
+            inchangees.setdefault((identite, empreinte), []).append(cle)
+            
+        actives, modifiees = [], []
+        for recommandation in recommandations:
+            identite, empreinte = self._identifier_recommandation(recommandation)
+            cles = inchangees.get((identite, empreinte))
+            if cles:
+                actives.append((cles.pop(0), identite, empreinte))
+            else:
+                modifiees.append((recommandation, identite, empreinte))
+                
+        remplacables: Dict[Any, List[int]] = {}
+        for (identite, _), cles in inchangees.items():
+            remplacables.setdefault(identite, []).extend(cles)
+        for recommandation, identite, empreinte in modifiees:
+            cles = remplacables.get(identite)
+            if cles:
+                cle = cles.pop(0)
+                self.resolveur_recommandations.update(cle, recommandation)
+            else:
+                cle = self.resolveur_recommandations.add(recommandation)
+            actives.append((cle, identite, empreinte))
+        retirees = [cle for cles in remplacables.values() for cle in cles]
+        for cle in retirees:
+            self.resolveur_recommandations.remove(cle)
+            
+        self.cles_recommandations[source] = sorted(actives, key=lambda active: active[0])
+        return bool(modifiees or retirees)
+        
+    def _identifier_recommandation(self, recommandation: Dict[str, Any]) -> Tuple[Any, str]:
+        """Identité stable (clé de fusion) et empreinte du contenu d'une recommandation"""
+        identite = self.resolveur_recommandations._hashable_merge_key(recommandation)
+        contenu = json.dumps(recommandation, sort_keys=True, default=str)
+        return identite, hashlib.sha1(contenu.encode('utf-8')).hexdigest()
         
     def _process_feedback_loop(self, strategy: Dict[str, Any]):
         """Traite le feedback pour amélioration continue"""
@@ -125,6 +191,16 @@ class AgentCoordinator:
             )
             resolved_insights.update(resolution)
             
+        # Recommandations de tous les agents : celles déjà reportées par
+        # _update_shared_knowledge ne sont pas resynchronisées
+        for source, donnees in insights.items():
+            if self.shared_memory.get(source, {}).get('data') is not donnees:
+                self._synchroniser_recommandations(source, donnees)
+        if self.cles_recommandations:
+            resolved_insights['recommendations'] = self.resolveur_recommandations.top_k(
+                self.nb_max_recommandations
+            )
+            
         return resolved_insights
         
     def _calculate_confidence(self, insights: Dict[str, Any]) -> float:
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 import torch
 import numpy as np
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Optional, Union
 import logging
 import requests
 import json
@@ -113,11 +113,11 @@ class BaseAgent(ABC):
         else:
             raise ValueError(self.error_messages['unknown_type'].format(message['type']))
 
-    def _handle_recommendations(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Handles recommendations with conflict resolution"""
+    def _handle_recommendations(self, recommendations: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Handles recommendations with conflict resolution (keeps the top_k best if given)"""
         try:
             # Resolve conflicts
-            resolved = self.recommendation_resolver.resolve_conflicts(recommendations)
+            resolved = self.recommendation_resolver.resolve_conflicts(recommendations, top_k=top_k)
             
             # Log resolutions
             self.logger.info(f"Resolved {len(recommendations)} recommendations to {len(resolved)}")
@@ -12,6 +12,7 @@ import pandas as pd
 from ..base.base_agent import BaseAgent
 from .strategy_coordinator import StrategyCoordinator
 from ..analysis.fraud_detection_agent import FraudDetectionAgent
+from ...utils.single_flight import SingleFlight, request_fingerprint
 
 @dataclass
 class InteractionUtilisateur:
@@ -22,7 +23,7 @@ class InteractionUtilisateur:
     taux_succes: float = 0.0
 
 class AgentMeta:
-    def __init__(self, chemin_modele: str = "models/meta_agent"):
+    def __init__(self, chemin_modele: str = "models/meta_agent", ttl_cache_resultats: float = 0.0):
         self.logger = logging.getLogger("agent_meta")
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.historique_interactions = []
@@ -34,6 +35,9 @@ class AgentMeta:
         self.client_ollama = self._initialiser_ollama()
         self.detecteur_fraude = FraudDetectionAgent()
         
+        # Déduplication des requêtes identiques simultanées (+ cache court optionnel)
+        self.requetes_en_vol = SingleFlight(result_ttl=ttl_cache_resultats)
+        
     def initialiser_equipe(self, agents: List[BaseAgent]):
         """Initialise l'équipe d'agents et le coordinateur"""
         self.coordinateur = StrategyCoordinator(agents)
@@ -43,7 +47,31 @@ class AgentMeta:
         }
         
     def traiter_requete(self, requete: Dict[str, Any]) -> Dict[str, Any]:
-        """Traite une nouvelle requête utilisateur"""
+        """Traite une nouvelle requête utilisateur, les requêtes identiques simultanées partagent le même calcul"""
+        return self.requetes_en_vol.do(
+            request_fingerprint(requete),
+            lambda: self._traiter_requete(requete),
+            cache_if=self._reponse_cachable
+        )
+        
+    async def traiter_requete_async(self, requete: Dict[str, Any]) -> Dict[str, Any]:
+        """Version asyncio de traiter_requete, partage les calculs en cours avec les appelants threads"""
+        return await self.requetes_en_vol.do_async(
+            request_fingerprint(requete),
+            lambda: self._traiter_requete(requete),
+            cache_if=self._reponse_cachable
+        )
+        
+    def fermer(self):
+        """Libère les threads de déduplication des requêtes (à appeler à l'arrêt de l'agent)"""
+        self.requetes_en_vol.close()
+        
+    def _reponse_cachable(self, reponse: Dict[str, Any]) -> bool:
+        """Les réponses en erreur ne sont jamais mises en cache"""
+        return 'erreur' not in reponse
+        
+    def _traiter_requete(self, requete: Dict[str, Any]) -> Dict[str, Any]:
+        """Exécute le pipeline complet (fraude, coordination, validation LLM)"""
         try:
             # Vérifie d'abord la qualité des données
             analyse_fraude = self.detecteur_fraude.analyser(requete)
@@ -5,7 +5,9 @@ from transformers import AutoModel, AutoTokenizer
 import numpy as np
 from typing import Dict, Any, List, Tuple
 
-class EngagementAnalyzer(nn.Module):
+from ...utils.inference_scheduler import ScheduledModel
+
+class EngagementAnalyzer(nn.Module, ScheduledModel):
     def __init__(self, embedding_dim=768):
         super().__init__()
         # Utilisation d'un modèle pré-entraîné français
@@ -154,13 +156,15 @@ class EngagementAgent(BaseAgent):
                 data.get('comments', 0),
                 data.get('saves', 0),
                 data.get('shares', 0)
-            ], dtype=torch.float32).unsqueeze(0)
-            
-            prediction = self.model(
-                text_encoding['input_ids'].to(self.device),
-                text_encoding['attention_mask'].to(self.device),
-                numerical_features.to(self.device)
-            )
+            ], dtype=torch.float32)
+            
+            # Un exemple (sans dimension batch) soumis au scheduler partagé, regroupé
+            # avec les analyses concurrentes (légendes complétées à la même longueur)
+            prediction = self.model.submit((
+                text_encoding['input_ids'][0],
+                text_encoding['attention_mask'][0],
+                numerical_features
+            )).result()
             
             return {
                 'engagement_predit': prediction.item(),
@@ -1,7 +1,9 @@
 from .base_agent import BaseAgent
 import torch
+import numpy as np
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from typing import Dict, Any, List
+from ...utils.window_stats import TimeWindowStats
 
 class AgentStrategieCroissance(BaseAgent):
     def __init__(self):
@@ -384,11 +386,12 @@ class AgentStrategieCroissance(BaseAgent):
         if not engagement_data:
             return {}
             
-        # Calcul des variations
+        # Calcul des variations (historique trié une seule fois pour les trois périodes)
+        statistiques = self._statistiques_temporelles(engagement_data)
         variations = {
-            'court_terme': self._calculer_variation(engagement_data, periode='7j'),
-            'moyen_terme': self._calculer_variation(engagement_data, periode='30j'),
-            'long_terme': self._calculer_variation(engagement_data, periode='90j')
+            'court_terme': self._calculer_variation(statistiques, periode='7j'),
+            'moyen_terme': self._calculer_variation(statistiques, periode='30j'),
+            'long_terme': self._calculer_variation(statistiques, periode='90j')
         }
         
         # Détection des patterns
@@ -405,6 +408,21 @@ class AgentStrategieCroissance(BaseAgent):
             'momentum': self._calculer_momentum(engagement_data)
         }
 
+    def _statistiques_temporelles(self, historique: List[Dict[str, Any]],
+                                  metrique: str = 'engagement_rate') -> TimeWindowStats:
+        """Sommes cumulées de la métrique, pour des variations sur n'importe quelle période"""
+        horodatages = [point.get('timestamp', point.get('date')) for point in historique]
+        valeurs = [point.get(metrique, float('nan')) for point in historique]
+        return TimeWindowStats(horodatages, valeurs)
+
+    def _calculer_variation(self, statistiques: TimeWindowStats, periode: str = '7j') -> float:
+        """Variation de la métrique sur la période ('7j', '30j', '90j')
+        
+        0 sans données, ou si la variation n'est pas définie (première valeur nulle : infinie).
+        """
+        variation = statistiques.window(float(periode.rstrip('j')))['variation']
+        return float(variation) if np.isfinite(variation) else 0.0
+
     def _analyser_tendances_followers(self, historique: Dict[str, Any]) -> Dict[str, Any]:
         """Analyse les tendances des followers"""
         followers_data = historique.get('followers_history', [])
@@ -6066,7 +6084,5 @@ class AgentStrategieCroissance(BaseAgent):
         pass
 
     def _trouver_points_integration(self, proposition: Dict[str, Any]) -> List[str]:
-            'feedback': feedback,
-            'counter_proposals': self._generate_counter_proposals(other_agent_proposals),
-            'synthesis_suggestions': self._suggest_strategy_synthesis(other_agent_proposals)
-        } 
\ No newline at end of file
+        # Implémentation de la recherche de points d'intégration
+        pass
@@ -0,0 +1,135 @@
+"""Benchmark mémoire du chargement des datasets de DataIntegrationAgent
+
+Génère un CSV d'engagement synthétique de plusieurs Go puis mesure, chacun dans
+un processus séparé, le pic de mémoire (ru_maxrss) et la durée :
+- avant : pd.read_csv() avec les types par défaut, copy(), drop_duplicates(), fillna()
+- après : SchemaCsvLoader (usecols, dtypes du schéma, blocs, dédoublonnage) puis nettoyage
+
+    python -m ml.benchmarks.bench_chunked_loading --taille-go 2
+"""
+from typing import Dict, Any
+from pathlib import Path
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..utils.schema_loader import SchemaCsvLoader
+
+SCHEMA = {
+    'username': 'category',
+    'likes': 'int32',
+    'comments': 'int32',
+    'shares': 'int32',
+    'saves': 'int32',
+    'engagement_rate': 'float32',
+    'content_type': 'category',
+    'hour': 'int8',
+    'day': 'category',
+    'month': 'category'
+}
+VALEURS_MANQUANTES = {'likes': 0, 'comments': 0, 'shares': 0, 'saves': 0}
+
+JOURS = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
+MOIS = np.array(['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                 'August', 'September', 'October', 'November', 'December'])
+TYPES = np.array(['photo', 'video', 'reel', 'carousel', 'story'])
+
+
+def generer_csv(chemin: Path, taille_go: float, lignes_par_bloc: int = 500_000, seed: int = 0):
+    """Écrit un CSV synthétique d'environ taille_go Go (1 % de lignes dupliquées, une colonne inutilisée)"""
+    rng = np.random.default_rng(seed)
+    n_comptes = 200_000
+    taille_cible = int(taille_go * 1024 ** 3)
+    with open(chemin, 'w') as f:
+        entete = True
+        while f.tell() < taille_cible:
+            n = lignes_par_bloc
+            bloc = pd.DataFrame({
+                'username': np.char.add('user_', rng.integers(0, n_comptes, n).astype(str)),
+                'likes': rng.integers(0, 100_000, n),
+                'comments': rng.integers(0, 5_000, n),
+                'shares': rng.integers(0, 1_000, n),
+                'saves': rng.integers(0, 1_000, n),
+                'engagement_rate': rng.random(n),
+                'content_type': TYPES[rng.integers(0, len(TYPES), n)],
+                'hour': rng.integers(0, 24, n),
+                'day': JOURS[rng.integers(0, 7, n)],
+                'month': MOIS[rng.integers(0, 12, n)],
+                'caption': np.char.add('caption text #', rng.integers(0, 10 ** 9, n).astype(str))
+            })
+            bloc = pd.concat([bloc, bloc.sample(frac=0.01, random_state=int(rng.integers(1 << 31)))])
+            bloc.to_csv(f, index=False, header=entete)
+            entete = False
+
+
+def _avant(chemin: str) -> int:
+    data = pd.read_csv(chemin)
+    clean_data = data.copy()
+    clean_data = clean_data.drop_duplicates()
+    clean_data = clean_data.fillna(VALEURS_MANQUANTES)
+    for col in VALEURS_MANQUANTES:
+        clean_data[col] = pd.to_numeric(clean_data[col], errors='coerce')
+    return len(clean_data)
+
+
+def _apres(chemin: str) -> int:
+    data = SchemaCsvLoader().load(chemin, SCHEMA)
+    clean_data = data.fillna(VALEURS_MANQUANTES)
+    for col in VALEURS_MANQUANTES:
+        clean_data[col] = clean_data[col].astype(SCHEMA[col])
+    return len(clean_data)
+
+
+def _mesurer(variante: str, chemin: str, resultats):
+    debut = time.perf_counter()
+    lignes = {'avant': _avant, 'apres': _apres}[variante](chemin)
+    resultats.put({
+        'variante': variante,
+        'lignes': lignes,
+        'duree_s': time.perf_counter() - debut,
+        # ru_maxrss est en Ko sous Linux
+        'pic_memoire_mo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    })
+
+
+def mesurer(variante: str, chemin: Path) -> Dict[str, Any]:
+    """Exécute une variante dans un processus neuf pour isoler son pic mémoire"""
+    contexte = multiprocessing.get_context('spawn')
+    resultats = contexte.Queue()
+    processus = contexte.Process(target=_mesurer, args=(variante, str(chemin), resultats))
+    processus.start()
+    processus.join()
+    if processus.exitcode != 0:
+        return {'variante': variante, 'erreur': f"code de sortie {processus.exitcode} (mémoire insuffisante ?)"}
+    return resultats.get()
+
+
+def main(taille_go: float = 2.0, chemin: str = 'bench_engagement.csv', conserver: bool = False):
+    chemin = Path(chemin)
+    if not chemin.exists():
+        generer_csv(chemin, taille_go)
+    print(f"Fichier : {chemin} ({chemin.stat().st_size / 1024 ** 3:.2f} Go)")
+
+    for variante in ('avant', 'apres'):
+        resultat = mesurer(variante, chemin)
+        if 'erreur' in resultat:
+            print(f"{variante:>6} : {resultat['erreur']}")
+        else:
+            print(f"{variante:>6} : pic {resultat['pic_memoire_mo']:.0f} Mo, "
+                  f"{resultat['duree_s']:.1f} s, {resultat['lignes']} lignes")
+
+    if not conserver:
+        chemin.unlink()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--taille-go', type=float, default=2.0)
+    parser.add_argument('--chemin', default='bench_engagement.csv')
+    parser.add_argument('--conserver', action='store_true')
+    arguments = parser.parse_args()
+    main(arguments.taille_go, arguments.chemin, arguments.conserver)
@@ -0,0 +1,79 @@
+"""Benchmark de la détection de conflits de RecommendationResolver
+
+Compare la détection indexée (_detect_conflicts) à la version pairwise
+(_detect_conflicts_pairwise) et vérifie que les groupes sont identiques.
+
+    python -m ml.benchmarks.bench_conflict_detection
+"""
+from typing import Dict, Any, List, Tuple
+from datetime import datetime, timedelta
+import random
+import time
+
+from ..utils.recommendation_resolver import RecommendationResolver
+
+STRATEGIES = ['growth', 'retention', 'aggressive', 'conservative', 'broad_reach', 'niche_focus', 'steady']
+OBJECTIVES = ['engagement', 'reach', 'conversion', 'followers']
+ACTIONS = ['increase_posts', 'decrease_posts', 'start_reels', 'stop_reels', 'add_hashtags', 'remove_hashtags', 'reply_comments']
+
+
+def generer_recommandations(n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Génère n recommandations synthétiques avec peu de conflits par recommandation"""
+    rng = random.Random(seed)
+    n_resources = max(50, n // 2)
+    debut = datetime(2024, 1, 1)
+    horizon_heures = max(24, n * 4)
+
+    recommandations = []
+    for i in range(n):
+        rec = {
+            'id': i,
+            'category': 'content',
+            'priority': rng.choice(['high', 'medium', 'low']),
+            'confidence': rng.random(),
+            'expected_impact': {'engagement': rng.random(), 'reach': rng.random(), 'conversion': rng.random()},
+            'resources': [f"resource_{rng.randrange(n_resources)}" for _ in range(rng.randint(1, 3))],
+            'objective': rng.choice(OBJECTIVES),
+            'strategy': rng.choice(STRATEGIES) if rng.random() < 0.001 else 'steady',
+            'actions': rng.sample(ACTIONS, 1) if rng.random() < 0.001 else ['reply_comments']
+        }
+        if rng.random() < 0.8:
+            start = debut + timedelta(hours=rng.randrange(horizon_heures))
+            rec['timing'] = {
+                'start': start.isoformat(),
+                'end': (start + timedelta(minutes=rng.randint(10, 120))).isoformat()
+            }
+        recommandations.append(rec)
+    return recommandations
+
+
+def _ids(groupes: List[List[Dict[str, Any]]]) -> List[List[int]]:
+    return [[rec['id'] for rec in groupe] for groupe in groupes]
+
+
+def _chronometrer(fn, *args) -> Tuple[float, Any]:
+    debut = time.perf_counter()
+    resultat = fn(*args)
+    return time.perf_counter() - debut, resultat
+
+
+def main(tailles: List[int] = (100, 1_000, 10_000, 100_000), limite_pairwise: int = 2_000):
+    resolver = RecommendationResolver()
+    print(f"{'n':>8} {'indexé (s)':>12} {'pairwise (s)':>14} {'groupes':>9} {'parité':>8}")
+    for n in tailles:
+        recommandations = generer_recommandations(n)
+        duree_index, groupes = _chronometrer(resolver._detect_conflicts, recommandations)
+
+        if n <= limite_pairwise:
+            duree_pairwise, reference = _chronometrer(resolver._detect_conflicts_pairwise, recommandations)
+            parite = 'ok' if _ids(groupes) == _ids(reference) else 'ECHEC'
+            pairwise = f"{duree_pairwise:14.3f}"
+        else:
+            parite = '-'
+            pairwise = f"{'-':>14}"
+
+        print(f"{n:>8} {duree_index:12.3f} {pairwise} {len(groupes):>9} {parite:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark de la fusion des datasets de DataIntegrationAgent
+
+Compare, chacun dans un processus séparé (pic mémoire ru_maxrss et durée) :
+- avant : deux pd.merge(how='outer') sur username puis fillna(0) sur tout le résultat
+- après : IndexedJoin (clés internées, doublons agrégés, jointure sur codes triés)
+
+Les tables par compte contiennent une part de usernames dupliqués, ce qui fait
+grossir la fusion pandas (produit des doublons) mais pas la jointure indexée.
+
+    python -m ml.benchmarks.bench_indexed_join --lignes 10000000
+"""
+from typing import Dict, Any, Tuple
+import argparse
+import multiprocessing
+import resource
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..utils.indexed_join import IndexedJoin
+
+
+def generer(lignes_engagement: int, seed: int = 0, taux_doublons: float = 0.02) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Influenceurs et portée (un compte pour 10 posts, avec doublons) et engagement par post"""
+    rng = np.random.default_rng(seed)
+    n_comptes = max(lignes_engagement // 10, 1)
+    comptes = pd.Index([f"user_{i}" for i in range(n_comptes)])
+
+    def table_comptes(colonnes):
+        ids = np.arange(n_comptes)
+        ids = np.concatenate([ids, rng.choice(ids, int(n_comptes * taux_doublons))])
+        table = pd.DataFrame({'username': comptes[ids]})
+        for colonne in colonnes:
+            table[colonne] = rng.integers(0, 1_000_000, len(ids)).astype(np.int32)
+        return table.sample(frac=1.0, random_state=seed)
+
+    influenceurs = table_comptes(['followers_count', 'following_count', 'media_count'])
+    influenceurs['engagement_rate'] = rng.random(len(influenceurs)).astype(np.float32)
+    portee = table_comptes(['reach', 'impressions', 'profile_views'])
+
+    # 5 % des posts viennent de comptes absents des tables par compte
+    ids_posts = rng.integers(0, int(n_comptes * 1.05), lignes_engagement)
+    noms = np.where(ids_posts < n_comptes, comptes[np.minimum(ids_posts, n_comptes - 1)], 'inconnu_' + pd.Index(ids_posts).astype(str))
+    engagement = pd.DataFrame({
+        'username': noms,
+        'likes': rng.integers(0, 10_000, lignes_engagement).astype(np.int32),
+        'comments': rng.integers(0, 500, lignes_engagement).astype(np.int32),
+        'content_type': pd.Categorical(rng.choice(['photo', 'video', 'reel'], lignes_engagement)),
+        'hour': rng.integers(0, 24, lignes_engagement).astype(np.int8)
+    })
+    for table in (influenceurs, portee, engagement):
+        table['username'] = table['username'].astype('category')
+    return influenceurs, portee, engagement
+
+
+def _avant(influenceurs, portee, engagement) -> int:
+    merged = pd.merge(influenceurs, portee, on='username', how='outer')
+    merged = pd.merge(merged, engagement, on='username', how='outer')
+    for colonne in merged.select_dtypes('category').columns:
+        if merged[colonne].isna().any() and 0 not in merged[colonne].cat.categories:
+            merged[colonne] = merged[colonne].cat.add_categories([0])
+    merged = merged.fillna(0)
+    return len(merged)
+
+
+def _apres(influenceurs, portee, engagement) -> int:
+    return len(IndexedJoin('username').join([influenceurs, portee, engagement], unique=[True, True, False]))
+
+
+def _mesurer(variante: str, lignes: int, resultats):
+    tables = generer(lignes)
+    memoire_donnees = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    debut = time.perf_counter()
+    lignes_sortie = {'avant': _avant, 'apres': _apres}[variante](*tables)
+    resultats.put({
+        'variante': variante,
+        'lignes': lignes_sortie,
+        'duree_s': time.perf_counter() - debut,
+        'pic_memoire_mo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'memoire_donnees_mo': memoire_donnees
+    })
+
+
+def mesurer(variante: str, lignes: int) -> Dict[str, Any]:
+    """Exécute une variante dans un processus neuf pour isoler son pic mémoire"""
+    contexte = multiprocessing.get_context('spawn')
+    resultats = contexte.Queue()
+    processus = contexte.Process(target=_mesurer, args=(variante, lignes, resultats))
+    processus.start()
+    processus.join()
+    if processus.exitcode != 0:
+        return {'variante': variante, 'erreur': f"code de sortie {processus.exitcode} (mémoire insuffisante ?)"}
+    return resultats.get()
+
+
+def main(lignes: int = 10_000_000):
+    print(f"Engagement : {lignes} lignes, comptes : {lignes // 10} (+2 % de doublons)")
+    for variante in ('avant', 'apres'):
+        resultat = mesurer(variante, lignes)
+        if 'erreur' in resultat:
+            print(f"{variante:>6} : {resultat['erreur']}")
+        else:
+            print(f"{variante:>6} : {resultat['duree_s']:.1f} s, pic {resultat['pic_memoire_mo']:.0f} Mo "
+                  f"(données {resultat['memoire_donnees_mo']:.0f} Mo), {resultat['lignes']} lignes")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=10_000_000)
+    main(parser.parse_args().lignes)
@@ -0,0 +1,172 @@
+"""Benchmark des moteurs de DataIntegrationAgent sur des données plus grandes que la mémoire
+
+Chaque moteur exécute, dans un processus séparé dont l'espace d'adressage est limité
+(RLIMIT_AS, --memoire-mo) : chargement des trois CSV, nettoyage, fusion et cumuls des
+tendances du marché.
+- pandas : tout est en mémoire, la fusion dépasse la limite
+- arrow : blocs écrits sur disque et relus en memory-map, seuls les tables par compte,
+  les hash des lignes et un bloc sont en mémoire
+
+Arrow utilise son pool mémoire système : les pools mimalloc/jemalloc réservent de
+l'espace d'adressage, compté par RLIMIT_AS.
+
+    python -m ml.benchmarks.bench_lazy_backend --lignes 20000000 --memoire-mo 2048
+"""
+from typing import Dict, Any
+from pathlib import Path
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..utils.dataframe_backend import create_backend
+from ..utils.indexed_join import IndexedJoin
+from ..utils.multi_aggregation import MarketAggregates
+from ..utils.schema_loader import SchemaCsvLoader
+
+SCHEMAS = {
+    'influencers': {
+        'username': 'category', 'followers_count': 'int32', 'following_count': 'int32',
+        'engagement_rate': 'float32', 'followers_growth_rate': 'float32'
+    },
+    'reach': {
+        'username': 'category', 'reach': 'int32', 'impressions': 'int32', 'reach_rate': 'float32'
+    },
+    'engagement': {
+        'username': 'category', 'likes': 'int32', 'comments': 'int32', 'content_type': 'category',
+        'hour': 'int8', 'day': 'category', 'month': 'category'
+    }
+}
+FILL = {
+    'influencers': {'followers_count': 0, 'following_count': 0, 'engagement_rate': 0},
+    'reach': {'reach': 0, 'impressions': 0},
+    'engagement': {'likes': 0, 'comments': 0}
+}
+GROUP_KEYS = ['hour', 'day', 'month', 'content_type']
+VALUE_COLUMNS = ['engagement_rate', 'reach_rate', 'likes', 'comments', 'followers_growth_rate', 'followers_count']
+CORR_COLUMNS = ['engagement_rate', 'reach_rate', 'followers_count']
+
+
+def generer(dossier: Path, lignes: int, seed: int = 0, bloc: int = 1_000_000):
+    """CSV influenceurs et portée (un compte pour 10 posts) et engagement par post, écrits par blocs"""
+    rng = np.random.default_rng(seed)
+    n_comptes = max(lignes // 10, 1)
+
+    def ecrire(nom, n, colonnes):
+        with open(dossier / nom, 'w') as f:
+            for debut in range(0, n, bloc):
+                taille = min(bloc, n - debut)
+                table = pd.DataFrame({'username': 'user_' + pd.Index(rng.integers(0, int(n_comptes * 1.05), taille)).astype(str)})
+                for colonne, valeurs in colonnes.items():
+                    table[colonne] = valeurs(taille)
+                table.to_csv(f, index=False, header=debut == 0)
+
+    ecrire('influencers.csv', n_comptes, {
+        'followers_count': lambda n: rng.integers(0, 10_000_000, n),
+        'following_count': lambda n: rng.integers(0, 5_000, n),
+        'engagement_rate': lambda n: rng.random(n).round(4),
+        'followers_growth_rate': lambda n: (rng.random(n) - 0.5).round(4)
+    })
+    ecrire('reach.csv', n_comptes, {
+        'reach': lambda n: rng.integers(0, 100_000, n),
+        'impressions': lambda n: rng.integers(0, 200_000, n),
+        'reach_rate': lambda n: rng.random(n).round(4)
+    })
+    ecrire('engagement.csv', lignes, {
+        'likes': lambda n: rng.integers(0, 10_000, n),
+        'comments': lambda n: rng.integers(0, 500, n),
+        'content_type': lambda n: rng.choice(['photo', 'video', 'reel'], n),
+        'hour': lambda n: rng.integers(0, 24, n),
+        'day': lambda n: rng.choice(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'], n),
+        'month': lambda n: rng.choice([f"{i:02d}" for i in range(1, 13)], n)
+    })
+
+
+def executer(moteur: str, dossier: Path, bloc: int) -> Dict[str, Any]:
+    """Chargement, nettoyage, fusion puis cumuls avec le moteur donné"""
+    loader = SchemaCsvLoader(chunksize=bloc)
+    backend = create_backend(moteur, loader, IndexedJoin('username'), dossier / f"spill_{moteur}")
+    tables = {}
+    for nom, schema in SCHEMAS.items():
+        table = backend.load(dossier / f"{nom}.csv", schema)
+        tables[nom] = backend.clean(table, lambda chunk, fill=FILL[nom]: chunk.fillna(fill))
+    fusion = backend.merge([tables['influencers'], tables['reach'], tables['engagement']], unique=[True, True, False])
+    cumuls = backend.accumulate(MarketAggregates(GROUP_KEYS, VALUE_COLUMNS, CORR_COLUMNS), fusion)
+    backend.reset()
+    return {
+        'lignes': cumuls.rows,
+        'engagement_moyen': cumuls.mean('engagement_rate'),
+        'likes_par_heure': cumuls.group_means('hour', 'likes')
+    }
+
+
+def _mesurer(moteur: str, dossier: Path, memoire_mo: int, bloc: int, resultats):
+    limite = memoire_mo * 2**20
+    resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    debut = time.perf_counter()
+    try:
+        resultat = executer(moteur, dossier, bloc)
+    except MemoryError:
+        resultats.put({'moteur': moteur, 'erreur': 'MemoryError'})
+        return
+    resultat.update({
+        'moteur': moteur,
+        'duree_s': time.perf_counter() - debut,
+        'pic_memoire_mo': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    })
+    resultats.put(resultat)
+
+
+def mesurer(moteur: str, dossier: Path, memoire_mo: int, bloc: int) -> Dict[str, Any]:
+    """Exécute un moteur dans un processus neuf, limité à memoire_mo Mo d'espace d'adressage"""
+    os.environ['ARROW_DEFAULT_MEMORY_POOL'] = 'system'
+    contexte = multiprocessing.get_context('spawn')
+    resultats = contexte.Queue()
+    processus = contexte.Process(target=_mesurer, args=(moteur, dossier, memoire_mo, bloc, resultats))
+    processus.start()
+    processus.join()
+    if processus.exitcode != 0:
+        return {'moteur': moteur, 'erreur': f"code de sortie {processus.exitcode}"}
+    return resultats.get()
+
+
+def main(lignes: int = 20_000_000, memoire_mo: int = 2048, bloc: int = 250_000):
+    with tempfile.TemporaryDirectory() as dossier:
+        dossier = Path(dossier)
+        generer(dossier, lignes)
+        taille = sum(f.stat().st_size for f in dossier.glob('*.csv')) / 2**20
+        print(f"Engagement : {lignes} lignes, CSV : {taille:.0f} Mo, limite mémoire : {memoire_mo} Mo")
+
+        resultats = {}
+        for moteur in ('pandas', 'arrow'):
+            resultat = mesurer(moteur, dossier, memoire_mo, bloc)
+            resultats[moteur] = resultat
+            if 'erreur' in resultat:
+                print(f"{moteur:>6} : échec ({resultat['erreur']})")
+            else:
+                print(f"{moteur:>6} : {resultat['duree_s']:.1f} s, pic {resultat['pic_memoire_mo']:.0f} Mo, "
+                      f"{resultat['lignes']} lignes fusionnées")
+
+        if all('erreur' not in resultat for resultat in resultats.values()):
+            pandas_, arrow = resultats['pandas'], resultats['arrow']
+            identiques = (
+                pandas_['lignes'] == arrow['lignes']
+                and list(pandas_['likes_par_heure']) == list(arrow['likes_par_heure'])
+                and np.allclose(list(pandas_['likes_par_heure'].values()), list(arrow['likes_par_heure'].values()), rtol=1e-12)
+                and np.isclose(pandas_['engagement_moyen'], arrow['engagement_moyen'], rtol=1e-12)
+            )
+            print(f"résultats identiques : {identiques}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=20_000_000)
+    parser.add_argument('--memoire-mo', type=int, default=2048)
+    parser.add_argument('--bloc', type=int, default=250_000)
+    arguments = parser.parse_args()
+    main(arguments.lignes, arguments.memoire_mo, arguments.bloc)
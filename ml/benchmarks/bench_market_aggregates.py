@@ -0,0 +1,99 @@
+"""Benchmark des tendances du marché de DataIntegrationAgent
+
+Compare, sur des données fusionnées synthétiques :
+- avant : un groupby().mean() par clé temporelle, un groupby().agg() par type de
+  contenu, trois moyennes et DataFrame.corr()
+- après : MarketAggregates, un seul passage pour toutes les statistiques
+
+et vérifie que les deux donnent les mêmes valeurs.
+
+    python -m ml.benchmarks.bench_market_aggregates --lignes 10000000
+"""
+from typing import Dict, Any
+import argparse
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from ..utils.multi_aggregation import MarketAggregates
+
+GROUP_KEYS = ['hour', 'day', 'month', 'content_type']
+VALUE_COLUMNS = [
+    'engagement_rate', 'reach_rate', 'likes', 'comments',
+    'followers_growth_rate', 'followers_count', 'following_count'
+]
+CORR_COLUMNS = ['engagement_rate', 'reach_rate', 'followers_count', 'following_count']
+CONTENT_COLUMNS = ['engagement_rate', 'reach_rate', 'likes', 'comments']
+MEAN_COLUMNS = ['engagement_rate', 'reach_rate', 'followers_growth_rate']
+
+
+def generer(lignes: int, seed: int = 0) -> pd.DataFrame:
+    """Données fusionnées avec les dtypes du schéma de l'agent"""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'hour': rng.integers(0, 24, lignes).astype(np.int8),
+        'day': pd.Categorical.from_codes(rng.integers(0, 7, lignes), ['Fri', 'Mon', 'Sat', 'Sun', 'Thu', 'Tue', 'Wed']),
+        'month': pd.Categorical.from_codes(rng.integers(0, 12, lignes), [f"{i:02d}" for i in range(1, 13)]),
+        'content_type': pd.Categorical.from_codes(rng.integers(0, 3, lignes), ['photo', 'reel', 'video']),
+        'engagement_rate': rng.random(lignes).astype(np.float32),
+        'reach_rate': rng.random(lignes).astype(np.float32),
+        'likes': rng.integers(0, 10_000, lignes).astype(np.int32),
+        'comments': rng.integers(0, 500, lignes).astype(np.int32),
+        'followers_growth_rate': rng.random(lignes).astype(np.float32),
+        'followers_count': rng.integers(0, 10_000_000, lignes).astype(np.int32),
+        'following_count': rng.integers(0, 5_000, lignes).astype(np.int32)
+    })
+    data.loc[rng.random(lignes) < 0.05, 'reach_rate'] = np.nan
+    return data
+
+
+def avant(data: pd.DataFrame) -> Dict[str, Any]:
+    resultats = {key: data.groupby(key, observed=True)['engagement_rate'].mean().to_dict() for key in ['hour', 'day', 'month']}
+    resultats['contenu'] = data.groupby('content_type', observed=True).agg({c: 'mean' for c in CONTENT_COLUMNS}).to_dict()
+    resultats['moyennes'] = {column: data[column].mean() for column in MEAN_COLUMNS}
+    resultats['correlations'] = data[CORR_COLUMNS].corr().to_dict()
+    return resultats
+
+
+def apres(data: pd.DataFrame) -> Dict[str, Any]:
+    aggregates = MarketAggregates.from_frame(data, GROUP_KEYS, VALUE_COLUMNS, CORR_COLUMNS)
+    resultats = {key: aggregates.group_means(key, 'engagement_rate') for key in ['hour', 'day', 'month']}
+    resultats['contenu'] = {column: aggregates.group_means('content_type', column) for column in CONTENT_COLUMNS}
+    resultats['moyennes'] = {column: aggregates.mean(column) for column in MEAN_COLUMNS}
+    resultats['correlations'] = aggregates.corr(CORR_COLUMNS)
+    return resultats
+
+
+def ecart_max(a: Any, b: Any) -> float:
+    """Plus grand écart relatif entre deux résultats de même structure"""
+    if isinstance(a, dict):
+        if list(a) != list(b):
+            return math.inf
+        return max((ecart_max(a[k], b[k]) for k in a), default=0.0)
+    if math.isnan(a) and math.isnan(b):
+        return 0.0
+    return abs(a - b) / max(1.0, abs(a))
+
+
+def main(lignes: int = 10_000_000, repetitions: int = 3):
+    data = generer(lignes)
+    print(f"{lignes} lignes, {data.memory_usage(deep=True).sum() / 2**20:.0f} Mo")
+    durees = {}
+    for nom, variante in (('avant', avant), ('apres', apres)):
+        meilleure = math.inf
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            resultat = variante(data)
+            meilleure = min(meilleure, time.perf_counter() - debut)
+        durees[nom] = (meilleure, resultat)
+        print(f"{nom:>6} : {meilleure:.2f} s")
+    print(f"accélération : x{durees['avant'][0] / durees['apres'][0]:.1f}, "
+          f"écart relatif max : {ecart_max(durees['avant'][1], durees['apres'][1]):.1e}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lignes', type=int, default=10_000_000)
+    main(parser.parse_args().lignes)
@@ -0,0 +1,115 @@
+"""Benchmark du replay prioritaire (SumTree) contre le replay uniforme
+
+1. Débit de tirage : batchs de --batch lignes (tirage, poids d'importance et mise à
+   jour des priorités) pour des mémoires de 10k à 10M lignes.
+2. Convergence : régression synthétique où --rares des exemples sont des événements
+   rares (marqueur sur une feature, décalage de la cible, comme un post viral). Même
+   modèle, mêmes données, même nombre de mises à jour : nombre de pas pour que l'erreur
+   sur les événements rares passe sous --seuil, en tirage uniforme et prioritaire.
+
+    python -m ml.benchmarks.bench_prioritized_replay --tailles 10000 1000000 10000000
+"""
+from typing import Dict, List, Optional
+import argparse
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from ..utils.replay_memory import PrioritizedReplayMemory, ReplayMemory
+
+FEATURES = 8
+
+
+def remplir(memoire: ReplayMemory, lignes: int, bloc: int = 1_000_000):
+    """Mémoire remplie de lignes aléatoires ; priorités aléatoires en mode prioritaire"""
+    for debut in range(0, lignes, bloc):
+        taille = min(bloc, lignes - debut)
+        memoire.extend(torch.randn(taille, FEATURES), torch.randn(taille, 1))
+        if isinstance(memoire, PrioritizedReplayMemory):
+            memoire.update_priorities(torch.arange(debut, debut + taille), torch.rand(taille) * 10)
+
+
+def debit(memoire: ReplayMemory, batch: int, repetitions: int) -> float:
+    """Lignes tirées par seconde, mise à jour des priorités comprise"""
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        _, _, indices, _ = memoire.sample_with_weights(batch)
+        memoire.update_priorities(indices, torch.rand(batch))
+    return batch * repetitions / (time.perf_counter() - debut)
+
+
+def donnees(lignes: int, rares: float, poids: np.ndarray, rng: np.random.Generator):
+    """Cible linéaire ; les événements rares portent un marqueur et un décalage de la cible"""
+    x = rng.standard_normal((lignes, FEATURES)).astype(np.float32)
+    rare = rng.random(lignes) < rares
+    x[:, -1] = np.where(rare, 3.0, 0.0)
+    y = x[:, :-1] @ poids + np.where(rare, 4.0 + 2.0 * x[:, 0], 0.0)
+    return torch.from_numpy(x), torch.from_numpy(y.astype(np.float32))[:, None], torch.from_numpy(rare)
+
+
+def convergence(memoire: ReplayMemory, x_test: torch.Tensor, y_test: torch.Tensor, rare_test: torch.Tensor,
+                pas: int, batch: int, seuil: float, seed: int) -> Dict[str, Optional[float]]:
+    torch.manual_seed(seed)
+    modele = nn.Sequential(nn.Linear(FEATURES, 64), nn.ReLU(), nn.Linear(64, 1))
+    optimizer = torch.optim.Adam(modele.parameters(), lr=3e-3)
+    atteint: Optional[int] = None
+    for etape in range(1, pas + 1):
+        features, labels, indices, poids = memoire.sample_with_weights(batch)
+        pertes = (modele(features) - labels).pow(2).squeeze(1)
+        optimizer.zero_grad()
+        (poids * pertes).mean().backward()
+        optimizer.step()
+        memoire.update_priorities(indices, pertes.detach().sqrt())
+        if etape % 50 == 0 and atteint is None:
+            with torch.no_grad():
+                erreur_rare = (modele(x_test[rare_test]) - y_test[rare_test]).pow(2).mean().item()
+            if erreur_rare < seuil:
+                atteint = etape
+    with torch.no_grad():
+        erreurs = (modele(x_test) - y_test).pow(2).squeeze(1)
+    return {
+        'pas_seuil_rares': atteint,
+        'mse_rares': erreurs[rare_test].mean().item(),
+        'mse_courants': erreurs[~rare_test].mean().item()
+    }
+
+
+def main(tailles: List[int], batch: int = 256, repetitions: int = 200, rares: float = 0.01,
+         pas: int = 3000, seuil: float = 0.5, lignes: int = 20_000):
+    print(f"Débit de tirage (batchs de {batch}, mise à jour des priorités comprise)")
+    for taille in tailles:
+        resultats = {}
+        for nom, classe in [('uniforme', ReplayMemory), ('prioritaire', PrioritizedReplayMemory)]:
+            memoire = classe(taille, [f'f{i}' for i in range(FEATURES)], ['y'], seed=0)
+            remplir(memoire, taille)
+            resultats[nom] = debit(memoire, batch, repetitions)
+            del memoire
+        print(f"{taille:>10} lignes : uniforme {resultats['uniforme'] / 1e6:.2f} M lignes/s, "
+              f"prioritaire {resultats['prioritaire'] / 1e6:.2f} M lignes/s")
+
+    rng = np.random.default_rng(0)
+    poids = rng.standard_normal(FEATURES - 1)
+    x, y, rare = donnees(lignes, rares, poids, rng)
+    x_test, y_test, rare_test = donnees(lignes, 0.2, poids, rng)
+    print(f"\nConvergence : {lignes} exemples dont {int(rare.sum())} rares, {pas} pas de {batch // 4}, "
+          f"seuil MSE rares {seuil}")
+    for nom, classe in [('uniforme', ReplayMemory), ('prioritaire', PrioritizedReplayMemory)]:
+        memoire = classe(lignes, [f'f{i}' for i in range(FEATURES)], ['y'], seed=0)
+        memoire.extend(x, y)
+        resultat = convergence(memoire, x_test, y_test, rare_test, pas, batch // 4, seuil, seed=0)
+        pas_seuil = resultat['pas_seuil_rares']
+        print(f"{nom:>12} : seuil {'non atteint' if pas_seuil is None else f'atteint en {pas_seuil} pas'}, "
+              f"MSE rares {resultat['mse_rares']:.3f}, courants {resultat['mse_courants']:.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument('--batch', type=int, default=256)
+    parser.add_argument('--rares', type=float, default=0.01)
+    parser.add_argument('--pas', type=int, default=3000)
+    parser.add_argument('--seuil', type=float, default=0.5)
+    arguments = parser.parse_args()
+    main(arguments.tailles, arguments.batch, rares=arguments.rares, pas=arguments.pas, seuil=arguments.seuil)
@@ -0,0 +1,68 @@
+"""Benchmark de la quantification dynamique int8 des modèles LSTM et MLP (CPU)
+
+Pour chaque modèle : MLP de LightweightLearner (configuration par défaut), tête
+engagement_predictor d'EngagementAnalyzer, LSTMTrendPredictor et EnhancedTrendLSTM.
+Les cibles de validation sont les prédictions float32 bruitées (écart-type --bruit) :
+l'erreur float32 vaut le bruit, l'écart int8 s'y ajoute. Rapporte accélération, réduction
+de taille, dégradation de l'erreur et décision de la barrière de précision.
+
+    python -m ml.benchmarks.bench_quantization --batch 256 --seuil 0.05
+"""
+from typing import Dict, List
+import argparse
+
+import torch
+import torch.nn as nn
+
+from ..core.models import EnhancedTrendLSTM, LSTMTrendPredictor
+from ..utils.quantization import quantize_for_deployment
+
+
+def mlp(tailles: List[int], dropout: float = 0.1) -> nn.Sequential:
+    """MLP construit comme LightweightLearner._create_lightweight_model et engagement_predictor"""
+    couches = []
+    for i in range(len(tailles) - 1):
+        couches.append(nn.Linear(tailles[i], tailles[i + 1]))
+        if i < len(tailles) - 2:
+            couches += [nn.ReLU(), nn.Dropout(dropout)]
+    return nn.Sequential(*couches)
+
+
+def modeles(longueur: int) -> Dict[str, tuple]:
+    """Modèle et forme d'une entrée (sans la dimension batch)"""
+    return {
+        'learner_behavior': (mlp([50, 32, 16, 8]), (50,)),
+        'learner_engagement': (mlp([30, 20, 10, 4]), (30,)),
+        'learner_trends': (mlp([40, 25, 15, 6]), (40,)),
+        'engagement_predictor': (mlp([768 + 100, 512, 256, 1], dropout=0.2), (868,)),
+        'lstm_trend_predictor': (LSTMTrendPredictor(input_size=64), (longueur, 64)),
+        'enhanced_trend_lstm': (EnhancedTrendLSTM(input_size=3), (longueur, 3))
+    }
+
+
+def main(batch: int = 256, longueur: int = 30, bruit: float = 0.1, seuil: float = 0.05):
+    torch.manual_seed(0)
+    print(f"Quantification dynamique int8 (Linear, LSTM), batch {batch}, "
+          f"{torch.get_num_threads()} thread(s), seuil de dégradation {seuil:.0%}")
+    for nom, (modele, forme) in modeles(longueur).items():
+        modele.eval()
+        entrees = torch.randn(batch, *forme)
+        with torch.inference_mode():
+            sorties = modele(entrees)
+            cibles = sorties + bruit * torch.randn_like(sorties)
+        _, rapport = quantize_for_deployment(modele, entrees, cibles, max_degradation=seuil)
+        print(f"{nom:>22} : x{rapport['acceleration']:.2f} "
+              f"({rapport['latence_float32_ms']:.2f} -> {rapport['latence_int8_ms']:.2f} ms), "
+              f"taille {rapport['taille_float32_octets'] / 1024:.0f} -> {rapport['taille_int8_octets'] / 1024:.0f} Ko "
+              f"(-{rapport['reduction_taille']:.0%}), erreur {rapport['degradation']:+.1%} : "
+              f"{'déployé' if rapport['deploy'] else 'refusé'}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch', type=int, default=256)
+    parser.add_argument('--longueur', type=int, default=30)
+    parser.add_argument('--bruit', type=float, default=0.1)
+    parser.add_argument('--seuil', type=float, default=0.05)
+    arguments = parser.parse_args()
+    main(arguments.batch, arguments.longueur, arguments.bruit, arguments.seuil)
@@ -0,0 +1,87 @@
+"""Benchmark de l'inférence d'EnhancedTrendLSTM : eager, TorchScript figé et ONNX
+
+Mesure sur CPU, pour chaque variante :
+- latence : un compte (batch de 1), médiane sur --repetitions appels
+- débit : séquences par seconde sur des batchs de --batch séquences
+et vérifie la parité numérique des variantes exportées avec le mode eager.
+ONNX n'est mesuré que si onnx et onnxruntime sont installés.
+
+    python -m ml.benchmarks.bench_trend_export --batch 256 --longueur 30
+"""
+from typing import Dict, Any, Callable
+from pathlib import Path
+import argparse
+import statistics
+import tempfile
+import time
+
+import torch
+
+from ..core.models import EnhancedTrendLSTM
+from ..utils.model_export import (
+    CompiledPredictor, export_onnx, export_torchscript, ort, prepare_for_inference, validate_parity
+)
+
+
+def mesurer(predire: Callable[[torch.Tensor], torch.Tensor], batch: int, longueur: int,
+            features: int, repetitions: int) -> Dict[str, float]:
+    """Latence d'un appel sur une séquence et débit sur des batchs"""
+    seule = torch.randn(1, longueur, features)
+    lot = torch.randn(batch, longueur, features)
+    with torch.inference_mode():
+        predire(seule)
+        predire(lot)
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            predire(seule)
+            durees.append(time.perf_counter() - debut)
+        debut = time.perf_counter()
+        for _ in range(max(repetitions // 10, 1)):
+            predire(lot)
+        duree_lot = (time.perf_counter() - debut) / max(repetitions // 10, 1)
+    return {
+        'latence_ms': statistics.median(durees) * 1000,
+        'debit_seq_s': batch / duree_lot
+    }
+
+
+def main(batch: int = 256, longueur: int = 30, features: int = 3, repetitions: int = 50):
+    torch.manual_seed(0)
+    modele = EnhancedTrendLSTM(input_size=features)
+    eager = prepare_for_inference(modele)
+    exemple = torch.randn(2, longueur, features)
+    formes = [torch.randn(1, longueur, features), torch.randn(7, longueur // 2, features),
+              torch.randn(batch, longueur, features)]
+
+    variantes: Dict[str, Any] = {'eager': eager}
+    with tempfile.TemporaryDirectory() as dossier:
+        variantes['torchscript'] = CompiledPredictor(export_torchscript(modele, exemple, Path(dossier) / 'trend.pt'))
+        if ort is not None:
+            try:
+                variantes['onnx'] = CompiledPredictor.load(export_onnx(modele, exemple, Path(dossier) / 'trend.onnx'))
+            except Exception as e:
+                print(f"ONNX ignoré : {e}")
+
+        print(f"EnhancedTrendLSTM, séquences {longueur} x {features}, batch {batch}, "
+              f"{torch.get_num_threads()} thread(s)")
+        reference = None
+        for nom, predire in variantes.items():
+            if nom != 'eager':
+                parite = validate_parity(modele, predire, formes)
+                print(f"{nom:>12} : parité {parite['parity']} (écart max {parite['max_abs_error']:.1e})")
+            resultat = mesurer(predire, batch, longueur, features, repetitions)
+            reference = reference or resultat
+            print(f"{nom:>12} : latence {resultat['latence_ms']:.2f} ms "
+                  f"(x{reference['latence_ms'] / resultat['latence_ms']:.2f}), "
+                  f"débit {resultat['debit_seq_s']:.0f} séquences/s "
+                  f"(x{resultat['debit_seq_s'] / reference['debit_seq_s']:.2f})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch', type=int, default=256)
+    parser.add_argument('--longueur', type=int, default=30)
+    parser.add_argument('--repetitions', type=int, default=50)
+    arguments = parser.parse_args()
+    main(arguments.batch, arguments.longueur, repetitions=arguments.repetitions)
@@ -1,17 +1,20 @@
 from typing import Dict, Any, List, Optional, Tuple
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from torch.utils.data import DataLoader, Dataset
 import numpy as np
-from collections import deque
 import logging
 from pathlib import Path
-import random
 import json
 import os
+import weakref
 from datetime import datetime, timedelta
-from instagram_scraper.ml.backup_manager import BackupManager
-from .security_manager import SecurityManager
+from ..utils.backup_manager import BackupManager
+from ..utils.security_manager import SecurityException, SecurityManager
+from ..utils.inference_scheduler import default_scheduler
+from ..utils.quantization import load_quantized, quantize_for_deployment
+from ..utils.replay_memory import PrioritizedReplayMemory, ReplayMemory
 
 class InstagramDataset(Dataset):
     """Dataset optimisé pour les données Instagram"""
@@ -45,8 +48,8 @@ class LightweightLearner:
         # Chargement de la configuration
         self.config = self._load_config(config_path)
         
-        # Gestion mémoire optimisée
-        self.memory = deque(maxlen=self.config['memory_size'])
+        # Mémoires d'expérience préallouées, une par modèle
+        self.memories = self._initialize_memory()
         self.batch_size = self.config['initial_batch_size']
         self.min_batch_size = self.config['min_batch_size']
         self.learning_frequency = self.config['learning_frequency']
@@ -62,12 +65,30 @@ class LightweightLearner:
         self.models = self._initialize_models()
         self.optimizers = self._initialize_optimizers()
         self.schedulers = self._initialize_schedulers()
+        # Mixed precision sur GPU ; sans effet sur CPU
+        self.grad_scaler = torch.amp.GradScaler(self.device.type, enabled=self.device.type == 'cuda')
+        
+        # Modèles servis en inférence : version int8 acceptée par quantize_models (relue
+        # depuis checkpoints/<nom>_int8.pt au démarrage si elle vient des poids chargés,
+        # retirée dès que le modèle est entraîné), sinon copie float32 d'inférence,
+        # déclarés au scheduler partagé qui regroupe les requêtes concurrentes en batchs
+        self.scheduler = default_scheduler()
+        self.scheduler_prefix = f"lightweight_learner-{id(self):x}."
+        self.quantized_models: Dict[str, nn.Module] = {}
+        self.inference_models: Dict[str, nn.Module] = {}
+        self._load_quantized_models("checkpoints")
+        self._refresh_inference_models()
+        # Files du scheduler retirées par close(), ou quand le learner est détruit
+        self._unregister_models = weakref.finalize(
+            self, self.scheduler.unregister_models, list(self.models), self.scheduler_prefix
+        )
         
         self.backup_manager = BackupManager()
         self.last_backup = datetime.now()
         self.backup_frequency = timedelta(hours=1)  # Configurable
         
         self.security_manager = SecurityManager()
+        self.learn = self.security_manager.monitor_execution(self.learn)
         
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Charge la configuration avec valeurs par défaut"""
@@ -76,6 +97,7 @@ class LightweightLearner:
             'initial_batch_size': 32,
             'min_batch_size': 8,
             'learning_frequency': 100,
+            'prioritized_replay': False,
             'model_configs': {
                 'behavior': {'input_size': 50, 'hidden_sizes': [32, 16], 'output_size': 8},
                 'engagement': {'input_size': 30, 'hidden_sizes': [20, 10], 'output_size': 4},
@@ -96,6 +118,33 @@ class LightweightLearner:
             self.logger.warning(f"Could not load config: {e}. Using defaults.")
             return default_config
             
+    def _initialize_memory(self) -> Dict[str, ReplayMemory]:
+        """Une mémoire d'expérience par modèle
+        
+        Une ligne de features (et de labels) par exemple, restreinte aux colonnes du modèle
+        ('features' et 'labels' de sa configuration, toutes par défaut). En mode prioritaire,
+        chaque modèle a son propre arbre de priorités : les exemples à forte perte pour ce
+        modèle (événements rares) sont rejoués plus souvent, sans déplacer le tirage des autres.
+        """
+        feature_names = list(self.config.get('feature_configs', {}))
+        label_names = self.config.get('label_names', [])
+        memories = {}
+        for model_name, config in self.config['model_configs'].items():
+            memory_args = (
+                self.config['memory_size'],
+                config.get('features', feature_names),
+                config.get('labels', label_names)
+            )
+            if self.config.get('prioritized_replay', False):
+                memories[model_name] = PrioritizedReplayMemory(
+                    *memory_args, device=self.device,
+                    alpha=self.config.get('priority_alpha', 0.6),
+                    beta=self.config.get('priority_beta', 0.4)
+                )
+            else:
+                memories[model_name] = ReplayMemory(*memory_args, device=self.device)
+        return memories
+        
     def _initialize_models(self) -> Dict[str, nn.Module]:
         """Initialise les modèles avec chargement des checkpoints"""
         models = {}
@@ -127,17 +176,31 @@ class LightweightLearner:
                 
         return nn.Sequential(*layers).to(self.device)
         
-    def _preprocess_data(self, data: Dict[str, Any]) -> Dict[str, torch.Tensor]:
-        """Prétraite les données pour l'apprentissage"""
-        processed = {}
+    def _preprocess_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Tuple[torch.Tensor, torch.Tensor]]]:
+        """Prétraite les données pour l'apprentissage : par modèle, ligne de features normalisées et labels
+        
+        Un exemple sans tous les labels d'un modèle n'est pas stocké pour ce modèle (il ne
+        peut pas lui servir de cible) ; les labels manquants sont nommés dans le log.
+        """
         try:
             # Extraction et normalisation des features
-            for feature_name, config in self.config['feature_configs'].items():
-                value = data.get(feature_name, config['default'])
-                normalized = (value - config['mean']) / config['std']
-                processed[feature_name] = torch.tensor([normalized], dtype=torch.float16)
-                
-            return processed
+            normalized = {
+                feature_name: (data.get(feature_name, config['default']) - config['mean']) / config['std']
+                for feature_name, config in self.config['feature_configs'].items()
+            }
+            rows = {}
+            for model_name, memory in self.memories.items():
+                missing = [label_name for label_name in memory.label_names if label_name not in data]
+                if missing:
+                    self.logger.warning(f"Missing labels {missing}, sample not stored for {model_name}")
+                    continue
+                # Dans l'ordre des colonnes de la mémoire du modèle
+                rows[model_name] = (
+                    torch.tensor([normalized[feature_name] for feature_name in memory.feature_names],
+                                 dtype=torch.float32),
+                    torch.tensor([data[label_name] for label_name in memory.label_names], dtype=torch.float32)
+                )
+            return rows
             
         except Exception as e:
             self.logger.error(f"Preprocessing error: {e}")
@@ -164,7 +227,6 @@ class LightweightLearner:
             self.logger.error(f"Resource check error: {e}")
             return False
         
-    @SecurityManager.monitor_execution
     def learn(self, data: Dict[str, Any]) -> Dict[str, float]:
         """Apprentissage sécurisé et optimisé"""
         try:
@@ -173,24 +235,31 @@ class LightweightLearner:
             if validated_data is None:
                 return {'status': 'error', 'reason': 'security_validation_failed'}
                 
-            # Vérifie si l'apprentissage est nécessaire
-            if not self._should_learn():
-                return {'status': 'skipped', 'reason': 'learning_frequency'}
-                
             # Préparation des données avec gestion mémoire
             processed_data = self._preprocess_data(validated_data)
             self._update_memory(processed_data)
             
-            # Apprentissage par lots avec monitoring ressources
+            # Apprentissage par lots avec monitoring ressources, pour les modèles dont c'est le tour
             metrics = {}
-            with torch.cuda.amp.autocast():  # Mixed precision pour optimiser VRAM
-                for model_name, model in self.models.items():
-                    if self._has_enough_resources(model_name):
-                        batch = self._get_optimized_batch(model_name)
-                        metrics[model_name] = self._train_model(model, batch)
-                    else:
-                        self.logger.warning(f"Skipping {model_name} due to resource constraints")
+            for model_name in self.models:
+                if not self._should_learn(model_name):
+                    continue
+                if self._has_enough_resources(model_name):
+                    metrics[model_name] = self._replay_step(model_name)
+                else:
+                    self.logger.warning(f"Skipping {model_name} due to resource constraints")
+            if not metrics:
+                return {'status': 'skipped', 'reason': 'learning_frequency'}
                         
+            # Les copies d'inférence float32 suivent les poids mis à jour ; l'int8 accepté
+            # d'un modèle entraîné ne correspond plus à ses poids : il n'est plus servi
+            trained = [name for name, result in metrics.items() if result and 'loss' in result]
+            for name in trained:
+                if self.quantized_models.pop(name, None) is not None:
+                    self.logger.info(f"{name}: int8 retiré après entraînement, float32 servi")
+            if trained:
+                self._refresh_inference_models(trained)
+                
             # Vérifie si un backup est nécessaire
             self._handle_auto_backup()
             
@@ -204,39 +273,68 @@ class LightweightLearner:
             self._handle_security_exception(e)
             return {'status': 'error', 'reason': 'security_exception'}
             
-    def _should_learn(self) -> bool:
-        """Détermine si l'apprentissage est nécessaire"""
-        memory_usage = torch.cuda.memory_allocated() / torch.cuda.max_memory_allocated()
+    def _should_learn(self, model_name: str) -> bool:
+        """Détermine si l'apprentissage de model_name est nécessaire"""
+        memory = self.memories[model_name]
+        memory_usage = 0.0
+        if torch.cuda.is_available() and torch.cuda.max_memory_allocated():
+            memory_usage = torch.cuda.memory_allocated() / torch.cuda.max_memory_allocated()
         return (
-            len(self.memory) >= self.batch_size and
-            len(self.memory) % self.learning_frequency == 0 and
+            len(memory) >= self.batch_size and
+            memory.inserted % self.learning_frequency == 0 and
             memory_usage < 0.8  # Garde 20% VRAM libre
         )
         
-    def _get_optimized_batch(self, model_name: str) -> torch.Tensor:
-        """Prépare un batch optimisé pour la mémoire"""
-        batch = random.sample(self.memory, self.batch_size)
+    def _replay_step(self, model_name: str) -> Dict[str, Any]:
+        """Un pas d'apprentissage de model_name sur un batch tiré dans sa mémoire
+        
+        Les priorités des exemples rejoués suivent leur nouvelle perte pour ce modèle.
+        """
+        batch, labels, indices, weights = self._get_optimized_batch(model_name)
+        metrics = self._train_model(model_name, batch, labels, weights)
+        if metrics and 'sample_losses' in metrics:
+            self.memories[model_name].update_priorities(indices, metrics.pop('sample_losses'))
+        return metrics
         
-        # Utilise torch.float16 pour réduire utilisation mémoire
-        return torch.tensor(batch, dtype=torch.float16).to(self.device)
+    def _get_optimized_batch(self, model_name: str) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Prépare un batch optimisé pour la mémoire
         
-    def _train_model(self, model: nn.Module, batch: torch.Tensor) -> Dict[str, float]:
-        """Entraînement optimisé d'un modèle"""
+        Lignes (features et labels) tirées directement dans la mémoire (déjà sur le device) ;
+        autocast se charge de la demi-précision pendant le calcul. Rend aussi leurs positions
+        et leurs poids d'importance (unitaires en tirage uniforme).
+        """
+        return self.memories[model_name].sample_with_weights(self.batch_size)
+        
+    def _train_model(self, model_name: str, batch: torch.Tensor, labels: torch.Tensor,
+                     weights: Optional[torch.Tensor] = None) -> Dict[str, Any]:
+        """Entraînement optimisé d'un modèle (un pas de son optimizer)
+        
+        Perte : erreur quadratique des prédictions contre les labels tirés avec le batch.
+        Avec des poids d'importance (replay prioritaire), la perte de chaque exemple est
+        pondérée ; les pertes par exemple sont rendues pour mettre à jour les priorités.
+        """
         try:
             # Libère la mémoire cache
             torch.cuda.empty_cache()
             
-            # Gradient scaler pour mixed precision
-            scaler = torch.cuda.amp.GradScaler()
+            model, optimizer = self.models[model_name], self.optimizers[model_name]
+            model.train()
+            optimizer.zero_grad(set_to_none=True)
             
-            with torch.cuda.amp.autocast():
-                loss = model(batch)
+            # Mixed precision pour optimiser VRAM ; la perte est calculée en float32
+            with torch.autocast(self.device.type, enabled=self.device.type == 'cuda'):
+                outputs = model(batch)
+                
+            losses = F.mse_loss(outputs.float().reshape(labels.shape), labels, reduction='none')
+            sample_losses = losses.reshape(len(batch), -1).mean(dim=1)
+            loss = (sample_losses if weights is None else weights * sample_losses).mean()
                 
-            scaler.scale(loss).backward()
-            scaler.step(model.optimizer)
-            scaler.update()
+            self.grad_scaler.scale(loss).backward()
+            self.grad_scaler.step(optimizer)
+            self.grad_scaler.update()
+            self.stats['training_iterations'] += 1
             
-            return {'loss': loss.item()}
+            return {'loss': loss.item(), 'sample_losses': sample_losses.detach()}
             
         except RuntimeError as e:
             if "out of memory" in str(e):
@@ -269,74 +367,40 @@ class LightweightLearner:
             for name, optimizer in self.optimizers.items()
         }
         
-    def _update_memory(self, data: Optional[Dict[str, torch.Tensor]]) -> None:
-        """Met à jour la mémoire d'expérience avec gestion des erreurs"""
+    def _update_memory(self, data: Optional[Dict[str, Tuple[torch.Tensor, torch.Tensor]]]) -> None:
+        """Met à jour les mémoires d'expérience avec gestion des erreurs"""
         if data is None:
             self.logger.warning("Skipping memory update due to invalid data")
             return
             
         try:
-            # Vérifie la validité des données
-            if self._validate_data(data):
-                self.memory.append(data)
-                
-                # Nettoyage périodique de la mémoire
-                if len(self.memory) % 1000 == 0:
-                    self._cleanup_memory()
+            # Validation à l'insertion (forme, valeurs finies) : la mémoire ne contient
+            # que des lignes valides, aucun nettoyage ultérieur n'est nécessaire
+            for model_name, row in data.items():
+                if not self.memories[model_name].add(*row):
+                    self.logger.warning(f"Invalid features or labels, sample not stored for {model_name}")
                     
         except Exception as e:
             self.logger.error(f"Memory update error: {e}")
             
-    def _validate_data(self, data: Dict[str, torch.Tensor]) -> bool:
-        """Valide les données avant stockage"""
-        try:
-            required_features = set(self.config['feature_configs'].keys())
-            data_features = set(data.keys())
-            
-            # Vérifie les features requises
-            if not required_features.issubset(data_features):
-                missing = required_features - data_features
-                self.logger.warning(f"Missing required features: {missing}")
-                return False
-                
-            # Vérifie les valeurs
-            for feature, tensor in data.items():
-                if not torch.isfinite(tensor).all():
-                    self.logger.warning(f"Invalid values in feature {feature}")
-                    return False
-                    
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Data validation error: {e}")
-            return False
-            
-    def _cleanup_memory(self) -> None:
-        """Nettoie la mémoire des données obsolètes ou invalides"""
-        try:
-            valid_data = []
-            for data in self.memory:
-                if self._validate_data(data):
-                    valid_data.append(data)
-                    
-            self.memory = deque(valid_data, maxlen=self.config['memory_size'])
-            
-        except Exception as e:
-            self.logger.error(f"Memory cleanup error: {e}")
-            
     def _get_memory_stats(self) -> Dict[str, Any]:
         """Récupère les statistiques d'utilisation mémoire"""
         try:
+            # Remplissage de la mémoire de chaque modèle
+            memory_usage = {name: len(memory) / memory.capacity for name, memory in self.memories.items()}
+            memory_bytes = sum(memory.nbytes for memory in self.memories.values())
             if torch.cuda.is_available():
                 return {
                     'allocated': torch.cuda.memory_allocated(),
                     'reserved': torch.cuda.memory_reserved(),
                     'max_allocated': torch.cuda.max_memory_allocated(),
-                    'memory_usage': len(self.memory) / self.config['memory_size'],
+                    'memory_usage': memory_usage,
+                    'memory_bytes': memory_bytes,
                     'batch_size': self.batch_size
                 }
             return {
-                'memory_usage': len(self.memory) / self.config['memory_size'],
+                'memory_usage': memory_usage,
+                'memory_bytes': memory_bytes,
                 'batch_size': self.batch_size
             }
         except Exception as e:
@@ -387,12 +451,83 @@ class LightweightLearner:
                     success = False
                     self.logger.warning(f"No checkpoint found for {name}")
                     
+            self._load_quantized_models(path)
+            self._refresh_inference_models()
             return success
             
         except Exception as e:
             self.logger.error(f"Error loading state: {e}")
             return False 
 
+    def quantize_models(self, validation: Dict[str, Tuple[torch.Tensor, torch.Tensor]],
+                        path: str = "checkpoints", max_degradation: float = 0.05) -> Dict[str, Dict[str, Any]]:
+        """Versions int8 des modèles pour l'inférence CPU, retenues si la précision tient
+        
+        validation : (entrées, cibles) par nom de modèle. Un modèle int8 n'est accepté que
+        s'il tient la précision et s'il est plus rapide que le float32 ; il est alors écrit
+        dans <path>/<nom>_int8.pt (relu au démarrage) et servi par predict. Un modèle refusé
+        retire son ancien checkpoint int8 : le float32 est servi.
+        """
+        reports = {}
+        for name, (inputs, targets) in validation.items():
+            try:
+                checkpoint_path = os.path.join(path, f"{name}_int8.pt")
+                deployed, reports[name] = quantize_for_deployment(
+                    self.models[name], inputs.float().cpu(), targets.float().cpu(),
+                    path=checkpoint_path, max_degradation=max_degradation, min_acceleration=1.0
+                )
+                if reports[name]['deploy']:
+                    self.quantized_models[name] = deployed
+                else:
+                    self.quantized_models.pop(name, None)
+                    if os.path.exists(checkpoint_path):
+                        os.remove(checkpoint_path)
+                self._refresh_inference_models([name])
+                self.logger.info(
+                    f"{name}: int8 {'accepté' if reports[name]['deploy'] else 'refusé'} "
+                    f"(x{reports[name]['acceleration']:.2f}, "
+                    f"-{reports[name]['reduction_taille']:.0%} de taille)"
+                )
+            except Exception as e:
+                self.logger.error(f"Error quantizing {name}: {e}")
+        return reports
+
+    def predict(self, model_name: str, features: torch.Tensor) -> torch.Tensor:
+        """Prédiction d'un exemple (sans dimension batch) par le modèle servi pour model_name
+
+        La requête passe par le scheduler partagé : elle est regroupée en batch avec les
+        requêtes concurrentes sur le même modèle.
+        """
+        return self.scheduler.predict(self.scheduler_prefix + model_name,
+                                      torch.as_tensor(features, dtype=torch.float32).cpu())
+
+    def close(self):
+        """Retire les modèles du learner du scheduler partagé (predict n'est plus disponible)"""
+        self._unregister_models()
+
+    def _load_quantized_models(self, path: str):
+        """Relit les modèles int8 acceptés (<path>/<nom>_int8.pt) écrits par quantize_models
+
+        Un checkpoint int8 construit à partir d'autres poids que le float32 chargé (empreinte
+        différente, par exemple après un entraînement sauvegardé depuis) est refusé.
+        """
+        for name, model in self.models.items():
+            checkpoint_path = os.path.join(path, f"{name}_int8.pt")
+            self.quantized_models.pop(name, None)
+            if os.path.exists(checkpoint_path):
+                try:
+                    self.quantized_models[name] = load_quantized(model, checkpoint_path)
+                    self.logger.info(f"Loaded int8 checkpoint for {name}")
+                except Exception as e:
+                    self.logger.error(f"Error loading int8 checkpoint for {name}: {e}")
+
+    def _refresh_inference_models(self, names: Optional[List[str]] = None):
+        """Modèles servis : l'int8 accepté, sinon une copie d'inférence des poids float32 courants"""
+        for name in names or list(self.models):
+            self.inference_models[name] = self.scheduler.register(
+                self.scheduler_prefix + name, self.quantized_models.get(name, self.models[name])
+            )
+
     def _handle_auto_backup(self):
         """Gère les backups automatiques"""
         if datetime.now() - self.last_backup > self.backup_frequency:
@@ -413,7 +548,7 @@ class LightweightLearner:
             'schedulers': {name: sched.state_dict() for name, sched in self.schedulers.items()},
             'config': self.config,
             'stats': self.stats,
-            'memory': list(self.memory),
+            'memories': {name: memory.state_dict() for name, memory in self.memories.items()},
             'version': '1.0.0', 
             'timestamp': datetime.now().isoformat()
         } 
\ No newline at end of file
@@ -1,7 +1,7 @@
 # Standard library imports
 import logging
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Tuple
 
 # Third-party imports
 import pandas as pd
@@ -18,8 +18,14 @@ import math
 
 # Local imports
 from utils.translation import FrenchTranslator
+from ..utils.batched_inference import padded_batches, padding_mask
+from ..utils.inference_scheduler import ScheduledModel
+from ..utils.lazy_frame import LazyFrame
+from ..utils.model_export import CompiledPredictor, export_torchscript, validate_parity
+from ..utils.sequence_windows import sequence_tensors
+from ..utils.tabular_training import NormalizationTransform, TabularTrainer
 
-class InstagramContentEncoder(nn.Module):
+class InstagramContentEncoder(nn.Module, ScheduledModel):
     def __init__(self, input_size=10, hidden_size=128, num_classes=1):
         super().__init__()
         self.logger = logging.getLogger(__name__)
@@ -37,75 +43,73 @@ class InstagramContentEncoder(nn.Module):
         # Move model to GPU if available
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.to(self.device)
+
+        # Normalisation des features apprise à l'entraînement
+        self.normalization: Optional[NormalizationTransform] = None
         
     def forward(self, x):
         return self.feature_encoder(x)
 
-    def train(self, data, epochs=10, batch_size=32):
-        """Entraîne le modèle sur les données fournies"""
-        self.logger.info(f"Démarrage de l'entraînement sur {len(data)} échantillons...")
-        
+    def train(self, data=True, epochs=10, batch_size=32, **options):
+        """Entraîne le modèle sur les données fournies
+
+        data : DataFrame pandas, ou LazyFrame du cache colonnaire (lue bloc par bloc).
+        Avec un booléen, bascule le mode entraînement/évaluation comme nn.Module.train.
+        options : paramètres de TabularTrainer (validation_split, patience, num_workers...).
+        """
+        if isinstance(data, bool):
+            return super().train(data)
+        if not isinstance(data, (pd.DataFrame, LazyFrame)):
+            raise ValueError("Les données doivent être un DataFrame pandas ou une LazyFrame")
+        taille = f"{len(data)} échantillons" if isinstance(data, pd.DataFrame) else "un flux d'échantillons"
+        self.logger.info(f"Démarrage de l'entraînement sur {taille}...")
+
         try:
-            # Configuration de l'optimiseur
-            optimizer = torch.optim.Adam(self.parameters())
-            criterion = nn.MSELoss()
-            
-            if isinstance(data, pd.DataFrame):
-                # Conversion en tenseurs
-                features = torch.tensor(data.values, dtype=torch.float32)
-                targets = torch.tensor(data['engagement_rate'].values, dtype=torch.float32).reshape(-1, 1)
-                
-                # Normalisation des features
-                features_mean = features.mean(dim=0)
-                features_std = features.std(dim=0)
-                features = (features - features_mean) / (features_std + 1e-8)
-                
-                # Création des mini-batches
-                n_samples = len(data)
-                n_batches = (n_samples + batch_size - 1) // batch_size
-                
-                # Boucle d'entraînement
-                for epoch in range(epochs):
-                    total_loss = 0
-                    
-                    for i in range(n_batches):
-                        start_idx = i * batch_size
-                        end_idx = min((i + 1) * batch_size, n_samples)
-                        
-                        batch_features = features[start_idx:end_idx].to(self.device)
-                        batch_targets = targets[start_idx:end_idx].to(self.device)
-                        
-                        # Forward pass
-                        outputs = self.forward(batch_features)
-                        loss = criterion(outputs, batch_targets)
-                        
-                        # Backward pass
-                        optimizer.zero_grad()
-                        loss.backward()
-                        optimizer.step()
-                        
-                        total_loss += loss.item()
-                    
-                    avg_loss = total_loss / n_batches
-                    self.logger.info(f"Epoch {epoch+1}/{epochs}, Loss moyenne: {avg_loss:.4f}")
-            else:
-                raise ValueError("Les données doivent être un DataFrame pandas")
-                
+            trainer = TabularTrainer(self, batch_size=batch_size, device=self.device, **options)
+            # Les statistiques d'une normalisation déjà apprise sont reprises
+            report = trainer.fit(data, epochs=epochs, normalization=self.normalization)
+            self.normalization = trainer.normalization
+            return report
         except Exception as e:
             self.logger.error(f"Erreur pendant l'entraînement: {e}")
             raise
 
+    def predict(self, data: pd.DataFrame) -> torch.Tensor:
+        """Prédictions sur des lignes brutes, normalisées comme à l'entraînement"""
+        if self.normalization is None:
+            raise RuntimeError("Normalisation absente : entraîner le modèle (fit) ou le recharger (load) "
+                               "avec son fichier .normalization.json avant predict")
+        values = data[self.normalization.columns].to_numpy(dtype='float64')
+        super().train(False)
+        with torch.no_grad():
+            return self(torch.from_numpy(self.normalization.transform(values)).to(self.device)).cpu()
+
     def save(self, path):
-        """Sauvegarde le modèle"""
+        """Sauvegarde le modèle (et sa normalisation, à côté : <path>.normalization.json)"""
         try:
             Path(path).parent.mkdir(exist_ok=True)
             torch.save(self.state_dict(), path)
+            if self.normalization is not None:
+                self.normalization.save(self._normalization_path(path))
             self.logger.info(f"Modèle sauvegardé: {path}")
         except Exception as e:
             self.logger.error(f"Erreur lors de la sauvegarde: {e}")
             raise
 
-class LSTMTrendPredictor(nn.Module):
+    def load(self, path):
+        """Recharge les poids et la normalisation écrits par save()"""
+        self.load_state_dict(torch.load(path, map_location=self.device))
+        normalization_path = self._normalization_path(path)
+        if normalization_path.exists():
+            self.normalization = NormalizationTransform.load(normalization_path)
+        return self
+
+    @staticmethod
+    def _normalization_path(path) -> Path:
+        path = Path(path)
+        return path.with_name(path.name + '.normalization.json')
+
+class LSTMTrendPredictor(nn.Module, ScheduledModel):
     def __init__(self, input_size=64, hidden_size=128):
         super().__init__()
         self.lstm = nn.LSTM(input_size, hidden_size, batch_first=True)
@@ -126,7 +130,7 @@ class LSTMTrendPredictor(nn.Module):
         # Prédiction finale
         return self.fc(last_out)
 
-class EnhancedTrendLSTM(nn.Module):
+class EnhancedTrendLSTM(nn.Module, ScheduledModel):
     def __init__(self, input_size, hidden_size=128):
         super(EnhancedTrendLSTM, self).__init__()
         self.hidden_size = hidden_size
@@ -243,6 +247,26 @@ class EnhancedTrendLSTM(nn.Module):
         
         return out.squeeze(-1)
 
+    def export_inference(self, path=None, sequence_length=30):
+        """Copie TorchScript figée pour l'inférence, validée contre le mode eager
+        
+        Le batch et la longueur de séquence restent dynamiques ; le modèle exporté
+        est écrit dans path s'il est donné (relu avec CompiledPredictor.load).
+        """
+        features = self.batch_norm1.num_features
+        example = torch.randn(2, sequence_length, features)
+        predictor = CompiledPredictor(export_torchscript(self, example, path))
+        
+        # Parité sur d'autres formes que l'exemple tracé
+        validation = validate_parity(self, predictor, [
+            example,
+            torch.randn(1, max(sequence_length // 2, 1), features),
+            torch.randn(16, sequence_length * 2, features)
+        ])
+        if not validation['parity']:
+            raise ValueError(f"Modèle exporté différent du mode eager (écart {validation['max_abs_error']:.2e})")
+        return predictor
+
     def fit(self, data, epochs=20, batch_size=64):
         """Entraîne le modèle sur les données fournies"""
         self.logger.info(f"Démarrage de l'entraînement sur {len(data)} séquences...")
@@ -267,16 +291,12 @@ class EnhancedTrendLSTM(nn.Module):
                 std = sequence_data.std(axis=0)
                 sequence_data = (sequence_data - mean) / (std + 1e-8)
                 
-                # Création des séquences
-                X, y = [], []
+                # Création des séquences (fenêtres glissantes vectorisées)
                 sequence_length = 10  # Réduit à 10 pour l'exemple
                 
-                for i in range(len(sequence_data) - sequence_length):
-                    X.append(sequence_data[i:i+sequence_length])
-                    y.append(sequence_data[i+sequence_length, 0])  # Prédiction du taux d'engagement
-                
-                X = torch.FloatTensor(X)
-                y = torch.FloatTensor(y).reshape(-1, 1)
+                # Cible : taux d'engagement du post qui suit chaque fenêtre
+                X, y = sequence_tensors(sequence_data, sequence_length, target_column=0)
+                y = y.reshape(-1, 1)
                 
                 # Entraînement
                 n_samples = len(X)
@@ -312,12 +332,37 @@ class EnhancedTrendLSTM(nn.Module):
             self.logger.error(f"Erreur pendant l'entraînement: {e}")
             raise 
 
+class CompactTrendGRU(nn.Module, ScheduledModel):
+    """Modèle de tendance léger, distillé d'EnhancedTrendLSTM (voir ml.utils.distillation)
+    
+    Un GRU d'une couche ; la tête rend la prédiction et sa log-variance, estimation de
+    l'écart avec le modèle complet utilisée pour décider de l'escalade.
+    """
+    def __init__(self, input_size, hidden_size=32):
+        super(CompactTrendGRU, self).__init__()
+        self.batch_norm = nn.BatchNorm1d(input_size)
+        self.gru = nn.GRU(input_size, hidden_size, batch_first=True)
+        self.head = nn.Linear(hidden_size, 2)
+    
+    def forward(self, x):
+        return self.predict_with_uncertainty(x)[0]
+    
+    def predict_with_uncertainty(self, x):
+        """Prédiction et log-variance (batch) de chaque séquence"""
+        if len(x.shape) == 2:
+            x = x.unsqueeze(1)
+        x = self.batch_norm(x.transpose(1, 2)).transpose(1, 2)
+        _, hidden = self.gru(x)
+        out = self.head(hidden[-1])
+        return out[:, 0], out[:, 1]
+
 class PositionalEncoding(nn.Module):
     """Inject information about the relative or absolute position of tokens in sequence."""
     
-    def __init__(self, d_model: int, dropout: float = 0.1, max_len: int = 5000):
+    def __init__(self, d_model: int, dropout: float = 0.1, max_len: int = 5000, batch_first: bool = False):
         super().__init__()
         self.dropout = nn.Dropout(p=dropout)
+        self.batch_first = batch_first
 
         position = torch.arange(max_len).unsqueeze(1)
         div_term = torch.exp(torch.arange(0, d_model, 2) * (-math.log(10000.0) / d_model))
@@ -330,11 +375,128 @@ class PositionalEncoding(nn.Module):
         """
         Args:
             x: Tensor, shape [seq_len, batch_size, embedding_dim]
+               ([batch_size, seq_len, embedding_dim] if batch_first)
         """
-        x = x + self.pe[:x.size(0)]
+        if self.batch_first:
+            x = x + self.pe[:x.size(1)].transpose(0, 1)
+        else:
+            x = x + self.pe[:x.size(0)]
         return self.dropout(x)
 
-class TransformerModel(nn.Module):
+class SpeechSelfAttention(nn.Module):
+    """Multi-head self-attention computed with F.scaled_dot_product_attention.
+    
+    Parameter names match nn.MultiheadAttention (in_proj_weight, in_proj_bias, out_proj),
+    so checkpoints of the former nn.TransformerEncoder still load.
+    """
+    
+    def __init__(self, d_model: int, num_heads: int, dropout: float = 0.1):
+        super().__init__()
+        self.num_heads = num_heads
+        self.dropout = dropout
+        self.in_proj_weight = nn.Parameter(torch.empty(3 * d_model, d_model))
+        self.in_proj_bias = nn.Parameter(torch.zeros(3 * d_model))
+        self.out_proj = nn.Linear(d_model, d_model)
+        nn.init.xavier_uniform_(self.in_proj_weight)
+        nn.init.constant_(self.out_proj.bias, 0.0)
+    
+    def forward(
+        self,
+        x: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+        is_causal: bool = False
+    ) -> torch.Tensor:
+        batch_size, seq_len, d_model = x.shape
+        qkv = F.linear(x, self.in_proj_weight, self.in_proj_bias)
+        qkv = qkv.view(batch_size, seq_len, 3, self.num_heads, d_model // self.num_heads).permute(2, 0, 3, 1, 4)
+        # Without a mask (batch of equal lengths) the flash kernel can be used,
+        # with a boolean mask the memory-efficient one: no seq_len x seq_len scores
+        out = F.scaled_dot_product_attention(
+            qkv[0], qkv[1], qkv[2],
+            attn_mask=attn_mask,
+            dropout_p=self.dropout if self.training else 0.0,
+            is_causal=is_causal
+        )
+        return self.out_proj(out.transpose(1, 2).reshape(batch_size, seq_len, d_model))
+
+class SpeechEncoderLayer(nn.Module):
+    """Post-norm encoder layer, same computation and parameters as nn.TransformerEncoderLayer."""
+    
+    def __init__(self, d_model: int, num_heads: int, d_ff: int = 2048, dropout: float = 0.1):
+        super().__init__()
+        self.self_attn = SpeechSelfAttention(d_model, num_heads, dropout)
+        self.linear1 = nn.Linear(d_model, d_ff)
+        self.dropout = nn.Dropout(dropout)
+        self.linear2 = nn.Linear(d_ff, d_model)
+        self.norm1 = nn.LayerNorm(d_model)
+        self.norm2 = nn.LayerNorm(d_model)
+        self.dropout1 = nn.Dropout(dropout)
+        self.dropout2 = nn.Dropout(dropout)
+    
+    def forward(
+        self,
+        x: torch.Tensor,
+        attn_mask: Optional[torch.Tensor] = None,
+        is_causal: bool = False
+    ) -> torch.Tensor:
+        x = self.norm1(x + self.dropout1(self.self_attn(x, attn_mask, is_causal)))
+        return self.norm2(x + self.dropout2(self.linear2(self.dropout(F.relu(self.linear1(x))))))
+
+class SpeechEncoder(nn.Module):
+    """Stack of SpeechEncoderLayer with the nn.TransformerEncoder interface."""
+    
+    def __init__(self, d_model: int, num_heads: int, num_layers: int, d_ff: int, dropout: float):
+        super().__init__()
+        self.layers = nn.ModuleList([
+            SpeechEncoderLayer(d_model, num_heads, d_ff, dropout)
+            for _ in range(num_layers)
+        ])
+    
+    def forward(
+        self,
+        x: torch.Tensor,
+        mask: Optional[torch.Tensor] = None,
+        src_key_padding_mask: Optional[torch.Tensor] = None,
+        is_causal: bool = False
+    ) -> torch.Tensor:
+        attn_mask, is_causal = self._attention_mask(x.size(1), mask, src_key_padding_mask, is_causal, x.device)
+        for layer in self.layers:
+            x = layer(x, attn_mask, is_causal)
+        return x
+    
+    @staticmethod
+    def _attention_mask(
+        seq_len: int,
+        mask: Optional[torch.Tensor],
+        src_key_padding_mask: Optional[torch.Tensor],
+        is_causal: bool,
+        device: torch.device
+    ) -> Tuple[Optional[torch.Tensor], bool]:
+        """Single mask for scaled_dot_product_attention (True = attend, or additive float).
+        
+        Masks follow the nn.Transformer convention: True (or -inf) marks what is not attended.
+        """
+        if mask is None and src_key_padding_mask is None:
+            return None, is_causal
+        attn_mask = None
+        if mask is not None:
+            attn_mask = ~mask if mask.dtype == torch.bool else mask
+        if is_causal:
+            causal = torch.ones(seq_len, seq_len, dtype=torch.bool, device=device).tril()
+            attn_mask = causal if attn_mask is None else (
+                attn_mask & causal if attn_mask.dtype == torch.bool
+                else attn_mask.masked_fill(~causal, float('-inf'))
+            )
+        if src_key_padding_mask is not None:
+            # [batch, 1 (heads), 1 (queries), keys]
+            keys = ~src_key_padding_mask.bool()[:, None, None, :]
+            attn_mask = keys if attn_mask is None else (
+                attn_mask & keys if attn_mask.dtype == torch.bool
+                else attn_mask.masked_fill(~keys, float('-inf'))
+            )
+        return attn_mask, False
+
+class TransformerModel(nn.Module, ScheduledModel):
     """Transformer model for speech recognition."""
     
     def __init__(
@@ -351,19 +513,15 @@ class TransformerModel(nn.Module):
         
         # Feature processing
         self.feature_proj = nn.Linear(input_dim, d_model)
-        self.pos_encoder = PositionalEncoding(d_model, dropout)
+        self.pos_encoder = PositionalEncoding(d_model, dropout, batch_first=True)
         
-        # Transformer encoder
-        encoder_layers = nn.TransformerEncoderLayer(
+        # Transformer encoder (attention through scaled_dot_product_attention)
+        self.transformer_encoder = SpeechEncoder(
             d_model=d_model,
-            nhead=num_heads,
-            dim_feedforward=d_ff,
-            dropout=dropout,
-            batch_first=True
-        )
-        self.transformer_encoder = nn.TransformerEncoder(
-            encoder_layers,
-            num_layers=num_layers
+            num_heads=num_heads,
+            num_layers=num_layers,
+            d_ff=d_ff,
+            dropout=dropout
         )
         
         # Output projection
@@ -382,17 +540,25 @@ class TransformerModel(nn.Module):
         self,
         src: torch.Tensor,
         src_mask: Optional[torch.Tensor] = None,
-        src_key_padding_mask: Optional[torch.Tensor] = None
+        src_key_padding_mask: Optional[torch.Tensor] = None,
+        lengths: Optional[torch.Tensor] = None,
+        is_causal: bool = False
     ) -> torch.Tensor:
         """
         Args:
             src: Tensor, shape [batch_size, seq_len, feature_dim]
             src_mask: Optional mask for padding in the sequence
             src_key_padding_mask: Optional mask for padding in the batch
+            lengths: Optional number of valid frames of each clip, the key padding
+                mask is built from it
+            is_causal: Causal attention without materializing a mask
             
         Returns:
             output: Tensor, shape [batch_size, seq_len, vocab_size]
         """
+        if lengths is not None and src_key_padding_mask is None and bool((lengths < src.size(1)).any()):
+            src_key_padding_mask = padding_mask(lengths.to(src.device), src.size(1))
+        
         # Project features to model dimension
         x = self.feature_proj(src)
         
@@ -403,7 +569,8 @@ class TransformerModel(nn.Module):
         memory = self.transformer_encoder(
             x,
             mask=src_mask,
-            src_key_padding_mask=src_key_padding_mask
+            src_key_padding_mask=src_key_padding_mask,
+            is_causal=is_causal
         )
         
         # Project to vocabulary size
@@ -411,10 +578,12 @@ class TransformerModel(nn.Module):
         
         return output
     
-    def predict_lengths(self, logits: torch.Tensor) -> torch.Tensor:
+    def predict_lengths(self, logits: torch.Tensor, lengths: Optional[torch.Tensor] = None) -> torch.Tensor:
         """Predict output sequence lengths for CTC loss."""
         # For CTC, output length is determined by the input length
         # We assume no length reduction in the model
+        if lengths is not None:
+            return torch.as_tensor(lengths, dtype=torch.long, device=logits.device)
         return torch.full(
             (logits.size(0),),
             logits.size(1),
@@ -423,7 +592,91 @@ class TransformerModel(nn.Module):
         )
     
     def generate_square_subsequent_mask(self, sz: int) -> torch.Tensor:
-        """Generate a square mask for the sequence."""
-        mask = (torch.triu(torch.ones(sz, sz)) == 1).transpose(0, 1)
-        mask = mask.float().masked_fill(mask == 0, float('-inf')).masked_fill(mask == 1, float(0.0))
-        return mask 
\ No newline at end of file
+        """Generate a square mask for the sequence.
+        
+        Boolean (True = masked), as accepted by nn.Transformer; prefer forward(is_causal=True),
+        which needs no mask at all.
+        """
+        return torch.ones(sz, sz, dtype=torch.bool).triu(1)
+    
+    def encode_batch(
+        self,
+        clips: List[torch.Tensor],
+        max_frames: int = 32000,
+        max_batch_size: int = 64,
+        chunk_size: Optional[int] = None,
+        overlap: int = 128
+    ) -> List[torch.Tensor]:
+        """Logits of clips of different lengths, grouped by similar length.
+        
+        Args:
+            clips: Tensors of shape [seq_len_i, feature_dim]
+            max_frames: Bound on batch_size x padded length of each forward pass
+            chunk_size: Clips longer than this are encoded with encode_chunked
+            
+        Returns:
+            Logits of each clip, shape [seq_len_i, vocab_size], in the order of clips
+        """
+        device = next(self.parameters()).device
+        outputs: List[Optional[torch.Tensor]] = [None] * len(clips)
+        lengths = torch.tensor([len(clip) for clip in clips], dtype=torch.long)
+        short = [i for i in range(len(clips)) if chunk_size is None or lengths[i] <= chunk_size]
+        for i in range(len(clips)):
+            if chunk_size is not None and lengths[i] > chunk_size:
+                outputs[i] = self.encode_chunked(clips[i], chunk_size, overlap)
+        
+        self.eval()
+        with torch.inference_mode():
+            for batch in padded_batches(lengths[short].numpy(), max_frames, max_batch_size):
+                indices = [short[j] for j in batch]
+                src = nn.utils.rnn.pad_sequence([clips[i] for i in indices], batch_first=True).to(device)
+                logits = self(src, lengths=lengths[indices])
+                for row, i in enumerate(indices):
+                    outputs[i] = logits[row, :lengths[i]].cpu()
+        return outputs
+    
+    def encode_chunked(
+        self,
+        src: torch.Tensor,
+        chunk_size: int = 1024,
+        overlap: int = 128,
+        batch_size: int = 8
+    ) -> torch.Tensor:
+        """Logits of a long clip, encoded by overlapping windows of chunk_size frames.
+        
+        Each window keeps overlap frames of context on each side and only its central
+        frames are kept, so memory depends on chunk_size and batch_size, not on the
+        clip duration.
+        
+        Args:
+            src: Tensor, shape [seq_len, feature_dim]
+            
+        Returns:
+            Logits, shape [seq_len, vocab_size]
+        """
+        step = chunk_size - 2 * overlap
+        if step <= 0:
+            raise ValueError("chunk_size must be greater than 2 * overlap")
+        device = next(self.parameters()).device
+        seq_len = len(src)
+        
+        # (window start, window end, start and end of the kept frames)
+        windows = []
+        for start in range(0, seq_len, step):
+            window_start = max(0, start - overlap)
+            window_end = min(seq_len, window_start + chunk_size)
+            windows.append((window_start, window_end, start, min(start + step, seq_len)))
+        
+        self.eval()
+        outputs = []
+        with torch.inference_mode():
+            for i in range(0, len(windows), batch_size):
+                group = windows[i:i + batch_size]
+                lengths = torch.tensor([end - begin for begin, end, _, _ in group])
+                batch = nn.utils.rnn.pad_sequence(
+                    [src[begin:end] for begin, end, _, _ in group], batch_first=True
+                ).to(device)
+                logits = self(batch, lengths=lengths)
+                for row, (begin, _, keep_start, keep_end) in enumerate(group):
+                    outputs.append(logits[row, keep_start - begin:keep_end - begin].cpu())
+        return torch.cat(outputs) if outputs else torch.zeros(0, self.output_proj.out_features) 
\ No newline at end of file
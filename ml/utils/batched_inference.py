@@ -0,0 +1,201 @@
+from typing import Dict, Any, Callable, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+from .inference_scheduler import InferenceScheduler, ScheduledModel
+from .sequence_store import SequenceFeatureStore, sequence_trends
+
+
+def length_buckets(lengths: np.ndarray, batch_size: int = 512) -> Iterator[Tuple[int, np.ndarray]]:
+    """Groupes (longueur, indices) de séquences de même longueur, au plus batch_size par groupe
+
+    Les séquences vides (longueur 0) sont ignorées.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    boundaries = np.flatnonzero(np.diff(sorted_lengths)) + 1
+    for group in np.split(order, boundaries):
+        if not len(group) or lengths[group[0]] == 0:
+            continue
+        for start in range(0, len(group), batch_size):
+            yield int(lengths[group[0]]), group[start:start + batch_size]
+
+
+def padded_batches(lengths: np.ndarray, max_frames: int = 32_000,
+                   max_batch_size: int = 64) -> Iterator[np.ndarray]:
+    """Indices de séquences de longueurs voisines, à compléter jusqu'à la plus longue du groupe
+
+    Les séquences sont triées par longueur puis regroupées tant que le lot complété
+    (taille x longueur max) ne dépasse pas max_frames : peu de remplissage, et une
+    mémoire par lot bornée quelle que soit la répartition des longueurs.
+    """
+    lengths = np.asarray(lengths)
+    order = np.argsort(lengths, kind='stable')
+    batch: List[int] = []
+    for index in order:
+        # Triées : la séquence courante est la plus longue du lot
+        if batch and ((len(batch) + 1) * lengths[index] > max_frames or len(batch) == max_batch_size):
+            yield np.asarray(batch)
+            batch = []
+        batch.append(int(index))
+    if batch:
+        yield np.asarray(batch)
+
+
+def padding_mask(lengths: torch.Tensor, max_length: Optional[int] = None) -> torch.Tensor:
+    """Masque (batch x max_length) vrai sur les positions de remplissage, comme src_key_padding_mask"""
+    lengths = torch.as_tensor(lengths)
+    max_length = int(lengths.max()) if max_length is None else max_length
+    return torch.arange(max_length, device=lengths.device)[None, :] >= lengths[:, None]
+
+
+def predict_batched(predict: Callable[[torch.Tensor], Any], values: np.ndarray, lengths: np.ndarray,
+                    batch_size: int = 512, device: Optional[torch.device] = None) -> List[Optional[Dict[str, Any]]]:
+    """Prédictions de plusieurs séquences, une passe du modèle par groupe de même longueur
+
+    values : séquences (N x longueur max x features) complétées à gauche, comme
+    SequenceFeatureStore.batch() ; seules les lengths[i] dernières positions de la
+    séquence i sont données au modèle. Regrouper par longueur exacte évite tout
+    remplissage : chaque séquence reçoit la même prédiction qu'en appel individuel,
+    y compris pour les modèles sans masque (moyenne temporelle, BatchNorm).
+
+    predict reçoit un tenseur (groupe x longueur x features) et rend un dict dont les
+    valeurs sont indexées par séquence (tenseur, tableau ou liste) ou communes au groupe.
+    Retourne, pour chaque séquence, le dict de ses prédictions (None si elle est vide).
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(values)
+    with torch.inference_mode():
+        for length, indices in length_buckets(lengths, batch_size):
+            batch = torch.from_numpy(np.ascontiguousarray(values[indices, -length:]))
+            if device is not None:
+                batch = batch.to(device, non_blocking=True)
+            for index, prediction in zip(indices, split_predictions(predict(batch), len(indices))):
+                results[index] = prediction
+    return results
+
+
+def analyze_sequences(predictor: 'TrendPredictor', store: SequenceFeatureStore,
+                      accounts: Iterable[Hashable], window_days: float = 7, batch_size: int = 512,
+                      device: Optional[torch.device] = None,
+                      scheduled: bool = False) -> Dict[Hashable, Dict[str, Any]]:
+    """Prédictions et tendances actuelles des comptes d'un SequenceFeatureStore
+
+    Une passe de predictor.predict_batch par groupe de séquences de même longueur
+    (predict_batched) ; un seul compte est un groupe d'une séquence. predictor doit suivre
+    le contrat de TrendPredictor (une valeur par séquence pour chaque prédiction) : une
+    fonction sur un autre format (DataFrame) est refusée. Avec scheduled, les séquences
+    passent par le scheduler partagé (predict_scheduled) : pour quelques comptes par appel,
+    elles sont regroupées avec les requêtes concurrentes. Pour chaque compte observé : predictions,
+    current_trends (croissance, volatilité, force de la tendance sur les window_days
+    derniers jours) et analysis_window (premier et dernier post de la fenêtre).
+    Les comptes sans observation sont ignorés.
+    """
+    if not isinstance(predictor, TrendPredictor):
+        raise TypeError(f"TrendPredictor attendu, reçu {type(predictor).__name__}")
+    accounts = [account for account in accounts if account in store]
+    values = store.batch(accounts)
+    timestamps = store.timestamps(accounts)
+    lengths = store.lengths(accounts)
+    predict = predictor.predict_scheduled if scheduled else predictor.predict_batch
+    predictions = predict_batched(predict, values, lengths, batch_size, device)
+    trends = sequence_trends(values, timestamps, lengths, window_days=window_days)
+
+    results = {}
+    for i, account in enumerate(accounts):
+        if predictions[i] is None:
+            continue
+        window_times = timestamps[i, -max(int(trends['observations'][i]), 1):]
+        results[account] = {
+            'predictions': predictions[i],
+            'current_trends': {
+                'engagement_growth': float(trends['engagement_growth'][i]),
+                'volatility': float(trends['volatility'][i]),
+                'trend_strength': abs(predictions[i]['trend_direction']) * predictions[i]['direction_confidence']
+            },
+            'analysis_window': {
+                'start': pd.Timestamp(window_times[0], unit='s'),
+                'end': pd.Timestamp(window_times[-1], unit='s')
+            }
+        }
+    return results
+
+
+class TrendPredictor(ScheduledModel):
+    """Prédictions de tendance d'un batch de séquences, contrat explicite de predict_batched
+
+    model reçoit des séquences (batch x longueur x SEQUENCE_FEATURES), observations brutes
+    dans l'ordre chronologique (engagement en première feature), et rend l'engagement
+    prédit du post suivant (batch) : EnhancedTrendLSTM, CompactTrendGRU ou TrendModelRouter.
+    predict_batch() en déduit, pour chaque séquence :
+    - predicted_engagement : sortie du modèle
+    - trend_direction : signe (-1, 0 ou 1) de l'écart à la dernière observation
+    - direction_confidence : 1 - exp(-|écart| / écart-type de l'engagement de la séquence)
+    - confidence_score : direction_confidence, réduite en proportion tant que la séquence
+      a moins de sequence_length observations
+    Toutes les valeurs sont des tenseurs (batch), découpables ligne par ligne : le
+    prédicteur peut être servi par le scheduler partagé (ScheduledModel).
+    """
+
+    def __init__(self, model: Callable[[torch.Tensor], torch.Tensor], sequence_length: int = 30):
+        self.model = model
+        self.sequence_length = sequence_length
+
+    def predict_batch(self, sequences: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Prédictions d'un batch de séquences sans remplissage (batch x longueur x features)"""
+        sequences = torch.as_tensor(sequences, dtype=torch.float32)
+        if sequences.dim() != 3:
+            raise ValueError(f"Séquences attendues (batch x longueur x features), reçu {tuple(sequences.shape)}")
+        if isinstance(self.model, torch.nn.Module):
+            self.model.eval()
+        with torch.inference_mode():
+            predicted = torch.as_tensor(self.model(sequences)).reshape(-1).float()
+        if len(predicted) != len(sequences):
+            raise ValueError(f"Le modèle rend {len(predicted)} prédictions pour {len(sequences)} séquences")
+
+        engagement = sequences[:, :, 0]
+        change = predicted - engagement[:, -1]
+        scale = engagement.std(dim=1, unbiased=False).clamp_min(1e-6)
+        direction_confidence = 1 - torch.exp(-change.abs() / scale)
+        history = min(sequences.shape[1] / self.sequence_length, 1.0)
+        return {
+            'predicted_engagement': predicted,
+            'trend_direction': torch.sign(change),
+            'direction_confidence': direction_confidence,
+            'confidence_score': direction_confidence * history
+        }
+
+    def predict_scheduled(self, sequences: torch.Tensor,
+                          scheduler: Optional[InferenceScheduler] = None) -> Dict[str, torch.Tensor]:
+        """Même contrat que predict_batch, chaque séquence soumise au scheduler partagé"""
+        futures = [self.submit(sequence, scheduler) for sequence in torch.as_tensor(sequences, dtype=torch.float32)]
+        rows = [future.result() for future in futures]
+        return {name: torch.stack([row[name] for row in rows]) for name in rows[0]}
+
+    def __call__(self, sequences: torch.Tensor) -> Dict[str, torch.Tensor]:
+        return self.predict_batch(sequences)
+
+
+def split_predictions(predictions: Dict[str, Any], size: int) -> List[Dict[str, Any]]:
+    """Dict de prédictions d'un batch découpé en un dict par séquence"""
+    columns = {}
+    for name, value in predictions.items():
+        if isinstance(value, torch.Tensor):
+            value = value.detach().cpu().numpy()
+        if isinstance(value, (np.ndarray, list, tuple)) and len(value) == size and np.ndim(value) > 0:
+            columns[name] = [_item(row) for row in value]
+        else:
+            # Valeur commune à tout le groupe
+            columns[name] = [_item(value)] * size
+    return [{name: rows[i] for name, rows in columns.items()} for i in range(size)]
+
+
+def _item(value: Any) -> Any:
+    """Scalaires numpy rendus en nombres Python, comme les prédictions d'un seul compte"""
+    if isinstance(value, np.ndarray) and value.size == 1:
+        return value.item()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,231 @@
+from typing import Dict, Any, List, Optional
+from pathlib import Path
+from functools import partial
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+
+import pandas as pd
+
+from .lazy_frame import LazyFrame
+
+try:
+    import pyarrow as pa
+    from pyarrow import feather
+except ImportError:  # le cache est simplement désactivé sans pyarrow
+    pa = None
+    feather = None
+
+
+class ColumnarCache:
+    """Cache disque colonnaire (Feather/Arrow IPC non compressé) de DataFrames traités
+
+    Une entrée est valide tant que les fichiers sources ont la même empreinte
+    (taille, mtime, hash du contenu) et que la version du traitement est la même.
+    Les fichiers Feather non compressés sont relus en memory-map. Une LazyFrame est
+    écrite partie par partie et relue comme une LazyFrame.
+
+    Chaque store écrit ses fichiers dans un nouveau répertoire de version de l'entrée,
+    puis remplace le manifest : une entrée n'est jamais modifiée en place. Les versions
+    antérieures à la précédente sont supprimées (la précédente reste lisible par les
+    LazyFrame encore ouvertes).
+    """
+
+    MANIFEST = 'manifest.json'
+    HASH_BLOCK_SIZE = 1 << 20
+
+    def __init__(self, cache_dir: str, version: str = '1'):
+        self.logger = logging.getLogger('columnar_cache')
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.enabled = pa is not None
+        if not self.enabled:
+            self.logger.warning("pyarrow non disponible, cache colonnaire désactivé")
+        # Clé (version des données) calculée au dernier load/store, utilisable par les appelants
+        self.last_key: Optional[str] = None
+        self._last_fingerprint: Dict[str, Any] = {}
+
+    def load(self, name: str, sources: List[Path]) -> Optional[Dict[str, pd.DataFrame]]:
+        """Relit les DataFrames d'une entrée si les sources n'ont pas changé"""
+        try:
+            entry_dir = self.cache_dir / name
+            manifest = self._read_manifest(entry_dir) if self.enabled else None
+            known = manifest.get('sources', {}) if manifest else self._last_fingerprint
+
+            fingerprint = self.fingerprint(sources, known)
+            self._last_fingerprint = fingerprint
+            self.last_key = self._key(fingerprint)
+            if manifest is None:
+                return None
+            if manifest.get('key') != self.last_key:
+                self.logger.info(f"Cache {name} invalidé (sources modifiées)")
+                return None
+
+            return {
+                frame_name: self._read_entry_frame(entry_dir, filename)
+                for frame_name, filename in manifest['frames'].items()
+            }
+
+        except Exception as e:
+            self.logger.error(f"Erreur de lecture du cache {name}: {str(e)}")
+            return None
+
+    def store(self, name: str, sources: List[Path], frames: Dict[str, pd.DataFrame]) -> bool:
+        """Écrit les DataFrames d'une entrée (le manifest est écrit en dernier, atomiquement)"""
+        if not self.enabled:
+            return False
+        try:
+            entry_dir = self.cache_dir / name
+            entry_dir.mkdir(parents=True, exist_ok=True)
+            fingerprint = self.fingerprint(sources, self._last_fingerprint)
+            self.last_key = self._key(fingerprint)
+            previous = self._read_manifest(entry_dir)
+
+            directory = f"v_{uuid.uuid4().hex[:12]}"
+            version_dir = entry_dir / directory
+            version_dir.mkdir()
+            filenames = {}
+            for index, (frame_name, frame) in enumerate(frames.items()):
+                if isinstance(frame, LazyFrame):
+                    written = self._write_lazy_frame(version_dir, f"frame_{index}", frame)
+                    written['parts'] = [f"{directory}/{part}" for part in written['parts']]
+                else:
+                    written = f"{directory}/{self.write_frame(version_dir, f'frame_{index}', frame)}"
+                filenames[frame_name] = written
+
+            manifest = {
+                'key': self.last_key,
+                'version': self.version,
+                'sources': fingerprint,
+                'directory': directory,
+                'frames': filenames
+            }
+            self._atomic_write(
+                entry_dir / self.MANIFEST,
+                lambda path: Path(path).write_text(json.dumps(manifest, indent=2))
+            )
+            self._remove_versions(entry_dir, keep={directory, (previous or {}).get('directory')})
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Erreur d'écriture du cache {name}: {str(e)}")
+            return False
+
+    def invalidate(self, name: str):
+        """Supprime le manifest d'une entrée (les frames seront réécrites au prochain store)"""
+        (self.cache_dir / name / self.MANIFEST).unlink(missing_ok=True)
+
+    def _remove_versions(self, entry_dir: Path, keep: set):
+        """Supprime les répertoires de version (et les fichiers d'avant le versionnage) hors de keep"""
+        for path in entry_dir.iterdir():
+            if path.name == self.MANIFEST or path.name in keep:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.name.startswith('frame_'):
+                path.unlink(missing_ok=True)
+
+    def fingerprint(self, sources: List[Path], known: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Empreinte (taille, mtime, hash) des sources
+
+        Le hash d'une source dont la taille et le mtime sont inchangés est repris
+        de `known` au lieu d'être recalculé.
+        """
+        known = known or {}
+        fingerprint = {}
+        for source in sources:
+            source = Path(source)
+            if not source.exists():
+                fingerprint[str(source)] = None
+                continue
+
+            stat = source.stat()
+            previous = known.get(str(source))
+            if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+                digest = previous['sha256']
+            else:
+                digest = self._hash_file(source)
+
+            fingerprint[str(source)] = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': digest
+            }
+        return fingerprint
+
+    def _key(self, fingerprint: Dict[str, Any]) -> str:
+        """Clé de l'entrée : contenu des sources et version du traitement (le mtime seul n'invalide pas)"""
+        content = {
+            source: info['sha256'] if info else None
+            for source, info in fingerprint.items()
+        }
+        payload = json.dumps({'version': self.version, 'sources': content}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _hash_file(self, path: Path) -> str:
+        """Hash SHA-256 du contenu d'un fichier, lu par blocs"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(self.HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _write_lazy_frame(self, entry_dir: Path, stem: str, frame: LazyFrame) -> Dict[str, Any]:
+        """Écrit une LazyFrame bloc par bloc, un fichier par partie"""
+        parts, rows = [], []
+        for part, chunk in enumerate(frame.iter_chunks()):
+            parts.append(self.write_frame(entry_dir, f"{stem}_{part}", chunk))
+            rows.append(len(chunk))
+        return {'parts': parts, 'rows': rows}
+
+    def _read_entry_frame(self, entry_dir: Path, filename: Any):
+        """DataFrame d'un fichier, ou LazyFrame (lecture différée) d'une liste de parties"""
+        if isinstance(filename, dict):
+            return LazyFrame(
+                [partial(self.read_frame, entry_dir / part) for part in filename['parts']],
+                rows=filename['rows']
+            )
+        return self.read_frame(entry_dir / filename)
+
+    def write_frame(self, entry_dir: Path, stem: str, frame: pd.DataFrame) -> str:
+        """Écrit un DataFrame en Feather, ou en pickle si une colonne n'est pas convertible en Arrow
+
+        Les colonnes object de types mélangés (ex: texte et nombres dans une même colonne source)
+        ne sont pas représentables en Arrow sans changer leurs valeurs.
+        """
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            self.logger.warning(f"Frame {stem} non convertible en Arrow, écrite en pickle: {str(e)}")
+            filename = f"{stem}.pkl"
+            self._atomic_write(entry_dir / filename, frame.to_pickle)
+            return filename
+
+        filename = f"{stem}.feather"
+        self._atomic_write(
+            entry_dir / filename,
+            lambda path: feather.write_feather(table, path, compression='uncompressed')
+        )
+        return filename
+
+    def read_frame(self, path: Path) -> pd.DataFrame:
+        """Relit un DataFrame (memory-map pour le Feather)"""
+        if path.suffix == '.pkl':
+            return pd.read_pickle(path)
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def _read_manifest(self, entry_dir: Path) -> Optional[Dict[str, Any]]:
+        """Charge le manifest d'une entrée s'il existe"""
+        manifest_path = entry_dir / self.MANIFEST
+        if not manifest_path.exists():
+            return None
+        return json.loads(manifest_path.read_text())
+
+    def _atomic_write(self, path: Path, write):
+        """Écrit dans un fichier temporaire puis le renomme"""
+        tmp_path = path.with_name(path.name + '.tmp')
+        write(str(tmp_path))
+        os.replace(tmp_path, path)
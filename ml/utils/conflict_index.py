@@ -0,0 +1,323 @@
+from typing import Dict, Any, List, Set, Tuple, Optional
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+import logging
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def extract_conflict_features(resolver, rec: Dict[str, Any]) -> Tuple[Set[Any], Set[Any], Optional[Tuple[int, int]], Any, Any]:
+    """Parses the fields used by the conflict checks once (raises if the recommendation is not indexable)"""
+    resources = set(rec.get('resources', []))
+    actions = set(rec.get('actions', []))
+    strategy = rec.get('strategy', '')
+    objective = rec.get('objective')
+    hash((strategy, objective))
+    for action in actions:
+        opposite = resolver._opposite_action(action)
+        if opposite is not None:
+            hash(opposite)
+
+    timing = None
+    time_range = rec.get('timing', {})
+    if time_range.get('start') and time_range.get('end'):
+        timing = (
+            _to_microseconds(resolver._parse_time(time_range['start'])),
+            _to_microseconds(resolver._parse_time(time_range['end']))
+        )
+
+    return resources, actions, timing, strategy, objective
+
+
+def _to_microseconds(value: datetime) -> int:
+    """Exact integer representation of a naive datetime"""
+    return (value - _EPOCH) // _MICROSECOND
+
+
+class IntervalIndex:
+    """Static interval index: intervals sorted by start plus a max-end segment tree
+
+    `overlapping(start, end)` enumerates every stored interval [s, e] with
+    s <= end and e >= start in O((k + 1) log n) for k results.
+    """
+
+    def __init__(self, intervals: List[Tuple[int, int, int]]):
+        # intervals: (start, end, item_id)
+        ordered = sorted(intervals)
+        self.starts = [s for s, _, _ in ordered]
+        self.ends = [e for _, e, _ in ordered]
+        self.items = [item for _, _, item in ordered]
+
+        self.size = 1
+        while self.size < max(len(ordered), 1):
+            self.size *= 2
+        self.max_end = [float('-inf')] * (2 * self.size)
+        for k, end in enumerate(self.ends):
+            self.max_end[self.size + k] = end
+        for node in range(self.size - 1, 0, -1):
+            self.max_end[node] = max(self.max_end[2 * node], self.max_end[2 * node + 1])
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Returns the item ids of the intervals overlapping [start, end]"""
+        limit = bisect_right(self.starts, end)
+        if limit == 0:
+            return []
+
+        found = []
+        stack = [(1, 0, self.size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            if lo >= limit or self.max_end[node] < start:
+                continue
+            if hi - lo == 1:
+                found.append(self.items[lo])
+                continue
+            mid = (lo + hi) // 2
+            stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return found
+
+
+class ConflictIndex:
+    """Indexes a list of recommendations so that conflicts are found without pairwise scans
+
+    - timing: interval index over the parsed timing ranges
+    - resources: inverted index resource -> recommendations, overlap counted from postings
+    - consistency: buckets by (strategy, objective) and inverted index on actions
+
+    Recommendations whose fields cannot be indexed (unparsable timing, unhashable
+    values...) are compared with the resolver's pairwise check, which keeps the
+    resolver's "conflict when in doubt" behaviour.
+    """
+
+    def __init__(self, resolver, recommendations: List[Dict[str, Any]]):
+        self.logger = logging.getLogger('conflict_index')
+        self.resolver = resolver
+        self.recommendations = recommendations
+        self.fallback: List[int] = []
+
+        self.resources: Dict[int, Set[Any]] = {}
+        self.actions: Dict[int, Set[Any]] = {}
+        self.timing: Dict[int, Tuple[int, int]] = {}
+        self.strategy: Dict[int, Any] = {}
+        self.objective: Dict[int, Any] = {}
+
+        self._build()
+
+    def _build(self):
+        """Extracts the indexed features once and builds the indexes"""
+        resource_postings = defaultdict(list)
+        action_postings = defaultdict(list)
+        strategy_buckets = defaultdict(list)
+        intervals = []
+
+        for i, rec in enumerate(self.recommendations):
+            try:
+                features = extract_conflict_features(self.resolver, rec)
+            except Exception:
+                self.fallback.append(i)
+                continue
+
+            resources, actions, timing, strategy, objective = features
+            self.resources[i] = resources
+            self.actions[i] = actions
+            self.strategy[i] = strategy
+            self.objective[i] = objective
+
+            for resource in resources:
+                resource_postings[resource].append(i)
+            for action in actions:
+                action_postings[action].append(i)
+            strategy_buckets[(strategy, objective)].append(i)
+            if timing is not None:
+                self.timing[i] = timing
+                intervals.append((timing[0], timing[1], i))
+
+        self.resource_postings = dict(resource_postings)
+        self.action_postings = dict(action_postings)
+        self.strategy_buckets = dict(strategy_buckets)
+        self.objectives_by_strategy = defaultdict(list)
+        for strategy, objective in self.strategy_buckets:
+            self.objectives_by_strategy[strategy].append(objective)
+        self.interval_index = IntervalIndex(intervals)
+
+    def conflicts_of(self, i: int) -> List[int]:
+        """Returns, in order, the indices j > i of the recommendations conflicting with i"""
+        if i in self.resources:
+            conflicting = self._indexed_conflicts(i)
+        else:
+            conflicting = set()
+
+        # Non indexable recommendations go through the pairwise check
+        if i not in self.resources:
+            candidates = range(i + 1, len(self.recommendations))
+        else:
+            candidates = self.fallback[bisect_right(self.fallback, i):]
+        rec = self.recommendations[i]
+        for j in candidates:
+            if j not in conflicting and self.resolver._are_in_conflict(rec, self.recommendations[j]):
+                conflicting.add(j)
+
+        return sorted(conflicting)
+
+    def _indexed_conflicts(self, i: int) -> Set[int]:
+        """Conflicts of an indexed recommendation with the other indexed ones"""
+        conflicting = set()
+
+        # Resources: overlap computed from the postings, no set rebuild
+        resources = self.resources[i]
+        if resources:
+            overlaps = defaultdict(int)
+            for resource in resources:
+                postings = self.resource_postings[resource]
+                for j in postings[bisect_right(postings, i):]:
+                    overlaps[j] += 1
+            for j, overlap in overlaps.items():
+                if overlap / min(len(resources), len(self.resources[j])) > 0.5:
+                    conflicting.add(j)
+
+        # Timing: overlapping ranges from the interval index
+        if i in self.timing:
+            start, end = self.timing[i]
+            conflicting.update(j for j in self.interval_index.overlapping(start, end) if j > i)
+
+        # Consistency: opposing strategies on a different objective
+        objective = self.objective[i]
+        for opposite in self.resolver.opposing_strategies.get(self.strategy[i], ()):
+            for other_objective in self.objectives_by_strategy.get(opposite, ()):
+                if other_objective != objective:
+                    bucket = self.strategy_buckets[(opposite, other_objective)]
+                    conflicting.update(bucket[bisect_right(bucket, i):])
+
+        # Consistency: opposing actions
+        for action in self.actions[i]:
+            opposite = self.resolver._opposite_action(action)
+            if opposite is not None and opposite in self.action_postings:
+                postings = self.action_postings[opposite]
+                conflicting.update(postings[bisect_right(postings, i):])
+
+        return conflicting
+
+
+class IncrementalConflictIndex:
+    """Mutable counterpart of ConflictIndex, keyed by recommendation id
+
+    Supports add/remove in O(features) and returns the full (symmetric) conflict
+    set of one recommendation. Timing ranges are kept sorted by start; the
+    largest duration seen bounds the start window scanned by a query.
+    """
+
+    def __init__(self, resolver):
+        self.logger = logging.getLogger('conflict_index')
+        self.resolver = resolver
+        self.recommendations: Dict[int, Dict[str, Any]] = {}
+        self.features: Dict[int, Tuple] = {}
+        self.fallback: Set[int] = set()
+
+        self.resource_postings = defaultdict(set)
+        self.action_postings = defaultdict(set)
+        self.strategy_buckets = defaultdict(set)
+        self.objectives_by_strategy = defaultdict(set)
+        self.timing_starts: List[Tuple[int, int]] = []
+        self.max_duration = 0
+
+    def add(self, key: int, rec: Dict[str, Any]):
+        """Indexes a recommendation"""
+        self.recommendations[key] = rec
+        try:
+            features = extract_conflict_features(self.resolver, rec)
+        except Exception:
+            self.fallback.add(key)
+            return
+
+        resources, actions, timing, strategy, objective = features
+        self.features[key] = features
+        for resource in resources:
+            self.resource_postings[resource].add(key)
+        for action in actions:
+            self.action_postings[action].add(key)
+        self.strategy_buckets[(strategy, objective)].add(key)
+        self.objectives_by_strategy[strategy].add(objective)
+        if timing is not None:
+            insort(self.timing_starts, (timing[0], key))
+            self.max_duration = max(self.max_duration, timing[1] - timing[0])
+
+    def remove(self, key: int):
+        """Removes a recommendation from the index"""
+        self.recommendations.pop(key, None)
+        if key in self.fallback:
+            self.fallback.discard(key)
+            return
+
+        resources, actions, timing, strategy, objective = self.features.pop(key)
+        for resource in resources:
+            self._discard(self.resource_postings, resource, key)
+        for action in actions:
+            self._discard(self.action_postings, action, key)
+        self._discard(self.strategy_buckets, (strategy, objective), key)
+        if (strategy, objective) not in self.strategy_buckets:
+            self._discard(self.objectives_by_strategy, strategy, objective)
+        if timing is not None:
+            position = bisect_left(self.timing_starts, (timing[0], key))
+            del self.timing_starts[position]
+
+    def _discard(self, postings: Dict[Any, Set[Any]], posting_key: Any, value: Any):
+        """Removes a value from a posting list, dropping the list once empty"""
+        values = postings.get(posting_key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del postings[posting_key]
+
+    def conflicts_of(self, key: int) -> Set[int]:
+        """Returns the ids of every other indexed recommendation conflicting with key"""
+        rec = self.recommendations[key]
+        if key in self.fallback:
+            candidates = self.recommendations.keys()
+            conflicting = set()
+        else:
+            candidates = self.fallback
+            conflicting = self._indexed_conflicts(key)
+
+        for other in candidates:
+            if other != key and other not in conflicting and self.resolver._are_in_conflict(rec, self.recommendations[other]):
+                conflicting.add(other)
+        return conflicting
+
+    def _indexed_conflicts(self, key: int) -> Set[int]:
+        """Conflicts of an indexed recommendation with the other indexed ones"""
+        resources, actions, timing, strategy, objective = self.features[key]
+        conflicting = set()
+
+        if resources:
+            overlaps = defaultdict(int)
+            for resource in resources:
+                for other in self.resource_postings[resource]:
+                    overlaps[other] += 1
+            overlaps.pop(key, None)
+            for other, overlap in overlaps.items():
+                if overlap / min(len(resources), len(self.features[other][0])) > 0.5:
+                    conflicting.add(other)
+
+        if timing is not None:
+            start, end = timing
+            lo = bisect_left(self.timing_starts, (start - self.max_duration, -1))
+            hi = bisect_right(self.timing_starts, (end, float('inf')))
+            for other_start, other in self.timing_starts[lo:hi]:
+                if other != key and self.features[other][2][1] >= start:
+                    conflicting.add(other)
+
+        for opposite in self.resolver.opposing_strategies.get(strategy, ()):
+            for other_objective in self.objectives_by_strategy.get(opposite, ()):
+                if other_objective != objective:
+                    conflicting.update(self.strategy_buckets[(opposite, other_objective)])
+
+        for action in actions:
+            opposite = self.resolver._opposite_action(action)
+            if opposite is not None and opposite in self.action_postings:
+                conflicting.update(self.action_postings[opposite])
+
+        conflicting.discard(key)
+        return conflicting
@@ -0,0 +1,265 @@
+from typing import Dict, Any, Callable, List, Optional, Union
+from abc import ABC, abstractmethod
+from functools import partial
+from pathlib import Path
+import logging
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from .columnar_cache import ColumnarCache, pa
+from .indexed_join import IndexedJoin, gather
+from .lazy_frame import LazyFrame
+from .multi_aggregation import MarketAggregates
+from .schema_loader import SchemaCsvLoader
+
+Frame = Union[pd.DataFrame, LazyFrame]
+
+
+class DataFrameBackend(ABC):
+    """Moteur d'exécution des étapes de DataIntegrationAgent
+
+    Chargement, nettoyage, fusion et agrégation passent par le moteur ; les tables
+    qu'il rend ne sont lues qu'à travers lui (collect, accumulate, is_empty).
+    """
+
+    name = 'base'
+    # Entrée du cache colonnaire des données traitées par ce moteur
+    cache_entry = 'processed'
+
+    def __init__(self, loader: SchemaCsvLoader, join: IndexedJoin):
+        self.logger = logging.getLogger(f"dataframe_backend.{self.name}")
+        self.loader = loader
+        self.join = join
+
+    @abstractmethod
+    def load(self, path: Union[str, Path], schema: Dict[str, str]) -> Frame:
+        """Table d'un CSV, typée selon le schéma et sans doublons"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def clean(self, frame: Frame, clean: Callable[[pd.DataFrame], pd.DataFrame]) -> Frame:
+        """Table nettoyée ligne à ligne par clean"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def merge(self, frames: List[Frame], unique: List[bool]) -> Frame:
+        """Jointure outer des tables sur la clé de self.join (mêmes lignes que IndexedJoin)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def accumulate(self, aggregates: MarketAggregates, frame: Frame) -> MarketAggregates:
+        """Ajoute toutes les lignes de la table aux cumuls"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def collect(self, frame: Frame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Table (ou seulement certaines colonnes) en mémoire"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def is_empty(self, frame: Frame) -> bool:
+        """Vrai si la table n'a aucune ligne (sans la charger entièrement si possible)"""
+        raise NotImplementedError
+
+    def reset(self):
+        """Libère les ressources des exécutions précédentes"""
+
+
+class PandasBackend(DataFrameBackend):
+    """Moteur par défaut : DataFrames pandas en mémoire, calculés immédiatement"""
+
+    name = 'pandas'
+
+    def load(self, path: Union[str, Path], schema: Dict[str, str]) -> pd.DataFrame:
+        return self.loader.load(path, schema)
+
+    def clean(self, frame: pd.DataFrame, clean: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+        return clean(frame)
+
+    def merge(self, frames: List[pd.DataFrame], unique: List[bool]) -> pd.DataFrame:
+        return self.join.join(frames, unique=unique)
+
+    def accumulate(self, aggregates: MarketAggregates, frame: pd.DataFrame) -> MarketAggregates:
+        aggregates.update(frame)
+        return aggregates
+
+    def collect(self, frame: pd.DataFrame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return frame if columns is None else frame[columns]
+
+    def is_empty(self, frame: pd.DataFrame) -> bool:
+        return frame.empty
+
+
+class ArrowBackend(DataFrameBackend):
+    """Moteur paresseux hors mémoire : LazyFrames sur des fichiers Arrow memory-mappés
+
+    - chaque bloc du CSV est typé puis écrit sur disque, les doublons entre blocs sont
+      retirés à la relecture (seuls les hash des lignes restent en mémoire)
+    - le nettoyage est différé et appliqué bloc par bloc à la lecture
+    - la fusion garde en mémoire les tables par compte (`unique`, agrégées par IndexedJoin)
+      et fait passer la dernière table, par post, bloc par bloc
+    - les cumuls sont alimentés bloc par bloc, la partie suivante étant lue en parallèle
+
+    Les tables ont les mêmes lignes et valeurs qu'avec PandasBackend, mais l'ordre des
+    lignes fusionnées suit les blocs (posts, puis comptes sans post) au lieu des clés triées.
+    """
+
+    name = 'arrow'
+    cache_entry = 'processed_arrow'
+
+    def __init__(self, loader: SchemaCsvLoader, join: IndexedJoin, spill_dir: Union[str, Path]):
+        super().__init__(loader, join)
+        self.spill_dir = Path(spill_dir)
+        # Écriture/relecture des parties (Feather non compressé, pickle si non convertible)
+        self.files = ColumnarCache(spill_dir)
+        # Répertoires créés par ce moteur : spill_dir peut être partagé avec d'autres instances
+        self.run_dirs: List[Path] = []
+
+    def load(self, path: Union[str, Path], schema: Dict[str, str]) -> LazyFrame:
+        run_dir = self._run_dir(Path(path).stem)
+        paths, hashes = [], []
+        for index, (chunk, _, row_hashes) in enumerate(self.loader.iter_chunks(path, schema)):
+            paths.append(run_dir / self.files.write_frame(run_dir, f"part_{index}", chunk))
+            hashes.append(row_hashes)
+
+        if not paths:
+            return LazyFrame.from_frame(pd.DataFrame(columns=list(schema)))
+
+        # Doublons entre blocs : première occurrence conservée, filtrée à la relecture
+        masks = self.loader.first_occurrences(hashes, lambda i, positions: self.files.read_frame(paths[i]).iloc[positions])
+        rows = [len(row_hashes) if keep is None else int(keep.sum()) for row_hashes, keep in zip(hashes, masks)]
+        return LazyFrame([partial(self._read_part, part, keep) for part, keep in zip(paths, masks)], rows=rows)
+
+    def clean(self, frame: Frame, clean: Callable[[pd.DataFrame], pd.DataFrame]) -> LazyFrame:
+        return self._lazy(frame).transform(clean)
+
+    def merge(self, frames: List[Frame], unique: List[bool]) -> LazyFrame:
+        frames = [self._lazy(frame) for frame in frames]
+        if len(frames) < 2 or not all(unique[:-1]) or unique[-1] or frames[-1].empty:
+            # Forme non prévue pour la fusion par blocs : jointure en mémoire
+            return LazyFrame.from_frame(self.join.join([frame.collect() for frame in frames], unique=unique))
+
+        # Tables par compte jointes en mémoire : une ligne par clé
+        accounts = self.join.join([frame.collect() for frame in frames[:-1]], unique=unique[:-1])
+        return self._stream_join(accounts, frames[-1])
+
+    def accumulate(self, aggregates: MarketAggregates, frame: Frame) -> MarketAggregates:
+        for chunk in self._lazy(frame).iter_chunks():
+            if len(chunk):
+                aggregates.update(chunk)
+        return aggregates
+
+    def collect(self, frame: Frame, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return self._lazy(frame).collect(columns)
+
+    def is_empty(self, frame: Frame) -> bool:
+        return self._lazy(frame).empty
+
+    def reset(self):
+        """Supprime les parties écrites par ce moteur (pas celles des autres instances)"""
+        for run_dir in self.run_dirs:
+            shutil.rmtree(run_dir, ignore_errors=True)
+        self.run_dirs = []
+
+    def _stream_join(self, accounts: pd.DataFrame, posts: LazyFrame) -> LazyFrame:
+        """Jointure outer comptes x posts, bloc de posts par bloc de posts
+
+        Chaque post trouve au plus un compte ; les comptes sans post forment la dernière partie.
+        """
+        key = self.join.key
+        account_keys = pd.Index(np.asarray(accounts[key], dtype=object))
+        matched = np.zeros(len(accounts), dtype=bool)
+        run_dir = self._run_dir('merge')
+        paths, rows, template = [], [], None
+
+        for index, chunk in enumerate(posts.iter_chunks()):
+            chunk = chunk.reset_index(drop=True)
+            if template is None and len(chunk):
+                template = chunk.iloc[:1]
+            positions = self._key_positions(account_keys, chunk[key])
+            matched[positions[positions >= 0]] = True
+            joined = self._joined_chunk(accounts, positions, chunk, np.arange(len(chunk)), chunk[key])
+            paths.append(run_dir / self.files.write_frame(run_dir, f"part_{index}", joined))
+            rows.append(len(joined))
+
+        unmatched = np.flatnonzero(~matched)
+        if len(unmatched):
+            joined = self._joined_chunk(
+                accounts, unmatched, template, np.full(len(unmatched), -1), accounts[key].iloc[unmatched]
+            )
+            paths.append(run_dir / self.files.write_frame(run_dir, f"part_{len(paths)}", joined))
+            rows.append(len(joined))
+
+        return LazyFrame([partial(self.files.read_frame, path) for path in paths], rows=rows)
+
+    def _joined_chunk(self, accounts: pd.DataFrame, account_positions: np.ndarray,
+                      posts: pd.DataFrame, post_positions: np.ndarray, keys: pd.Series) -> pd.DataFrame:
+        """Lignes fusionnées (mêmes colonnes, suffixes et remplissage que IndexedJoin)"""
+        key = self.join.key
+        account_columns = [column for column in accounts.columns if column != key]
+        post_columns = [column for column in posts.columns if column != key]
+        overlap = set(account_columns) & set(post_columns)
+
+        data = {}
+        for column in account_columns:
+            name = column + '_x' if column in overlap else column
+            data[name] = gather(accounts[column], account_positions, self.join.fill_value, self.join.text_fill_value)
+        for column in post_columns:
+            name = column + '_y' if column in overlap else column
+            data[name] = gather(posts[column], post_positions, self.join.fill_value, self.join.text_fill_value)
+
+        joined = pd.DataFrame(data, copy=False)
+        joined.insert(
+            min(accounts.columns.get_loc(key), len(joined.columns)),
+            key,
+            pd.Categorical(np.asarray(keys, dtype=object))
+        )
+        return joined
+
+    def _key_positions(self, account_keys: pd.Index, keys: pd.Series) -> np.ndarray:
+        """Position du compte de chaque clé (-1 sans compte), les clés manquantes se correspondant"""
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # Seules les catégories sont cherchées, les codes sont traduits
+            mapping = np.append(
+                account_keys.get_indexer(np.asarray(keys.cat.categories, dtype=object)),
+                account_keys.get_indexer(np.array([np.nan], dtype=object))
+            )
+            return mapping[keys.cat.codes.to_numpy()]
+        return account_keys.get_indexer(np.asarray(keys, dtype=object))
+
+    def _read_part(self, path: Path, keep: Optional[np.ndarray]) -> pd.DataFrame:
+        chunk = self.files.read_frame(path)
+        return chunk if keep is None else chunk[keep]
+
+    def _run_dir(self, stem: str) -> Path:
+        run_dir = self.spill_dir / f"{stem}_{uuid.uuid4().hex[:8]}"
+        run_dir.mkdir(parents=True, exist_ok=True)
+        self.run_dirs.append(run_dir)
+        return run_dir
+
+    def _lazy(self, frame: Frame) -> LazyFrame:
+        return frame if isinstance(frame, LazyFrame) else LazyFrame.from_frame(frame)
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'arrow': ArrowBackend
+}
+
+
+def create_backend(name: str, loader: SchemaCsvLoader, join: IndexedJoin,
+                   spill_dir: Union[str, Path]) -> DataFrameBackend:
+    """Moteur demandé ; pandas si le nom est inconnu ou si pyarrow manque"""
+    logger = logging.getLogger('dataframe_backend')
+    if name not in BACKENDS:
+        logger.warning(f"Moteur {name} inconnu, utilisation de pandas")
+        name = 'pandas'
+    if name == 'arrow' and pa is None:
+        logger.warning("pyarrow non disponible, utilisation de pandas")
+        name = 'pandas'
+    if name == 'pandas':
+        return PandasBackend(loader, join)
+    return BACKENDS[name](loader, join, spill_dir)
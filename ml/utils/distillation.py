@@ -0,0 +1,158 @@
+from typing import Dict, Any, Optional, Tuple, Union
+from pathlib import Path
+import copy
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+def teacher_predictions(teacher: nn.Module, features: torch.Tensor, batch_size: int = 256) -> torch.Tensor:
+    """Prédictions du modèle complet (mode évaluation), calculées une seule fois par batchs"""
+    teacher.eval()
+    with torch.inference_mode():
+        return torch.cat([
+            teacher(features[i:i + batch_size]).reshape(-1)
+            for i in range(0, len(features), batch_size)
+        ]) if len(features) else torch.zeros(0)
+
+
+def distill(teacher: nn.Module, student: nn.Module, features: torch.Tensor,
+            targets: Optional[torch.Tensor] = None, alpha: float = 0.8, epochs: int = 20,
+            batch_size: int = 128, learning_rate: float = 3e-3, validation_split: float = 0.1,
+            patience: int = 3, seed: int = 0) -> Dict[str, Any]:
+    """Entraîne l'élève à reproduire les prédictions du modèle complet
+
+    Perte : NLL gaussienne de la prédiction de l'élève (moyenne, log-variance) contre celle
+    du modèle complet, mêlée (1 - alpha) à la MSE contre les vraies cibles si elles sont
+    données. La variance apprise estime l'écart élève/modèle complet : c'est l'incertitude
+    utilisée par TrendModelRouter. Arrêt anticipé sur la tranche de validation.
+    """
+    rng = np.random.default_rng(seed)
+    features = torch.as_tensor(features, dtype=torch.float32)
+    soft_targets = teacher_predictions(teacher, features)
+    hard_targets = None if targets is None else torch.as_tensor(targets, dtype=torch.float32).reshape(-1)
+
+    n_validation = max(int(len(features) * validation_split), 1)
+    train = np.arange(len(features) - n_validation)
+    validation = torch.arange(len(features) - n_validation, len(features))
+
+    optimizer = torch.optim.Adam(student.parameters(), lr=learning_rate)
+    gaussian_nll = nn.GaussianNLLLoss()
+    mse = nn.MSELoss()
+
+    def loss(indices) -> torch.Tensor:
+        mean, log_variance = student.predict_with_uncertainty(features[indices])
+        value = gaussian_nll(mean, soft_targets[indices], log_variance.exp())
+        if hard_targets is not None and alpha < 1:
+            value = alpha * value + (1 - alpha) * mse(mean, hard_targets[indices])
+        return value
+
+    best_loss, best_state, stale, history = np.inf, None, 0, []
+    for epoch in range(epochs):
+        student.train()
+        order = torch.from_numpy(rng.permutation(train))
+        for i in range(0, len(order), batch_size):
+            batch = order[i:i + batch_size]
+            if len(batch) < 2:
+                continue
+            optimizer.zero_grad()
+            value = loss(batch)
+            value.backward()
+            optimizer.step()
+
+        student.eval()
+        with torch.no_grad():
+            validation_loss = loss(validation).item()
+        history.append(validation_loss)
+        if validation_loss < best_loss:
+            best_loss, best_state, stale = validation_loss, copy.deepcopy(student.state_dict()), 0
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+    if best_state is not None:
+        student.load_state_dict(best_state)
+    student.eval()
+    return {'epochs': len(history), 'validation_loss': history}
+
+
+class TrendModelRouter:
+    """Sert l'élève par défaut, le modèle complet seulement pour les séquences incertaines
+
+    Une séquence est escaladée quand l'écart-type prédit par l'élève dépasse threshold ;
+    calibrate() choisit threshold pour escalader une part donnée des séquences.
+    save() et load() gardent l'élève et le seuil ; le modèle complet est sauvegardé à part.
+    """
+
+    def __init__(self, student: nn.Module, teacher: nn.Module, threshold: float = np.inf):
+        self.student = student.eval()
+        self.teacher = teacher.eval()
+        self.threshold = threshold
+
+    def calibrate(self, features: torch.Tensor, escalation_rate: float = 0.1) -> float:
+        """Seuil d'incertitude au-dessus duquel escalader escalation_rate des séquences"""
+        _, std = self._student(features)
+        self.threshold = float(torch.quantile(std, 1 - escalation_rate)) if len(std) else np.inf
+        return self.threshold
+
+    def predict(self, features: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Prédictions et masque des séquences servies par le modèle complet"""
+        predictions, std = self._student(features)
+        escalated = std > self.threshold
+        if escalated.any():
+            # Une seule passe du modèle complet pour toutes les séquences escaladées
+            predictions[escalated] = teacher_predictions(self.teacher, features[escalated])
+        return predictions, escalated
+
+    def __call__(self, features: torch.Tensor) -> torch.Tensor:
+        return self.predict(features)[0]
+
+    def save(self, path: Union[str, Path]):
+        """Écrit les poids de l'élève et le seuil calibré"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save({'student_state_dict': self.student.state_dict(), 'threshold': float(self.threshold)}, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], student: nn.Module, teacher: nn.Module) -> 'TrendModelRouter':
+        """Routeur sauvegardé par save() ; student (même architecture) reçoit les poids de l'élève"""
+        state = torch.load(path, map_location='cpu', weights_only=True)
+        student.load_state_dict(state['student_state_dict'])
+        return cls(student, teacher, state['threshold'])
+
+    def _student(self, features: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        with torch.inference_mode():
+            mean, log_variance = self.student.predict_with_uncertainty(features)
+        return mean.clone(), (0.5 * log_variance).exp()
+
+
+def tier_report(router: TrendModelRouter, features: torch.Tensor, targets: torch.Tensor,
+                repetitions: int = 3) -> Dict[str, Dict[str, float]]:
+    """Latence et erreur de l'élève, du modèle complet et du routeur sur un jeu réservé"""
+    targets = torch.as_tensor(targets, dtype=torch.float32).reshape(-1)
+    teacher_output = teacher_predictions(router.teacher, features)
+    tiers = {
+        'eleve': lambda x: router._student(x)[0],
+        'complet': lambda x: teacher_predictions(router.teacher, x),
+        'routeur': router
+    }
+    report = {}
+    for name, predict in tiers.items():
+        predict(features[:2])
+        start = time.perf_counter()
+        for _ in range(repetitions):
+            predictions = predict(features)
+        duration = (time.perf_counter() - start) / repetitions
+        report[name] = {
+            'ms_par_sequence': duration / max(len(features), 1) * 1000,
+            'mse': (predictions - targets).pow(2).mean().item(),
+            'mse_vs_complet': (predictions - teacher_output).pow(2).mean().item()
+        }
+    report['routeur']['taux_escalade'] = router.predict(features)[1].float().mean().item()
+    report['parametres'] = {
+        'eleve': sum(p.numel() for p in router.student.parameters()),
+        'complet': sum(p.numel() for p in router.teacher.parameters())
+    }
+    return report
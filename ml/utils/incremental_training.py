@@ -0,0 +1,227 @@
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+from pathlib import Path
+import copy
+import logging
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+
+class IncrementalTrainer:
+    """Mises à jour incrémentales d'un modèle de séquences, reprises du dernier checkpoint
+
+    Chaque update() :
+    - reprend le modèle et l'état de l'optimiseur du checkpoint (pas de redémarrage à froid)
+    - entraîne sur les nouvelles fenêtres mêlées à un échantillon du réservoir de fenêtres
+      passées (échantillonnage uniforme, algorithme R), contre l'oubli
+    - garde pour la validation les nouvelles fenêtres dont la cible est la plus récente
+      (target_times, sinon la dernière tranche) et s'arrête quand la perte de validation
+      ne baisse plus (meilleurs poids restaurés)
+    - écrit le checkpoint : modèle, optimiseur, réservoir et métriques de référence, en
+      tenseurs et types simples uniquement (relu avec torch.load(weights_only=True))
+
+    Les métriques sont comparées à celles du dernier entraînement complet (set_baseline).
+    """
+
+    def __init__(self, model: nn.Module, checkpoint_path: Union[str, Path],
+                 optimizer_factory: Optional[Callable[[Any], torch.optim.Optimizer]] = None,
+                 reservoir_size: int = 5000, replay_ratio: float = 0.5, validation_split: float = 0.2,
+                 max_epochs: int = 5, patience: int = 1, batch_size: int = 64, seed: int = 0):
+        self.logger = logging.getLogger('incremental_training')
+        self.model = model
+        self.checkpoint_path = Path(checkpoint_path)
+        optimizer_factory = optimizer_factory or (lambda parameters: torch.optim.Adam(parameters, lr=1e-3))
+        self.optimizer = optimizer_factory(model.parameters())
+        self.criterion = nn.MSELoss()
+        self.reservoir_size = reservoir_size
+        self.replay_ratio = replay_ratio
+        self.validation_split = validation_split
+        self.max_epochs = max_epochs
+        self.patience = patience
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+        # Réservoir des fenêtres passées (alloué à la première mise à jour)
+        self.reservoir_features: Optional[torch.Tensor] = None
+        self.reservoir_targets: Optional[torch.Tensor] = None
+        self.seen = 0
+        self.baseline: Dict[str, float] = {}
+        self._loaded = False
+
+    @property
+    def reservoir_count(self) -> int:
+        return min(self.seen, self.reservoir_size)
+
+    def set_baseline(self, metrics: Dict[str, float], training_features: Optional[torch.Tensor] = None,
+                     training_targets: Optional[torch.Tensor] = None):
+        """À appeler après un entraînement complet du modèle
+
+        Ses métriques de validation deviennent la référence et ses poids le point de
+        reprise des mises à jour suivantes (le réservoir des fenêtres passées est gardé,
+        et alimenté par les fenêtres d'entraînement si elles sont données).
+        """
+        if not self._loaded:
+            self._loaded = True
+            if self.checkpoint_path.exists():
+                self._restore(self._read_checkpoint(), weights=False)
+        self.baseline = {name: float(value) for name, value in metrics.items()}
+        if training_features is not None:
+            self._add_to_reservoir(torch.as_tensor(training_features, dtype=torch.float32),
+                                   torch.as_tensor(training_targets, dtype=torch.float32).reshape(-1))
+        self._save_checkpoint()
+
+    def update(self, features: torch.Tensor, targets: torch.Tensor,
+               target_times: Optional[Any] = None) -> Dict[str, Any]:
+        """Met à jour le modèle sur de nouvelles fenêtres (N x longueur x features) et cibles (N)
+
+        target_times (N, horodatages comparables) : date de la cible de chaque fenêtre ;
+        sans, les fenêtres sont supposées dans l'ordre chronologique.
+        """
+        start_time = time.perf_counter()
+        self._load_checkpoint()
+        features = torch.as_tensor(features, dtype=torch.float32)
+        targets = torch.as_tensor(targets, dtype=torch.float32).reshape(-1)
+        if target_times is not None:
+            # Fenêtres rangées par date de cible : la validation porte sur les plus récentes, tous comptes confondus
+            order = torch.from_numpy(np.argsort(np.asarray(target_times), kind='stable'))
+            features, targets = features[order], targets[order]
+
+        # Validation : la tranche la plus récente des nouvelles fenêtres
+        n_validation = max(int(len(features) * self.validation_split), 1) if len(features) > 1 else 0
+        train_features, train_targets = features[:len(features) - n_validation], targets[:len(targets) - n_validation]
+        validation_features, validation_targets = features[len(features) - n_validation:], targets[len(targets) - n_validation:]
+
+        replay_features, replay_targets = self._replay_sample(
+            int(len(train_features) * self.replay_ratio), train_features, train_targets
+        )
+        mixed_features = torch.cat([train_features, replay_features])
+        mixed_targets = torch.cat([train_targets, replay_targets])
+
+        best_loss, best_state, epochs, stale = np.inf, None, 0, 0
+        for epoch in range(self.max_epochs):
+            self._train_epoch(mixed_features, mixed_targets)
+            epochs = epoch + 1
+            if not n_validation:
+                continue
+            loss = self.evaluate(validation_features, validation_targets)['mse']
+            if loss < best_loss:
+                best_loss, stale = loss, 0
+                best_state = copy.deepcopy(self.model.state_dict())
+            else:
+                stale += 1
+                if stale > self.patience:
+                    break
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+
+        self._add_to_reservoir(train_features, train_targets)
+        self._save_checkpoint()
+
+        metrics = self.evaluate(validation_features, validation_targets) if n_validation else {}
+        return {
+            'validation_metrics': metrics,
+            'baseline_metrics': self.baseline,
+            'difference_baseline': {
+                name: metrics[name] - self.baseline[name] for name in metrics if name in self.baseline
+            },
+            'epochs': epochs,
+            'new_windows': len(train_features),
+            'replayed_windows': len(replay_features),
+            'duration_s': time.perf_counter() - start_time
+        }
+
+    def evaluate(self, features: torch.Tensor, targets: torch.Tensor) -> Dict[str, float]:
+        """MSE, MAE et R² sur des fenêtres"""
+        self.model.eval()
+        with torch.no_grad():
+            predictions = torch.cat([
+                self.model(features[i:i + self.batch_size]).reshape(-1)
+                for i in range(0, len(features), self.batch_size)
+            ]) if len(features) else torch.zeros(0)
+        targets = targets.reshape(-1)
+        errors = predictions - targets
+        variance = ((targets - targets.mean()) ** 2).sum().item()
+        return {
+            'mse': errors.pow(2).mean().item(),
+            'mae': errors.abs().mean().item(),
+            'r2': 1 - errors.pow(2).sum().item() / variance if variance > 0 else 0.0
+        }
+
+    def _train_epoch(self, features: torch.Tensor, targets: torch.Tensor):
+        self.model.train()
+        order = torch.from_numpy(self.rng.permutation(len(features)))
+        for i in range(0, len(features), self.batch_size):
+            batch = order[i:i + self.batch_size]
+            if len(batch) < 2:
+                # BatchNorm ne s'entraîne pas sur une seule fenêtre
+                continue
+            self.optimizer.zero_grad()
+            loss = self.criterion(self.model(features[batch]).reshape(-1), targets[batch])
+            loss.backward()
+            self.optimizer.step()
+
+    def _replay_sample(self, count: int, features: torch.Tensor,
+                       targets: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Fenêtres tirées au hasard dans le réservoir (sans remise), au format de features"""
+        count = min(count, self.reservoir_count)
+        if not count:
+            return features[:0], targets[:0]
+        indices = torch.from_numpy(self.rng.choice(self.reservoir_count, count, replace=False))
+        return self.reservoir_features[indices], self.reservoir_targets[indices]
+
+    def _add_to_reservoir(self, features: torch.Tensor, targets: torch.Tensor):
+        """Algorithme R : chaque fenêtre vue reste dans le réservoir avec la même probabilité"""
+        if not len(features) or not self.reservoir_size:
+            return
+        if self.reservoir_features is None:
+            self.reservoir_features = torch.zeros((self.reservoir_size,) + tuple(features.shape[1:]))
+            self.reservoir_targets = torch.zeros(self.reservoir_size)
+
+        # Position de chaque nouvelle fenêtre dans le flux, puis case tirée dans [0, position]
+        positions = self.seen + np.arange(len(features))
+        slots = np.where(positions < self.reservoir_size, positions, self.rng.integers(0, positions + 1))
+        kept = np.flatnonzero(slots < self.reservoir_size)[::-1]
+        # Comme dans l'ordre du flux : une case tirée deux fois garde la dernière fenêtre
+        _, last = np.unique(slots[kept], return_index=True)
+        kept = torch.from_numpy(kept[last].copy())
+        self.reservoir_features[slots[kept]] = features[kept]
+        self.reservoir_targets[slots[kept]] = targets[kept]
+        self.seen += len(features)
+
+    def _load_checkpoint(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.checkpoint_path.exists():
+            return
+        self._restore(self._read_checkpoint())
+        self.logger.info(f"Reprise du checkpoint {self.checkpoint_path} ({self.seen} fenêtres vues)")
+
+    def _read_checkpoint(self) -> Dict[str, Any]:
+        return torch.load(self.checkpoint_path, map_location='cpu', weights_only=True)
+
+    def _restore(self, checkpoint: Dict[str, Any], weights: bool = True):
+        """État du checkpoint ; sans weights, seuls le réservoir et la référence sont repris"""
+        if weights:
+            self.model.load_state_dict(checkpoint['model_state_dict'])
+            if checkpoint.get('optimizer_state_dict'):
+                self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+        self.reservoir_features = checkpoint.get('reservoir_features')
+        self.reservoir_targets = checkpoint.get('reservoir_targets')
+        self.seen = int(checkpoint.get('seen', 0))
+        self.baseline = checkpoint.get('baseline', self.baseline)
+
+    def _save_checkpoint(self):
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.checkpoint_path.with_suffix('.tmp')
+        torch.save({
+            'model_state_dict': self.model.state_dict(),
+            'optimizer_state_dict': self.optimizer.state_dict(),
+            'reservoir_features': self.reservoir_features,
+            'reservoir_targets': self.reservoir_targets,
+            'seen': int(self.seen),
+            'baseline': {name: float(value) for name, value in self.baseline.items()}
+        }, temporary)
+        temporary.replace(self.checkpoint_path)
@@ -0,0 +1,249 @@
+from typing import Dict, Any, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+class RowExplosionError(ValueError):
+    """Jointure dont le nombre de lignes produit dépasse la limite autorisée"""
+
+
+def intern_keys(columns: List[pd.Series]) -> Tuple[pd.Index, List[np.ndarray]]:
+    """Remplace les valeurs de clé de plusieurs colonnes par des entiers communs
+
+    Les codes suivent l'ordre trié des valeurs (comme les clés d'un merge outer) ;
+    les clés manquantes reçoivent le code len(uniques), placé en dernier.
+    """
+    if columns and all(isinstance(column.dtype, pd.CategoricalDtype) for column in columns):
+        # Colonnes category : seules les catégories sont internées, les codes sont traduits
+        categories = [column.cat.categories for column in columns]
+        values = np.concatenate([np.asarray(c, dtype=object) for c in categories])
+        category_codes, uniques = pd.factorize(values, sort=True)
+        split, offset = [], 0
+        for column, column_categories in zip(columns, categories):
+            mapping = np.append(category_codes[offset:offset + len(column_categories)], len(uniques))
+            offset += len(column_categories)
+            # code -1 (valeur manquante) -> dernier élément du mapping
+            split.append(mapping[column.cat.codes.to_numpy()])
+        return pd.Index(uniques), split
+
+    values = np.concatenate([np.asarray(column, dtype=object) for column in columns]) if columns else np.array([], dtype=object)
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = np.where(codes < 0, len(uniques), codes)
+
+    split, offset = [], 0
+    for column in columns:
+        split.append(codes[offset:offset + len(column)])
+        offset += len(column)
+    return pd.Index(uniques), split
+
+
+def aggregate_duplicate_keys(frame: pd.DataFrame, codes: np.ndarray, key: str) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    """Regroupe les lignes de même clé (moyenne des colonnes numériques, première valeur sinon)
+
+    Retourne le DataFrame agrégé, ses codes et le nombre de lignes fusionnées.
+    """
+    if len(codes) == 0 or np.bincount(codes).max() <= 1:
+        return frame, codes, 0
+    first_rows = np.unique(codes, return_index=True)[1]
+    duplicates = len(codes) - len(first_rows)
+
+    columns = frame.drop(columns=[key])
+    aggregations = {
+        column: ('mean' if pd.api.types.is_numeric_dtype(columns[column]) and not pd.api.types.is_bool_dtype(columns[column]) else 'first')
+        for column in columns.columns
+    }
+    grouped = columns.groupby(codes, sort=True).agg(aggregations) if aggregations else pd.DataFrame(index=np.unique(codes))
+    grouped_codes = grouped.index.to_numpy()
+    grouped = grouped.reset_index(drop=True)
+    grouped.insert(frame.columns.get_loc(key), key, frame[key].iloc[first_rows].to_numpy())
+    return grouped, grouped_codes, duplicates
+
+
+def expected_outer_rows(left_codes: np.ndarray, right_codes: np.ndarray, n_keys: int) -> int:
+    """Nombre de lignes d'une jointure outer, calculé sans la faire"""
+    left_counts = np.bincount(left_codes, minlength=n_keys)
+    right_counts = np.bincount(right_codes, minlength=n_keys)
+    present = (left_counts > 0) | (right_counts > 0)
+    return int((np.maximum(left_counts, 1) * np.maximum(right_counts, 1))[present].sum())
+
+
+def outer_join_positions(left_codes: np.ndarray, right_codes: np.ndarray, n_keys: int,
+                         max_rows: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Positions des lignes gauche/droite (-1 si absente) d'une jointure outer sur codes entiers
+
+    Même ordre que pd.merge(how='outer') : clés triées, puis produit gauche x droite
+    dans l'ordre d'origine des lignes de chaque côté.
+    """
+    left_counts = np.bincount(left_codes, minlength=n_keys)
+    right_counts = np.bincount(right_codes, minlength=n_keys)
+    present = (left_counts > 0) | (right_counts > 0)
+    left_span = np.maximum(left_counts, 1)
+    right_span = np.maximum(right_counts, 1)
+    rows_per_key = np.where(present, left_span * right_span, 0)
+
+    total = int(rows_per_key.sum())
+    if max_rows is not None and total > max_rows:
+        raise RowExplosionError(
+            f"La jointure produirait {total} lignes (limite {max_rows}, "
+            f"{len(left_codes)} x {len(right_codes)} en entrée)"
+        )
+
+    left_order = np.argsort(left_codes, kind='stable')
+    right_order = np.argsort(right_codes, kind='stable')
+    left_start = np.cumsum(left_counts) - left_counts
+    right_start = np.cumsum(right_counts) - right_counts
+
+    row_key = np.repeat(np.arange(n_keys), rows_per_key)
+    offset = np.arange(total) - np.repeat(np.cumsum(rows_per_key) - rows_per_key, rows_per_key)
+    span = right_span[row_key]
+
+    left_positions = np.full(total, -1, dtype=np.int64)
+    has_left = left_counts[row_key] > 0
+    left_positions[has_left] = left_order[left_start[row_key[has_left]] + offset[has_left] // span[has_left]]
+
+    right_positions = np.full(total, -1, dtype=np.int64)
+    has_right = right_counts[row_key] > 0
+    right_positions[has_right] = right_order[right_start[row_key[has_right]] + offset[has_right] % span[has_right]]
+
+    return row_key, left_positions, right_positions
+
+
+def is_text(values: pd.Series) -> bool:
+    """Colonne de texte : dtype chaîne, object de chaînes, ou category de catégories texte"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return pd.api.types.is_string_dtype(values.cat.categories)
+    return pd.api.types.is_string_dtype(values.dtype)
+
+
+def gather(values: pd.Series, positions: np.ndarray, fill_value: Any = 0, text_fill_value: Any = '') -> pd.Series:
+    """values.take(positions), les positions -1 et les valeurs manquantes valant fill_value
+
+    Seules les colonnes qui en ont besoin sont remplies ; les colonnes numpy entières
+    gardent leur dtype au lieu de passer en float. Les colonnes de texte sont remplies
+    avec text_fill_value : elles restent homogènes (et convertibles en Arrow).
+    """
+    if is_text(values):
+        fill_value = text_fill_value
+    missing = positions < 0
+    if len(values) == 0:
+        return pd.Series(np.full(len(positions), fill_value))
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = np.where(missing, -1, values.cat.codes.to_numpy()[np.where(missing, 0, positions)])
+        result = pd.Series(pd.Categorical.from_codes(codes, dtype=values.dtype))
+        if (codes < 0).any():
+            if fill_value not in result.cat.categories:
+                result = result.cat.add_categories([fill_value])
+            result = result.fillna(fill_value)
+        return result
+
+    if isinstance(values.dtype, np.dtype):
+        taken = values.to_numpy()[np.where(missing, 0, positions)]
+        if missing.any():
+            if taken.dtype.kind in 'iub' or taken.dtype == object:
+                taken[missing] = fill_value
+            elif taken.dtype.kind in 'mM':
+                taken[missing] = taken.dtype.type('NaT')
+            else:
+                taken[missing] = np.nan
+        result = pd.Series(taken)
+    else:
+        result = pd.Series(values.array.take(positions, allow_fill=True))
+
+    if result.hasnans:
+        result = result.fillna(fill_value)
+    return result
+
+
+class IndexedJoin:
+    """Jointures outer successives sur une clé texte, via des clés entières internées
+
+    - les valeurs de clé sont internées une fois pour toutes les tables
+    - les tables déclarées `unique` voient leurs doublons de clé agrégés avant la jointure
+    - chaque jointure est calculée sur les codes triés, sans produit cartésien caché :
+      le nombre de lignes est connu avant de construire le résultat et borné par
+      `max_expansion` x (lignes en entrée)
+    - seules les colonnes qui en ont besoin sont remplies avec fill_value
+      (text_fill_value pour les colonnes de texte)
+    """
+
+    def __init__(self, key: str, max_expansion: float = 4.0, fill_value: Any = 0, text_fill_value: Any = ''):
+        self.logger = logging.getLogger('indexed_join')
+        self.key = key
+        self.max_expansion = max_expansion
+        self.fill_value = fill_value
+        self.text_fill_value = text_fill_value
+        self.last_report: Dict[str, Any] = {}
+
+    def join(self, frames: List[pd.DataFrame], unique: Optional[List[bool]] = None,
+             suffixes: Tuple[str, str] = ('_x', '_y')) -> pd.DataFrame:
+        """Jointure outer de gauche à droite de tous les frames sur la clé"""
+        unique = unique or [False] * len(frames)
+        uniques, codes = intern_keys([frame[self.key] for frame in frames])
+        n_keys = len(uniques) + 1
+        report = {'keys': len(uniques), 'aggregated_rows': {}, 'joins': []}
+
+        prepared = []
+        for i, (frame, frame_codes) in enumerate(zip(frames, codes)):
+            if unique[i]:
+                frame, frame_codes, merged_rows = aggregate_duplicate_keys(frame, frame_codes, self.key)
+                if merged_rows:
+                    self.logger.warning(f"Table {i} : {merged_rows} lignes de clé dupliquée agrégées avant jointure")
+                report['aggregated_rows'][i] = merged_rows
+            prepared.append((frame, frame_codes))
+
+        # Chaque colonne = (valeurs de la table source, positions dans cette table ou None)
+        columns = self._columns(prepared[0][0])
+        result_codes = prepared[0][1]
+        for frame, frame_codes in prepared[1:]:
+            input_rows = len(result_codes) + len(frame_codes)
+            max_rows = int(max(input_rows, 1) * self.max_expansion)
+            report['joins'].append({
+                'input_rows': input_rows,
+                'output_rows': expected_outer_rows(result_codes, frame_codes, n_keys)
+            })
+            self.last_report = report
+
+            row_key, left_positions, right_positions = outer_join_positions(
+                result_codes, frame_codes, n_keys, max_rows=max_rows
+            )
+            right_columns = self._columns(frame)
+            overlap = set(columns) & set(right_columns)
+            joined = {}
+            for name, (values, positions) in columns.items():
+                joined[name + suffixes[0] if name in overlap else name] = (values, self._compose(positions, left_positions))
+            for name, (values, _) in right_columns.items():
+                joined[name + suffixes[1] if name in overlap else name] = (values, right_positions)
+            columns = joined
+            result_codes = row_key
+
+        self.last_report = report
+        return self._build(prepared[0][0], columns, result_codes, uniques)
+
+    def _columns(self, frame: pd.DataFrame) -> Dict[str, Tuple[pd.Series, Optional[np.ndarray]]]:
+        """Colonnes hors clé d'une table, lignes prises telles quelles"""
+        return {name: (frame[name], None) for name in frame.columns if name != self.key}
+
+    def _compose(self, positions: Optional[np.ndarray], join_positions: np.ndarray) -> np.ndarray:
+        """Positions dans la table source après une jointure supplémentaire (-1 = ligne absente)"""
+        if positions is None:
+            return join_positions
+        return np.where(join_positions < 0, -1, positions[np.maximum(join_positions, 0)])
+
+    def _build(self, first: pd.DataFrame, columns: Dict[str, Any], codes: np.ndarray, uniques: pd.Index) -> pd.DataFrame:
+        """Rassemble chaque colonne une seule fois, à partir de ses positions finales"""
+        data = {
+            name: gather(values, np.arange(len(values)) if positions is None else positions,
+                         self.fill_value, self.text_fill_value)
+            for name, (values, positions) in columns.items()
+        }
+        key_codes = np.where(codes >= len(uniques), -1, codes)
+        result = pd.DataFrame(data, copy=False)
+        result.insert(
+            min(first.columns.get_loc(self.key), len(result.columns)),
+            self.key,
+            pd.Categorical.from_codes(key_codes, categories=uniques)
+        )
+        return result
@@ -0,0 +1,294 @@
+from typing import Dict, Any, Callable, Deque, Iterable, List, Optional, Union
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from .model_export import prepare_for_inference
+
+Predict = Callable[[torch.Tensor], Any]
+
+
+class _Request:
+    __slots__ = ('example', 'shape', 'future', 'submitted')
+
+    def __init__(self, example: Any):
+        # Exemple d'un tenseur, ou tuple de tenseurs pour un modèle à plusieurs entrées
+        self.example = tuple(map(torch.as_tensor, example)) if isinstance(example, tuple) else torch.as_tensor(example)
+        self.shape = tuple(part.shape for part in self.example) if isinstance(example, tuple) else self.example.shape
+        self.future: Future = Future()
+        self.submitted = time.perf_counter()
+
+
+class _ModelQueue:
+    """File d'attente et métriques d'un modèle"""
+
+    def __init__(self, predict: Predict, max_batch_size: int, max_latency: float, history: int):
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.pending: Deque[_Request] = deque()
+        self.running = 0
+        self.batch_sizes: Counter = Counter()
+        self.wait_ms: Deque[float] = deque(maxlen=history)
+        self.latency_ms: Deque[float] = deque(maxlen=history)
+        self.requests = 0
+        self.errors = 0
+
+
+class InferenceScheduler:
+    """Regroupe les requêtes d'un exemple en batchs, par modèle, sous une latence maximale
+
+    Les appelants soumettent un exemple (sans dimension batch) et un identifiant de
+    modèle, et reçoivent un Future. Un thread de répartition forme les batchs : un batch
+    part dès qu'il est plein ou que sa plus ancienne requête a attendu max_latency_ms.
+    Seuls des exemples de même forme sont regroupés ; un exemple peut être un tuple de
+    tenseurs (modèle à plusieurs entrées, empilées une à une). Les batchs s'exécutent sur
+    un pool de workers de la taille du CPU ; la sortie du modèle est découpée selon la
+    première dimension et chaque Future reçoit la ligne de sa requête. unregister() retire
+    un modèle qui n'est plus servi.
+    """
+
+    def __init__(self, max_batch_size: int = 64, max_latency_ms: float = 5.0,
+                 workers: Optional[int] = None, history: int = 10_000):
+        self.logger = logging.getLogger('inference_scheduler')
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.history = history
+        self.queues: Dict[str, _ModelQueue] = {}
+        self.condition = threading.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                           thread_name_prefix='inference')
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name='inference-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def register(self, model_id: str, model: Union[nn.Module, Predict], max_batch_size: Optional[int] = None,
+                 max_latency_ms: Optional[float] = None) -> Predict:
+        """Déclare un modèle : nn.Module ou fonction sur un batch ; rend le modèle servi
+
+        Un nn.Module est servi par une copie d'évaluation (prepare_for_inference) : le
+        modèle d'origine peut continuer à s'entraîner. Un identifiant déjà déclaré est
+        mis à jour (nouveaux poids après un entraînement) sans perdre sa file ni ses métriques.
+        """
+        predict = prepare_for_inference(model) if isinstance(model, nn.Module) else model
+        max_batch_size = max_batch_size or self.max_batch_size
+        max_latency = self.max_latency if max_latency_ms is None else max_latency_ms / 1000
+        with self.condition:
+            queue = self.queues.get(model_id)
+            if queue is None:
+                self.queues[model_id] = _ModelQueue(predict, max_batch_size, max_latency, self.history)
+            else:
+                queue.predict, queue.max_batch_size, queue.max_latency = predict, max_batch_size, max_latency
+        return predict
+
+    def register_models(self, models: Dict[str, Union[nn.Module, Predict]], prefix: str = '', **options):
+        """Déclare plusieurs modèles (par exemple LightweightLearner.models) sous prefix + nom"""
+        for name, model in models.items():
+            self.register(prefix + name, model, **options)
+
+    def unregister(self, model_id: str) -> bool:
+        """Retire un modèle, sa file et ses métriques ; ses requêtes en attente échouent
+
+        Les batchs déjà lancés se terminent normalement. Rend False si le modèle n'était
+        pas déclaré.
+        """
+        with self.condition:
+            queue = self.queues.pop(model_id, None)
+            pending = list(queue.pending) if queue is not None else []
+            if queue is not None:
+                queue.pending.clear()
+        for request in pending:
+            request.future.set_exception(KeyError(f"Modèle retiré : {model_id}"))
+        return queue is not None
+
+    def unregister_models(self, names: Iterable[str], prefix: str = ''):
+        """Retire plusieurs modèles déclarés par register_models sous prefix + nom"""
+        for name in names:
+            self.unregister(prefix + name)
+
+    def submit(self, model_id: str, example: Any) -> Future:
+        """Soumet un exemple (sans dimension batch) ; le Future rend la prédiction de cet exemple"""
+        request = _Request(example)
+        with self.condition:
+            if self._closed:
+                raise RuntimeError("Le scheduler est arrêté")
+            if model_id not in self.queues:
+                raise KeyError(f"Modèle non enregistré : {model_id}")
+            self.queues[model_id].pending.append(request)
+            self.queues[model_id].requests += 1
+            self.condition.notify()
+        return request.future
+
+    def predict(self, model_id: str, example: Any, timeout: Optional[float] = None) -> Any:
+        """Version bloquante de submit"""
+        return self.submit(model_id, example).result(timeout)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Par modèle : profondeur de file, batchs en cours, histogramme des tailles de batch,
+        attente en file et latence totale (ms, percentiles sur les dernières requêtes)"""
+        with self.condition:
+            return {
+                model_id: {
+                    'queue_depth': len(queue.pending),
+                    'running_batches': queue.running,
+                    'requests': queue.requests,
+                    'errors': queue.errors,
+                    'batch_sizes': dict(sorted(queue.batch_sizes.items())),
+                    'mean_batch_size': (
+                        sum(size * count for size, count in queue.batch_sizes.items())
+                        / max(sum(queue.batch_sizes.values()), 1)
+                    ),
+                    'wait_ms': _percentiles(queue.wait_ms),
+                    'latency_ms': _percentiles(queue.latency_ms)
+                }
+                for model_id, queue in self.queues.items()
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Arrête le scheduler après avoir servi les requêtes en attente"""
+        with self.condition:
+            self._closed = True
+            self.condition.notify()
+        self._dispatcher.join()
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self) -> 'InferenceScheduler':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def _dispatch(self):
+        with self.condition:
+            while True:
+                timeout = self._launch_ready()
+                if self._closed and not any(queue.pending for queue in self.queues.values()):
+                    return
+                self.condition.wait(timeout)
+
+    def _launch_ready(self) -> Optional[float]:
+        """Lance les batchs prêts (appelé sous le verrou) ; rend le délai avant la prochaine échéance"""
+        now = time.perf_counter()
+        next_deadline = None
+        for model_id, queue in self.queues.items():
+            while queue.pending:
+                deadline = queue.pending[0].submitted + queue.max_latency
+                if len(queue.pending) < queue.max_batch_size and deadline > now and not self._closed:
+                    next_deadline = deadline if next_deadline is None else min(next_deadline, deadline)
+                    break
+                batch = self._take_batch(queue)
+                queue.running += 1
+                self.executor.submit(self._run, model_id, queue, batch)
+        return None if next_deadline is None else max(next_deadline - now, 0.0)
+
+    @staticmethod
+    def _take_batch(queue: _ModelQueue) -> List[_Request]:
+        """Requêtes de même forme que la plus ancienne, dans l'ordre d'arrivée"""
+        shape = queue.pending[0].shape
+        batch, kept = [], deque()
+        while queue.pending and len(batch) < queue.max_batch_size:
+            request = queue.pending.popleft()
+            (batch if request.shape == shape else kept).append(request)
+        kept.extend(queue.pending)
+        queue.pending = kept
+        return batch
+
+    def _run(self, model_id: str, queue: _ModelQueue, batch: List[_Request]):
+        started = time.perf_counter()
+        try:
+            with torch.inference_mode():
+                examples = [request.example for request in batch]
+                if isinstance(examples[0], tuple):
+                    outputs = queue.predict(*(torch.stack(parts) for parts in zip(*examples)))
+                else:
+                    outputs = queue.predict(torch.stack(examples))
+            rows = _split(outputs, len(batch))
+            error = None
+        except Exception as e:
+            self.logger.error(f"Erreur d'inférence ({model_id}, batch de {len(batch)}): {e}")
+            rows, error = None, e
+        finished = time.perf_counter()
+
+        with self.condition:
+            queue.running -= 1
+            queue.batch_sizes[len(batch)] += 1
+            if error is not None:
+                queue.errors += len(batch)
+            for request in batch:
+                queue.wait_ms.append((started - request.submitted) * 1000)
+                queue.latency_ms.append((finished - request.submitted) * 1000)
+        for i, request in enumerate(batch):
+            if error is not None:
+                request.future.set_exception(error)
+            else:
+                request.future.set_result(rows[i])
+
+
+def _split(outputs: Any, size: int) -> List[Any]:
+    """Sortie d'un batch découpée par exemple
+
+    Tenseur ou tableau : lignes ; dict et tuple (par exemple moyenne et log-variance) :
+    découpés élément par élément ; liste : déjà une sortie par exemple.
+    """
+    if isinstance(outputs, torch.Tensor):
+        return list(outputs.unbind(0)) if outputs.dim() else [outputs] * size
+    if isinstance(outputs, dict):
+        columns = {name: _split(value, size) for name, value in outputs.items()}
+        return [{name: rows[i] for name, rows in columns.items()} for i in range(size)]
+    if isinstance(outputs, tuple):
+        columns = [_split(value, size) for value in outputs]
+        return [type(outputs)(rows[i] for rows in columns) for i in range(size)]
+    return list(outputs)
+
+
+def _percentiles(values: Deque[float]) -> Dict[str, float]:
+    if not values:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    p50, p95, p99 = np.percentile(np.fromiter(values, dtype=float), [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(max(values))}
+
+
+_default_scheduler: Optional[InferenceScheduler] = None
+_default_lock = threading.Lock()
+
+
+def default_scheduler() -> InferenceScheduler:
+    """Scheduler partagé par les agents du processus (créé au premier appel)"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = InferenceScheduler()
+        return _default_scheduler
+
+
+class ScheduledModel:
+    """Inférence d'un exemple par le scheduler partagé (mixin des modèles de ml.core.models)
+
+    serve() déclare une copie d'évaluation des poids courants (à rappeler après un
+    entraînement) ; submit() soumet un exemple sans dimension batch et rend un Future ;
+    unserve() retire le modèle du scheduler. Seul l'identifiant est gardé sur le modèle :
+    il reste copiable et sérialisable.
+    """
+
+    def serve(self, model_id: Optional[str] = None, scheduler: Optional[InferenceScheduler] = None,
+              **options) -> str:
+        self._served_id = model_id or getattr(self, '_served_id', None) or f"{type(self).__name__}-{id(self):x}"
+        (scheduler or default_scheduler()).register(self._served_id, self, **options)
+        return self._served_id
+
+    def submit(self, example: Any, scheduler: Optional[InferenceScheduler] = None) -> Future:
+        if getattr(self, '_served_id', None) is None:
+            self.serve(scheduler=scheduler)
+        return (scheduler or default_scheduler()).submit(self._served_id, example)
+
+    def unserve(self, scheduler: Optional[InferenceScheduler] = None):
+        if getattr(self, '_served_id', None) is not None:
+            (scheduler or default_scheduler()).unregister(self._served_id)
+            self._served_id = None
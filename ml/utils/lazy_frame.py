@@ -0,0 +1,79 @@
+from typing import Callable, Iterator, List, Optional
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from .schema_loader import concat_chunks
+
+
+class LazyFrame:
+    """Table découpée en parties lues à la demande, transformée bloc par bloc
+
+    Chaque partie est une fonction sans argument qui rend un DataFrame (en général la
+    relecture memory-mappée d'un fichier Arrow) ; les transformations sont appliquées
+    à chaque bloc au moment de la lecture. La table entière n'est jamais en mémoire,
+    sauf si on la demande avec collect() : au plus prefetch parties lues d'avance
+    (en parallèle, une par thread) s'ajoutent au bloc courant.
+    """
+
+    # Parties lues d'avance par défaut pendant le traitement du bloc courant
+    PREFETCH = 2
+
+    def __init__(self, parts: List[Callable[[], pd.DataFrame]], rows: Optional[List[int]] = None,
+                 transforms: tuple = (), prefetch: Optional[int] = None):
+        self.parts = list(parts)
+        # Lignes de chaque partie avant transformation, si connues
+        self.rows = rows
+        self.transforms = tuple(transforms)
+        self.prefetch = max(1, self.PREFETCH if prefetch is None else prefetch)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'LazyFrame':
+        """Table d'une seule partie déjà en mémoire"""
+        return cls([lambda: frame], rows=[len(frame)])
+
+    def transform(self, function: Callable[[pd.DataFrame], pd.DataFrame]) -> 'LazyFrame':
+        """Nouvelle table dont chaque bloc passe aussi par function (rien n'est calculé ici)"""
+        return LazyFrame(self.parts, self.rows, self.transforms + (function,), self.prefetch)
+
+    def iter_chunks(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Blocs transformés, dans l'ordre des parties
+
+        Les prefetch parties suivantes sont lues en parallèle pendant le traitement du bloc
+        courant ; les transformations restent appliquées dans le thread appelant.
+        """
+        if not self.parts:
+            return
+        remaining = iter(self.parts)
+        with ThreadPoolExecutor(max_workers=min(self.prefetch, len(self.parts))) as executor:
+            pending = deque(executor.submit(part) for part in islice(remaining, self.prefetch))
+            try:
+                while pending:
+                    chunk = pending.popleft().result()
+                    next_part = next(remaining, None)
+                    if next_part is not None:
+                        pending.append(executor.submit(next_part))
+                    for function in self.transforms:
+                        chunk = function(chunk)
+                    yield chunk if columns is None else chunk[columns]
+            finally:
+                # Itération interrompue : les lectures pas encore commencées sont abandonnées
+                for future in pending:
+                    future.cancel()
+
+    @property
+    def empty(self) -> bool:
+        if self.rows is not None and not self.transforms:
+            return sum(self.rows) == 0
+        return all(chunk.empty for chunk in self.iter_chunks())
+
+    def collect(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Table entière en mémoire (mêmes valeurs, lignes dans l'ordre des parties)"""
+        chunks = [chunk for chunk in self.iter_chunks(columns) if len(chunk)]
+        if not chunks:
+            return next(self.iter_chunks(columns), pd.DataFrame(columns=columns))
+        if len(chunks) == 1:
+            return chunks[0].reset_index(drop=True)
+        return concat_chunks(chunks, ignore_index=True)
@@ -0,0 +1,395 @@
+from typing import Dict, Any, List, Optional, Tuple
+from fractions import Fraction
+import heapq
+import math
+
+import numpy as np
+import pandas as pd
+
+from .multi_aggregation import MarketAggregates
+
+# Valeurs en virgule fixe : entier le plus proche de valeur * 2**SCALE_BITS
+SCALE_BITS = 32
+# Découpage des entiers en limbes de 16 bits : sur un bloc de MAX_EXACT_BLOCK_ROWS lignes,
+# sommes de limbes et de produits de limbes restent des entiers < 2**53, exacts en float64
+LIMB_BITS = 16
+N_LIMBS = 4
+MAX_EXACT_BLOCK_ROWS = 1 << 18
+
+
+class MarketRollups(MarketAggregates):
+    """Cumuls exacts et incrémentaux : effectif, somme et somme des carrés par groupe, co-moments
+
+    Chaque valeur est convertie en virgule fixe (résolution 2**-32, |valeur| < 2**31) puis
+    découpée en limbes de 16 bits. Les bincount et produits matriciels sur ces limbes ne
+    manipulent que des entiers inférieurs à 2**53 : ils sont exacts en float64 quel que soit
+    l'ordre des additions, et les cumuls sont tenus en entiers Python.
+
+    L'état ne dépend donc que de l'ensemble des lignes vues : ajouter un lot avec `update`
+    donne exactement les mêmes cumuls, et les mêmes réponses, qu'un recalcul complet.
+    Les requêtes ne lisent que les cumuls (coût proportionnel au nombre de groupes).
+
+    Avec tag_column, les tags de chaque ligne (mots d'une colonne texte, comme les
+    hashtags) forment des groupes de plus : effectif et somme exacte de tag_value par tag.
+    """
+
+    GROUP_FIELDS = ('counts', 'sums', 'sumsq')
+    TAG_PATTERN = r'#?(\w+)'
+
+    def __init__(self, group_keys: List[str], value_columns: List[str],
+                 corr_columns: Optional[List[str]] = None, block_rows: int = MAX_EXACT_BLOCK_ROWS,
+                 max_joint_cells: int = 1 << 16, tag_column: Optional[str] = None,
+                 tag_value: Optional[str] = None):
+        super().__init__(group_keys, value_columns, corr_columns,
+                         block_rows=min(block_rows, MAX_EXACT_BLOCK_ROWS), max_joint_cells=max_joint_cells)
+        self.sumsq = self._zeros(len(self.value_columns))
+        self.tag_column = tag_column
+        self.tag_value = tag_value
+        # tag -> [effectif, somme en virgule fixe]
+        self.tags: Dict[str, List[int]] = {}
+
+    def _zeros(self, shape) -> np.ndarray:
+        """Cumuls en entiers Python (précision illimitée)"""
+        return np.zeros(shape, dtype=object)
+
+    def copy(self) -> 'MarketRollups':
+        """Copie indépendante de l'état"""
+        return self.from_state(self.to_state())
+
+    def update(self, data: pd.DataFrame):
+        super().update(data)
+        if self.tag_column is not None:
+            self._accumulate_tags(data)
+
+    def _accumulate_tags(self, data: pd.DataFrame):
+        """Effectif et somme de tag_value par tag (lignes sans tag ou sans valeur ignorées)"""
+        if self.tag_column not in data or self.tag_value not in data or data.empty:
+            return
+        tags = data[self.tag_column].fillna('').astype(str).str.lower().str.findall(self.TAG_PATTERN)
+        exploded = pd.DataFrame({
+            'tag': tags.to_numpy(),
+            'value': pd.to_numeric(data[self.tag_value], errors='coerce').to_numpy(dtype=np.float64)
+        }).explode('tag').dropna()
+        if exploded.empty:
+            return
+
+        codes, labels = pd.factorize(exploded['tag'])
+        values = exploded['value'].to_numpy(dtype=np.float64)
+        if not (np.abs(values) < 2.0 ** (63 - SCALE_BITS)).all():
+            raise ValueError(
+                f"{self.tag_value} : valeurs hors de la plage des cumuls exacts (|valeur| < 2**{63 - SCALE_BITS})"
+            )
+        totals = np.zeros(len(labels), dtype=object)
+        for start in range(0, len(values), MAX_EXACT_BLOCK_ROWS):
+            stop = start + MAX_EXACT_BLOCK_ROWS
+            limbs = _limbs(np.rint(np.ldexp(values[start:stop], SCALE_BITS)).astype(np.int64))
+            for t, limb in limbs.items():
+                sums = np.bincount(codes[start:stop], weights=limb, minlength=len(labels))
+                totals = totals + (sums.astype(np.int64).astype(object) << (LIMB_BITS * t))
+        counts = np.bincount(codes, minlength=len(labels))
+        for label, count, total in zip(labels, counts.tolist(), totals):
+            entry = self.tags.setdefault(str(label), [0, 0])
+            entry[0] += count
+            entry[1] += int(total)
+
+    def tag_means(self, limit: Optional[int] = None) -> List[Tuple[str, float, int]]:
+        """(tag, moyenne de tag_value, effectif), meilleures moyennes puis plus grands effectifs d'abord"""
+        ranked = ((-_ratio(total, count), -count, tag) for tag, (count, total) in self.tags.items())
+        best = sorted(ranked) if limit is None else heapq.nsmallest(limit, ranked)
+        return [(tag, -mean, -count) for mean, count, tag in best]
+
+    def _prepare_block(self, block: Dict[int, np.ndarray], n: int) -> tuple:
+        """Convertit chaque colonne du bloc en limbes (0 pour les manquants) et cumule les totaux
+
+        block[position] devient ({t: limbe t}, {s: terme s du carré}), limbes nuls omis :
+        les entiers n'occupent que les limbes hauts, les taux inférieurs à 1 les limbes bas.
+        """
+        present = {}
+        counts = np.zeros(len(self.value_columns), dtype=np.int64)
+        sums = self._zeros(len(self.value_columns))
+        for position, values in block.items():
+            values = values.astype(np.float64, copy=False)
+            missing = np.isnan(values)
+            if missing.any():
+                present[position] = (~missing).astype(np.float64)
+                values = np.where(missing, 0.0, values)
+            if not (np.abs(values) < 2.0 ** (63 - SCALE_BITS)).all():
+                raise ValueError(
+                    f"{self.value_columns[position]} : valeurs hors de la plage des cumuls exacts "
+                    f"(|valeur| < 2**{63 - SCALE_BITS})"
+                )
+            limbs = _limbs(np.rint(np.ldexp(values, SCALE_BITS)).astype(np.int64))
+            squares = _square_terms(limbs)
+            block[position] = (limbs, squares)
+            counts[position] = int(present[position].sum()) if position in present else n
+            sums[position] = _combine_terms({t: limb.sum() for t, limb in limbs.items()})
+            self.sumsq[position] += _combine_terms({s: terms.sum() for s, terms in squares.items()})
+
+        self.counts += counts.astype(object)
+        self.sums += sums
+        return present, counts, sums
+
+    def _cell_tables(self, cells: np.ndarray, n_cells: int, block: Dict[int, tuple],
+                     present: Dict[int, np.ndarray]) -> tuple:
+        """Lignes [cases] et cumuls {champ: [colonnes, puissances de 2**16, cases]} (entiers exacts en float64)"""
+        m = len(self.value_columns)
+        rows = np.bincount(cells, minlength=n_cells)
+        tables = {
+            'counts': np.zeros((m, 1, n_cells)),
+            'sums': np.zeros((m, N_LIMBS, n_cells)),
+            'sumsq': np.zeros((m, 2 * N_LIMBS - 1, n_cells))
+        }
+        for position, (limbs, squares) in block.items():
+            tables['counts'][position, 0] = np.bincount(cells, weights=present[position], minlength=n_cells) \
+                if position in present else rows
+            for t, limb in limbs.items():
+                tables['sums'][position, t] = np.bincount(cells, weights=limb, minlength=n_cells)
+            for s, terms in squares.items():
+                tables['sumsq'][position, s] = np.bincount(cells, weights=terms, minlength=n_cells)
+        return rows, tables
+
+    def _add_group_tables(self, key: str, rows: np.ndarray, tables: Dict[str, np.ndarray]):
+        """Ajoute des cumuls [colonnes, puissances de 2**16, groupes] à l'état d'une clé"""
+        group = self.groups[key]
+        group['rows'] += rows.astype(np.int64).astype(object)
+        for field, table in tables.items():
+            group[field] += _combine(table, axis=1).T
+
+    def _accumulate_joint(self, keys: List[str], sizes: List[int], cells: np.ndarray,
+                          block: Dict[int, tuple], present: Dict[int, np.ndarray]):
+        """Cumuls sur les cases combinées, puis marginale de chaque clé"""
+        rows, tables = self._cell_tables(cells.astype(np.intp), int(np.prod(sizes)), block, present)
+        for axis, key in enumerate(keys):
+            others = tuple(a for a in range(len(keys)) if a != axis)
+            key_rows = rows.reshape(sizes).sum(axis=others)[:-1]
+            key_tables = {
+                field: table.reshape(table.shape[:2] + tuple(sizes)).sum(axis=tuple(a + 2 for a in others))[:, :, :-1]
+                for field, table in tables.items()
+            }
+            self._add_group_tables(key, key_rows, key_tables)
+
+    def _accumulate_key(self, key: str, codes: np.ndarray, block: Dict[int, tuple],
+                        present: Dict[int, np.ndarray]):
+        """Cumuls d'une clé seule (trop de combinaisons pour des cases combinées)"""
+        valid = codes >= 0
+        rows, tables = self._cell_tables(
+            codes[valid],
+            len(self.groups[key]['labels']),
+            {
+                position: ({t: limb[valid] for t, limb in limbs.items()}, {s: terms[valid] for s, terms in squares.items()})
+                for position, (limbs, squares) in block.items()
+            },
+            {position: mask[valid] for position, mask in present.items()}
+        )
+        self._add_group_tables(key, rows, tables)
+
+    def _accumulate_comoments(self, block: Dict[int, tuple], present: Dict[int, np.ndarray],
+                              counts: np.ndarray, sums: np.ndarray, n: int):
+        """Co-moments exacts par paires complètes : produits matriciels des limbes"""
+        positions = [self.value_columns.index(column) for column in self.corr_columns]
+        k = len(positions)
+        limbs = np.zeros((k * N_LIMBS, n))
+        # Lignes où la colonne manque (colonne absente du bloc ou valeur manquante)
+        absent = {}
+        for i, position in enumerate(positions):
+            if position not in block:
+                absent[i] = np.arange(n)
+                continue
+            for t, limb in block[position][0].items():
+                limbs[i * N_LIMBS + t] = limb
+            if position in present:
+                absent[i] = np.flatnonzero(present[position] == 0)
+
+        cross = _combine_products(limbs @ limbs.T, k)
+        pair_sums = np.repeat(sums[positions][:, None], k, axis=1)
+        pair_sumsq = np.repeat(np.diag(cross)[:, None], k, axis=1)
+        pair_counts = np.repeat(counts[positions].astype(object)[:, None], k, axis=1)
+
+        # [i, j] porte sur les lignes où i et j sont présents : toutes les lignes de i,
+        # moins celles où j manque
+        for j, rows in absent.items():
+            subset = limbs[:, rows]
+            subset_sums = _combine(subset.sum(axis=1).reshape(k, N_LIMBS), axis=1)
+            subset_sumsq = np.diag(_combine_products(subset @ subset.T, k))
+            for i in range(k):
+                pair_sums[i, j] -= subset_sums[i]
+                pair_sumsq[i, j] -= subset_sumsq[i]
+                pair_counts[i, j] -= len(rows)
+                if i in absent:
+                    # lignes où i et j manquent toutes deux : déjà hors des effectifs de i
+                    pair_counts[i, j] += np.intersect1d(absent[i], rows, assume_unique=True).size
+
+        self.cross += cross
+        self.pair_sums += pair_sums
+        self.pair_sumsq += pair_sumsq
+        self.pair_counts += pair_counts
+
+    def group_means(self, key: str, column: str) -> Dict[Any, float]:
+        """Équivalent de data.groupby(key, observed=True)[column].mean().to_dict(), arrondi correct"""
+        if key not in self.available_keys:
+            raise KeyError(key)
+        position = self._column_position(column)
+        group = self.groups[key]
+        return {
+            label: _ratio(group['sums'][g, position], group['counts'][g, position])
+            for label, g in self._ordered_groups(key)
+            if group['rows'][g] > 0
+        }
+
+    def group_std(self, key: str, column: str) -> Dict[Any, float]:
+        """Équivalent de data.groupby(key, observed=True)[column].std().to_dict()"""
+        if key not in self.available_keys:
+            raise KeyError(key)
+        position = self._column_position(column)
+        group = self.groups[key]
+        return {
+            label: _std(group['counts'][g, position], group['sums'][g, position], group['sumsq'][g, position])
+            for label, g in self._ordered_groups(key)
+            if group['rows'][g] > 0
+        }
+
+    def mean(self, column: str) -> float:
+        """Équivalent de data[column].mean(), arrondi correct"""
+        position = self._column_position(column)
+        return _ratio(self.sums[position], self.counts[position])
+
+    def _pair_corr(self, i: int, j: int) -> float:
+        """Corrélation de Pearson à partir des co-moments entiers (variance nulle détectée exactement)"""
+        n = self.pair_counts[i, j]
+        if n < 2:
+            return float('nan')
+        sum_i, sum_j = self.pair_sums[i, j], self.pair_sums[j, i]
+        variance_i = n * self.pair_sumsq[i, j] - sum_i * sum_i
+        variance_j = n * self.pair_sumsq[j, i] - sum_j * sum_j
+        if variance_i <= 0 or variance_j <= 0:
+            return float('nan')
+        if i == j:
+            return 1.0
+        covariance = n * self.cross[i, j] - sum_i * sum_j
+        return float(min(1.0, max(-1.0, covariance / (math.sqrt(variance_i) * math.sqrt(variance_j)))))
+
+    def to_state(self) -> Dict[str, Any]:
+        """État sérialisable en JSON (entiers exacts, libellés des groupes)"""
+        return {
+            'group_keys': self.group_keys,
+            'value_columns': self.value_columns,
+            'corr_columns': self.corr_columns,
+            'tag_column': self.tag_column,
+            'tag_value': self.tag_value,
+            'tags': self.tags,
+            'rows': self.rows,
+            'available_columns': sorted(self.available_columns),
+            'available_keys': sorted(self.available_keys),
+            'totals': {name: getattr(self, name).tolist() for name in ('counts', 'sums', 'sumsq')},
+            'groups': {
+                key: {
+                    'labels': group['labels'],
+                    'rows': group['rows'].tolist(),
+                    **{field: group[field].tolist() for field in self.GROUP_FIELDS}
+                }
+                for key, group in self.groups.items()
+            },
+            'comoments': {
+                name: getattr(self, name).tolist()
+                for name in ('pair_counts', 'pair_sums', 'pair_sumsq', 'cross')
+            }
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'MarketRollups':
+        """Reconstruit des cumuls à partir de to_state()"""
+        rollups = cls(state['group_keys'], state['value_columns'], state['corr_columns'],
+                      tag_column=state.get('tag_column'), tag_value=state.get('tag_value'))
+        rollups.tags = {tag: list(entry) for tag, entry in state.get('tags', {}).items()}
+        m, k = len(rollups.value_columns), len(rollups.corr_columns)
+        rollups.rows = state['rows']
+        rollups.available_columns = set(state['available_columns'])
+        rollups.available_keys = set(state['available_keys'])
+        for name, values in state['totals'].items():
+            setattr(rollups, name, _object_array(values, (m,)))
+        for key, saved in state['groups'].items():
+            labels = list(saved['labels'])
+            rollups.groups[key] = {
+                'labels': labels,
+                'index': {label: g for g, label in enumerate(labels)},
+                'rows': _object_array(saved['rows'], (len(labels),)),
+                **{field: _object_array(saved[field], (len(labels), m)) for field in cls.GROUP_FIELDS}
+            }
+        for name, values in state['comoments'].items():
+            setattr(rollups, name, _object_array(values, (k, k)))
+        return rollups
+
+
+def _limbs(fixed: np.ndarray) -> Dict[int, np.ndarray]:
+    """Limbes non nuls de 16 bits (le dernier porte le signe) : fixed = somme des limbes[t] * 2**(16 t)"""
+    limbs = {}
+    for t in range(N_LIMBS):
+        limb = fixed >> (LIMB_BITS * t)
+        if t < N_LIMBS - 1:
+            limb = limb & ((1 << LIMB_BITS) - 1)
+        if limb.any():
+            limbs[t] = limb.astype(np.float64)
+    return limbs
+
+
+def _square_terms(limbs: Dict[int, np.ndarray]) -> Dict[int, np.ndarray]:
+    """Termes du carré par puissance de 2**16 : carré = somme des termes[s] * 2**(16 s)"""
+    terms: Dict[int, np.ndarray] = {}
+    active = sorted(limbs)
+    for a, t in enumerate(active):
+        for u in active[a:]:
+            product = limbs[t] * limbs[u]
+            if u != t:
+                product *= 2.0
+            if t + u in terms:
+                terms[t + u] += product
+            else:
+                terms[t + u] = product
+    return terms
+
+
+def _combine_terms(sums: Dict[int, float]) -> int:
+    """Entier exact à partir de sommes par puissance de 2**16"""
+    return sum(int(total) << (LIMB_BITS * s) for s, total in sums.items())
+
+
+def _combine(table: np.ndarray, axis: int = 0) -> Any:
+    """Recompose des entiers exacts à partir de sommes par puissance de 2**16 (axe `axis`)"""
+    parts = np.moveaxis(np.asarray(table), axis, 0).astype(np.int64).astype(object)
+    total = parts[0]
+    for s in range(1, len(parts)):
+        total = total + (parts[s] << (LIMB_BITS * s))
+    return total.item() if isinstance(total, np.ndarray) and total.ndim == 0 else total
+
+
+def _combine_products(products: np.ndarray, k: int) -> np.ndarray:
+    """Produits croisés [k, k] exacts à partir des produits de limbes [k * N_LIMBS, k * N_LIMBS]"""
+    parts = products.reshape(k, N_LIMBS, k, N_LIMBS).astype(np.int64).astype(object)
+    total = np.zeros((k, k), dtype=object)
+    for t in range(N_LIMBS):
+        for u in range(N_LIMBS):
+            total = total + (parts[:, t, :, u] << (LIMB_BITS * (t + u)))
+    return total
+
+
+def _ratio(total: int, count: int) -> float:
+    """Moyenne d'une somme en virgule fixe, arrondie correctement en float"""
+    if not count:
+        return float('nan')
+    return float(Fraction(int(total), int(count) << SCALE_BITS))
+
+
+def _std(count: int, total: int, sumsq: int) -> float:
+    """Écart-type (ddof=1) à partir des cumuls en virgule fixe"""
+    count, total, sumsq = int(count), int(total), int(sumsq)
+    if count < 2:
+        return float('nan')
+    return math.sqrt(float(Fraction(count * sumsq - total * total, (count * (count - 1)) << (2 * SCALE_BITS))))
+
+
+def _object_array(values: list, shape: tuple) -> np.ndarray:
+    """Tableau d'entiers Python de forme donnée (listes JSON éventuellement vides)"""
+    array = np.empty(shape, dtype=object)
+    if array.size:
+        array[...] = np.array(values, dtype=object).reshape(shape)
+    return array
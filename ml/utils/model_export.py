@@ -0,0 +1,111 @@
+from typing import Dict, Any, Iterable, Optional, Union
+from pathlib import Path
+import copy
+import logging
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+try:
+    import onnxruntime as ort
+except ImportError:  # export ONNX possible, exécution ONNX indisponible
+    ort = None
+
+logger = logging.getLogger('model_export')
+
+
+def prepare_for_inference(model: nn.Module) -> nn.Module:
+    """Copie du modèle en mode évaluation, sans gradients, sur CPU (le modèle d'origine reste intact)"""
+    inference_model = copy.deepcopy(model).cpu().eval()
+    for parameter in inference_model.parameters():
+        parameter.requires_grad_(False)
+    return inference_model
+
+
+def export_torchscript(model: nn.Module, example: torch.Tensor,
+                       path: Optional[Union[str, Path]] = None) -> torch.jit.ScriptModule:
+    """Modèle tracé en TorchScript puis figé (constantes repliées, BatchNorm fusionnées)
+
+    Le tracé ne contient que des opérations sur des tenseurs : le batch et la longueur
+    de séquence restent libres (vérifié par validate_parity sur d'autres formes).
+    """
+    inference_model = prepare_for_inference(model)
+    with torch.no_grad():
+        traced = torch.jit.trace(inference_model, example.cpu(), check_trace=False)
+        frozen = torch.jit.freeze(traced)
+    if path is not None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        frozen.save(str(path))
+    return frozen
+
+
+def export_onnx(model: nn.Module, example: torch.Tensor, path: Union[str, Path]) -> Path:
+    """Modèle exporté en ONNX (paquet onnx requis), axes batch et séquence dynamiques"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Le chemin rapide de MultiheadAttention (_native_multi_head_attention) n'a pas
+    # d'équivalent ONNX : l'attention est exportée en opérations élémentaires
+    fastpath = torch.backends.mha.get_fastpath_enabled()
+    torch.backends.mha.set_fastpath_enabled(False)
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                prepare_for_inference(model), (example.cpu(),), str(path),
+                input_names=['sequences'], output_names=['predictions'],
+                dynamic_axes={'sequences': {0: 'batch', 1: 'sequence'}, 'predictions': {0: 'batch'}},
+                dynamo=False
+            )
+    finally:
+        torch.backends.mha.set_fastpath_enabled(fastpath)
+    return path
+
+
+class CompiledPredictor:
+    """Exécution d'un modèle exporté (TorchScript ou ONNX) sous inference_mode
+
+    Appelé avec un tenseur (batch x séquence x features), rend un tenseur CPU.
+    """
+
+    def __init__(self, module: Any, backend: str = 'torchscript'):
+        self.module = module
+        self.backend = backend
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'CompiledPredictor':
+        """Modèle exporté relu depuis un fichier .pt (TorchScript) ou .onnx"""
+        path = Path(path)
+        if path.suffix == '.onnx':
+            if ort is None:
+                raise ImportError("onnxruntime n'est pas installé")
+            return cls(ort.InferenceSession(str(path), providers=['CPUExecutionProvider']), 'onnx')
+        return cls(torch.jit.load(str(path), map_location='cpu'), 'torchscript')
+
+    def __call__(self, sequences: torch.Tensor) -> torch.Tensor:
+        if self.backend == 'onnx':
+            inputs = np.ascontiguousarray(sequences.detach().cpu().numpy(), dtype=np.float32)
+            return torch.from_numpy(self.module.run(None, {'sequences': inputs})[0])
+        with torch.inference_mode():
+            return self.module(sequences.cpu())
+
+
+def validate_parity(eager: nn.Module, compiled: CompiledPredictor, inputs: Iterable[torch.Tensor],
+                    rtol: float = 1e-4, atol: float = 1e-5) -> Dict[str, Any]:
+    """Compare le modèle exporté au modèle eager (mode évaluation) sur des entrées de formes variées"""
+    reference_model = prepare_for_inference(eager)
+    max_error, shapes = 0.0, []
+    parity = True
+    for sequences in inputs:
+        with torch.inference_mode():
+            expected = reference_model(sequences.cpu())
+        actual = compiled(sequences)
+        if actual.shape != expected.shape:
+            parity = False
+        else:
+            max_error = max(max_error, (actual - expected).abs().max().item() if expected.numel() else 0.0)
+            parity = parity and torch.allclose(actual, expected, rtol=rtol, atol=atol)
+        shapes.append(tuple(sequences.shape))
+    if not parity:
+        logger.warning(f"Écart entre modèle exporté et eager : {max_error:.2e}")
+    return {'parity': parity, 'max_abs_error': max_error, 'shapes': shapes}
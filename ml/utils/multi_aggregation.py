@@ -0,0 +1,322 @@
+from typing import Dict, Any, List, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+class MarketAggregates:
+    """Statistiques par groupe et corrélations calculées en un seul passage sur les données
+
+    - les clés de groupement (codes des catégories, entiers sur une petite plage, sinon
+      factorisation) sont combinées en une case unique par ligne : un seul bincount par
+      colonne de valeurs donne effectifs et sommes de toutes les combinaisons, dont
+      chaque clé reçoit ensuite sa marginale
+    - les co-moments des colonnes de corrélation (paires complètes, comme DataFrame.corr())
+      sont cumulés dans le même passage par un produit matriciel, sur des valeurs
+      décalées pour limiter les annulations
+    - les colonnes sont lues telles quelles, par blocs de lignes : pas de copie en float64
+      du DataFrame, et les valeurs manquantes ne sont traitées que là où il y en a
+
+    Les requêtes (group_means, mean, corr) ne lisent que ces cumuls, qui peuvent être
+    complétés par d'autres appels à `update`.
+    """
+
+    # Cumuls par groupe et par colonne de valeurs
+    GROUP_FIELDS = ('counts', 'sums')
+
+    def __init__(self, group_keys: List[str], value_columns: List[str],
+                 corr_columns: Optional[List[str]] = None, block_rows: int = 1_000_000,
+                 max_joint_cells: int = 1 << 16):
+        self.logger = logging.getLogger('multi_aggregation')
+        self.group_keys = list(group_keys)
+        self.value_columns = list(dict.fromkeys(value_columns))
+        self.corr_columns = [column for column in (corr_columns or []) if column in self.value_columns]
+        self.block_rows = block_rows
+        self.max_joint_cells = max_joint_cells
+        self.rows = 0
+
+        # Colonnes et clés vues au moins une fois (les autres lèvent KeyError à la requête)
+        self.available_columns: set = set()
+        self.available_keys: set = set()
+
+        m = len(self.value_columns)
+        self.counts = self._zeros(m)
+        self.sums = self._zeros(m)
+
+        # Par clé : libellés des groupes, index libellé -> position, lignes et cumuls [G, m]
+        self.groups: Dict[str, Dict[str, Any]] = {
+            key: {
+                'labels': [],
+                'index': {},
+                'rows': self._zeros(0),
+                **{field: self._zeros((0, m)) for field in self.GROUP_FIELDS}
+            }
+            for key in self.group_keys
+        }
+
+        # Co-moments par paires complètes : [i, j] porte sur les lignes où i et j sont présents
+        k = len(self.corr_columns)
+        self.pair_counts = self._zeros((k, k))
+        self.pair_sums = self._zeros((k, k))
+        self.pair_sumsq = self._zeros((k, k))
+        self.cross = self._zeros((k, k))
+        self.shift: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame, group_keys: List[str], value_columns: List[str],
+                   corr_columns: Optional[List[str]] = None, block_rows: int = 1_000_000) -> 'MarketAggregates':
+        """Agrégats d'un DataFrame complet"""
+        aggregates = cls(group_keys, value_columns, corr_columns, block_rows=block_rows)
+        aggregates.update(data)
+        return aggregates
+
+    def update(self, data: pd.DataFrame):
+        """Ajoute les lignes de `data` aux agrégats (les colonnes absentes comptent comme manquantes)"""
+        # Colonne -> tableau numpy (sans copie pour les dtypes numpy)
+        arrays = {
+            position: self._column_values(data[column])
+            for position, column in enumerate(self.value_columns)
+            if column in data and pd.api.types.is_numeric_dtype(data[column])
+        }
+        self.available_columns.update(self.value_columns[position] for position in arrays)
+        keys = [key for key in self.group_keys if key in data]
+        self.available_keys.update(keys)
+
+        # Case combinée de chaque ligne si le nombre de combinaisons le permet, sinon position par clé
+        raw = {key: self._group_codes(key, data[key]) for key in keys}
+        sizes = [len(self.groups[key]['labels']) + 1 for key in keys]
+        joint = bool(keys) and np.prod(sizes, dtype=np.float64) <= self.max_joint_cells
+        if joint:
+            cells = np.zeros(len(data), dtype=np.int32)
+            for key, size in zip(keys, sizes):
+                codes, mapping = raw.pop(key)
+                # la dernière case de chaque clé reçoit les clés manquantes (code -1)
+                cells *= size
+                cells += np.append(mapping, size - 1).astype(np.int32)[codes]
+        else:
+            key_codes = {key: np.append(mapping, -1)[codes] for key, (codes, mapping) in raw.items()}
+        del raw
+
+        for start in range(0, len(data), self.block_rows):
+            stop = min(start + self.block_rows, len(data))
+            block = {position: values[start:stop] for position, values in arrays.items()}
+            present, counts, sums = self._prepare_block(block, stop - start)
+
+            if joint:
+                self._accumulate_joint(keys, sizes, cells[start:stop], block, present)
+            else:
+                for key in keys:
+                    self._accumulate_key(key, key_codes[key][start:stop], block, present)
+
+            if self.corr_columns:
+                self._accumulate_comoments(block, present, counts, sums, stop - start)
+
+        self.rows += len(data)
+
+    def _zeros(self, shape) -> np.ndarray:
+        """Tableau de cumuls vide"""
+        return np.zeros(shape)
+
+    def _column_values(self, values: pd.Series) -> np.ndarray:
+        """Valeurs numpy d'une colonne ; les dtypes nullable passent en float64 avec NaN"""
+        if isinstance(values.dtype, np.dtype):
+            return values.to_numpy()
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+
+    def _group_codes(self, key: str, keys: pd.Series) -> tuple:
+        """Codes locaux des lignes (-1 pour une clé manquante) et position de chaque code dans l'état"""
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            codes, labels = keys.cat.codes.to_numpy(), keys.cat.categories
+        elif isinstance(keys.dtype, np.dtype) and keys.dtype.kind in 'iu' and len(keys) and \
+                int(keys.max()) - int(keys.min()) < self.max_joint_cells:
+            # Entiers sur une petite plage (heure, jour, mois) : code = valeur - minimum
+            low = int(keys.min())
+            codes = np.subtract(keys.to_numpy(), low, dtype=np.int64)
+            labels = np.arange(low, int(keys.max()) + 1)
+        else:
+            codes, labels = pd.factorize(keys)
+        return codes, self._register_labels(key, pd.Index(labels).tolist())
+
+    def _register_labels(self, key: str, labels: List[Any]) -> np.ndarray:
+        """Positions des libellés dans l'état, en ajoutant les nouveaux groupes"""
+        group = self.groups[key]
+        new_labels = [label for label in dict.fromkeys(labels) if label not in group['index']]
+        if new_labels:
+            for label in new_labels:
+                group['index'][label] = len(group['labels'])
+                group['labels'].append(label)
+            added = len(new_labels)
+            group['rows'] = np.concatenate([group['rows'], self._zeros(added)])
+            for field in self.GROUP_FIELDS:
+                group[field] = np.vstack([group[field], self._zeros((added, len(self.value_columns)))])
+        return np.array([group['index'][label] for label in labels], dtype=np.int64)
+
+    def _prepare_block(self, block: Dict[int, np.ndarray], n: int) -> tuple:
+        """Remplace les manquants par 0 (colonnes flottantes qui en ont) et cumule les totaux
+
+        Retourne les masques de présence (colonnes avec manquants seulement), les
+        effectifs et les sommes du bloc par colonne.
+        """
+        present = {}
+        counts = np.zeros(len(self.value_columns))
+        sums = np.zeros(len(self.value_columns))
+        for position, values in block.items():
+            if values.dtype.kind == 'f':
+                missing = np.isnan(values)
+                if missing.any():
+                    present[position] = (~missing).astype(np.float64)
+                    block[position] = values = np.where(missing, 0.0, values)
+            counts[position] = present[position].sum() if position in present else n
+            sums[position] = values.sum(dtype=np.float64)
+        self.counts += counts
+        self.sums += sums
+        return present, counts, sums
+
+    def _accumulate_joint(self, keys: List[str], sizes: List[int], cells: np.ndarray,
+                          block: Dict[int, np.ndarray], present: Dict[int, np.ndarray]):
+        """Un bincount par colonne sur les cases combinées, puis marginale de chaque clé"""
+        n_cells = int(np.prod(sizes))
+        # bincount travaille sur des intp : une seule conversion pour toutes les colonnes
+        cells = cells.astype(np.intp)
+        shape = (len(self.value_columns),) + tuple(sizes)
+        rows = np.bincount(cells, minlength=n_cells).astype(np.float64)
+        cell_counts = np.zeros((len(self.value_columns), n_cells))
+        cell_sums = np.zeros((len(self.value_columns), n_cells))
+        for position, values in block.items():
+            cell_counts[position] = np.bincount(cells, weights=present[position], minlength=n_cells) \
+                if position in present else rows
+            cell_sums[position] = np.bincount(cells, weights=values, minlength=n_cells)
+
+        for axis, key in enumerate(keys):
+            others = tuple(a for a in range(len(keys)) if a != axis)
+            group = self.groups[key]
+            group['rows'] += rows.reshape(sizes).sum(axis=others)[:-1]
+            others = tuple(a + 1 for a in others)
+            group['counts'] += cell_counts.reshape(shape).sum(axis=others)[:, :-1].T
+            group['sums'] += cell_sums.reshape(shape).sum(axis=others)[:, :-1].T
+
+    def _accumulate_key(self, key: str, codes: np.ndarray, block: Dict[int, np.ndarray],
+                        present: Dict[int, np.ndarray]):
+        """Cumuls d'une clé seule (trop de combinaisons pour des cases combinées)"""
+        group = self.groups[key]
+        valid = codes >= 0
+        codes = codes[valid]
+        n_groups = len(group['labels'])
+        rows = np.bincount(codes, minlength=n_groups).astype(np.float64)
+        group['rows'] += rows
+        for position, values in block.items():
+            group['counts'][:, position] += np.bincount(codes, weights=present[position][valid], minlength=n_groups) \
+                if position in present else rows
+            group['sums'][:, position] += np.bincount(codes, weights=values[valid], minlength=n_groups)
+
+    def _accumulate_comoments(self, block: Dict[int, np.ndarray], present: Dict[int, np.ndarray],
+                              counts: np.ndarray, sums: np.ndarray, n: int):
+        """Co-moments par paires complètes des colonnes de corrélation"""
+        positions = [self.value_columns.index(column) for column in self.corr_columns]
+        k = len(positions)
+        if self.shift is None:
+            if not counts[positions].any():
+                return
+            # Décalage fixé au premier bloc : la corrélation n'en dépend pas
+            self.shift = np.divide(sums[positions], counts[positions], out=np.zeros(k), where=counts[positions] > 0)
+
+        # Lignes absentes (colonne manquante dans le bloc ou valeur manquante) : valeur décalée nulle
+        absent = {}
+        x = np.empty((k, n))
+        for i, position in enumerate(positions):
+            if position not in block:
+                x[i] = 0.0
+                absent[i] = np.arange(n)
+                continue
+            np.subtract(block[position], self.shift[i], out=x[i])
+            if position in present:
+                x[i] *= present[position]
+                absent[i] = np.flatnonzero(present[position] == 0)
+
+        # [i, j] porte sur les lignes où i et j sont présents : toutes les lignes de i,
+        # moins celles où j manque (en général peu nombreuses)
+        cross = x @ x.T
+        local_counts = counts[positions]
+        local_sums = sums[positions] - self.shift * local_counts
+        pair_sums = np.repeat(local_sums[:, None], k, axis=1)
+        pair_sumsq = np.repeat(np.diag(cross)[:, None], k, axis=1)
+        pair_counts = np.repeat(local_counts[:, None], k, axis=1)
+        for j, rows in absent.items():
+            values = x[:, rows]
+            pair_sums[:, j] -= values.sum(axis=1)
+            pair_sumsq[:, j] -= (values * values).sum(axis=1)
+            pair_counts[:, j] -= len(rows)
+            for i in absent:
+                # lignes où i et j manquent toutes deux : déjà exclues des effectifs de i
+                pair_counts[i, j] += np.intersect1d(absent[i], rows, assume_unique=True).size
+
+        self.cross += cross
+        self.pair_sums += pair_sums
+        self.pair_sumsq += pair_sumsq
+        self.pair_counts += pair_counts
+
+    def group_means(self, key: str, column: str) -> Dict[Any, float]:
+        """Équivalent de data.groupby(key, observed=True)[column].mean().to_dict()"""
+        if key not in self.available_keys:
+            raise KeyError(key)
+        position = self._column_position(column)
+        group = self.groups[key]
+        counts, sums = group['counts'][:, position], group['sums'][:, position]
+        return {
+            label: (float(sums[g] / counts[g]) if counts[g] else float('nan'))
+            for label, g in self._ordered_groups(key)
+            if group['rows'][g] > 0
+        }
+
+    def mean(self, column: str) -> float:
+        """Équivalent de data[column].mean()"""
+        position = self._column_position(column)
+        if not self.counts[position]:
+            return float('nan')
+        return float(self.sums[position] / self.counts[position])
+
+    def corr(self, columns: List[str]) -> Dict[str, Dict[str, float]]:
+        """Équivalent de data[columns].corr().to_dict() (Pearson, paires complètes)"""
+        for column in columns:
+            self._column_position(column)
+        missing = [column for column in columns if column not in self.corr_columns]
+        if missing:
+            raise KeyError(missing[0])
+        positions = [self.corr_columns.index(column) for column in columns]
+        return {
+            b: {a: self._pair_corr(i, j) for a, i in zip(columns, positions)}
+            for b, j in zip(columns, positions)
+        }
+
+    def _column_position(self, column: str) -> int:
+        """Position d'une colonne de valeurs disponible"""
+        if column not in self.available_columns:
+            raise KeyError(column)
+        return self.value_columns.index(column)
+
+    def _ordered_groups(self, key: str) -> List[tuple]:
+        """(libellé, position) dans l'ordre de groupby : trié, ou ordre des catégories si non comparable"""
+        group = self.groups[key]
+        pairs = list(zip(group['labels'], range(len(group['labels']))))
+        try:
+            return sorted(pairs, key=lambda pair: pair[0])
+        except TypeError:
+            return pairs
+
+    def _pair_corr(self, i: int, j: int) -> float:
+        """Corrélation de Pearson entre deux colonnes sur leurs lignes communes"""
+        n = self.pair_counts[i, j]
+        if n < 2:
+            return float('nan')
+        sum_i, sum_j = self.pair_sums[i, j], self.pair_sums[j, i]
+        variance_i = self.pair_sumsq[i, j] - sum_i * sum_i / n
+        variance_j = self.pair_sumsq[j, i] - sum_j * sum_j / n
+        # Une variance de l'ordre de l'erreur d'arrondi des sommes est une colonne constante
+        tolerance = n * np.finfo(np.float64).eps
+        if variance_i <= tolerance * self.pair_sumsq[i, j] or variance_j <= tolerance * self.pair_sumsq[j, i]:
+            return float('nan')
+        if i == j:
+            return 1.0
+        covariance = self.cross[i, j] - sum_i * sum_j / n
+        return float(min(1.0, max(-1.0, covariance / np.sqrt(variance_i * variance_j))))
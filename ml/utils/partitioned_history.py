@@ -0,0 +1,186 @@
+from typing import Any, Iterator, List, Optional, Union
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+import bisect
+import logging
+import pickle
+import shutil
+import uuid
+import weakref
+
+import numpy as np
+
+from .sequence_store import seconds
+
+
+class _Partition:
+    """Entrées d'une période, en mémoire ou écrites sur disque"""
+
+    __slots__ = ('index', 'times', 'entries', 'path', 'size')
+
+    def __init__(self, index: int):
+        self.index = index
+        self.times: Optional[List[float]] = []
+        self.entries: Optional[List[Any]] = []
+        self.path: Optional[Path] = None
+        self.size = 0
+
+
+class PartitionedHistory:
+    """Historique horodaté découpé en partitions (un jour par défaut)
+
+    - ajout en O(1) dans la partition la plus récente (insertion triée sinon)
+    - expiration de la rétention en O(1) par partition retirée, sans parcourir les entrées
+    - lecture d'une plage par recherche dichotomique des partitions puis des horodatages
+    - avec spill_dir, seules les hot_partitions dernières partitions restent en mémoire :
+      les plus anciennes sont écrites sur disque (horodatages float64 et entrées
+      sérialisées dans un .npz) et relues à la demande, pour une mémoire constante ;
+      chaque instance a son sous-répertoire de spill_dir, supprimé par close() (ou à la
+      destruction de l'instance, au plus tard à la sortie du processus)
+
+    Se parcourt comme une liste d'entrées, de la plus ancienne à la plus récente.
+    """
+
+    def __init__(self, retention: timedelta = timedelta(days=90), partition: timedelta = timedelta(days=1),
+                 spill_dir: Optional[Union[str, Path]] = None, hot_partitions: int = 7):
+        self.logger = logging.getLogger('partitioned_history')
+        self.retention = retention.total_seconds()
+        self.partition_seconds = partition.total_seconds()
+        self.spill_dir = Path(spill_dir) / uuid.uuid4().hex[:8] if spill_dir is not None else None
+        self._cleanup = (weakref.finalize(self, shutil.rmtree, str(self.spill_dir), True)
+                         if self.spill_dir is not None else None)
+        self.hot_partitions = hot_partitions
+        self._partitions: deque = deque()
+        # Index de période de chaque partition, aligné sur _partitions (recherche dichotomique)
+        self._indexes: deque = deque()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        for partition in list(self._partitions):
+            yield from self._load(partition)[1]
+
+    def append(self, entry: Any, timestamp: Any = None):
+        """Ajoute une entrée (horodatage : maintenant par défaut)"""
+        time = datetime.now().timestamp() if timestamp is None else seconds(timestamp)
+        position = self._partition(int(time // self.partition_seconds))
+        partition = self._partitions[position]
+        times, entries = self._load(partition)
+        if not times or time >= times[-1]:
+            times.append(time)
+            entries.append(entry)
+        else:
+            index = bisect.bisect_right(times, time)
+            times.insert(index, time)
+            entries.insert(index, entry)
+        partition.size += 1
+        self._size += 1
+        if partition.path is not None or self._is_cold(position):
+            self._spill(partition, times, entries)
+
+    def expire(self, now: Any = None) -> int:
+        """Retire les partitions entièrement plus anciennes que la rétention
+
+        Retourne le nombre d'entrées retirées.
+        """
+        now = datetime.now().timestamp() if now is None else seconds(now)
+        # Partitions dont la fin précède la limite de rétention
+        limit = int((now - self.retention) // self.partition_seconds)
+        removed = 0
+        while self._partitions and self._indexes[0] < limit:
+            partition = self._partitions.popleft()
+            self._indexes.popleft()
+            if partition.path is not None:
+                partition.path.unlink(missing_ok=True)
+            removed += partition.size
+        self._size -= removed
+        return removed
+
+    def range(self, start: Any = None, end: Any = None) -> List[Any]:
+        """Entrées horodatées dans [start, end], dans l'ordre chronologique"""
+        start = -np.inf if start is None else seconds(start)
+        end = np.inf if end is None else seconds(end)
+        indexes = list(self._indexes)
+        first = 0 if start == -np.inf else bisect.bisect_left(indexes, int(start // self.partition_seconds))
+        last = len(indexes) if end == np.inf else bisect.bisect_right(indexes, int(end // self.partition_seconds))
+
+        result = []
+        for partition in list(self._partitions)[first:last]:
+            times, entries = self._load(partition)
+            result.extend(entries[bisect.bisect_left(times, start):bisect.bisect_right(times, end)])
+        return result
+
+    def latest(self, count: int = 1) -> List[Any]:
+        """Les count dernières entrées"""
+        result: List[Any] = []
+        for partition in reversed(self._partitions):
+            result[:0] = self._load(partition)[1][-(count - len(result)):]
+            if len(result) >= count:
+                break
+        return result
+
+    def clear(self):
+        for partition in self._partitions:
+            if partition.path is not None:
+                partition.path.unlink(missing_ok=True)
+        self._partitions.clear()
+        self._indexes.clear()
+        self._size = 0
+
+    def close(self):
+        """Vide l'historique et supprime le répertoire de cette instance sur disque"""
+        self.clear()
+        if self._cleanup is not None:
+            self._cleanup()
+
+    def _partition(self, index: int) -> int:
+        """Position de la partition de la période index, créée si besoin"""
+        if self._indexes and self._indexes[-1] == index:
+            return len(self._partitions) - 1
+        if not self._indexes or self._indexes[-1] < index:
+            # Cas courant : nouvelle période, partition ajoutée à la fin
+            self._partitions.append(_Partition(index))
+            self._indexes.append(index)
+            position = len(self._partitions) - 1
+        else:
+            # Entrée en retard : partition existante ou insérée à sa place
+            position = bisect.bisect_left(self._indexes, index)
+            if self._indexes[position] == index:
+                return position
+            self._partitions.insert(position, _Partition(index))
+            self._indexes.insert(position, index)
+
+        # Une partition de plus : celle qui sort des hot_partitions plus récentes part sur disque
+        boundary = len(self._partitions) - self.hot_partitions - 1
+        if self.spill_dir is not None and boundary >= 0 and boundary != position:
+            cold = self._partitions[boundary]
+            if cold.path is None:
+                self._spill(cold, cold.times, cold.entries)
+        return position
+
+    def _is_cold(self, position: int) -> bool:
+        return self.spill_dir is not None and position < len(self._partitions) - self.hot_partitions
+
+    def _load(self, partition: _Partition):
+        """Horodatages et entrées d'une partition (relus sur disque si elle y est)"""
+        if partition.path is None:
+            return partition.times, partition.entries
+        with np.load(partition.path) as data:
+            return data['times'].tolist(), pickle.loads(data['entries'].tobytes())
+
+    def _spill(self, partition: _Partition, times: List[float], entries: List[Any]):
+        """Partition écrite sur disque : horodatages float64 et entrées sérialisées"""
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        if partition.path is None:
+            partition.path = self.spill_dir / f"partition_{partition.index}.npz"
+        payload = np.frombuffer(pickle.dumps(entries, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+        with open(partition.path, 'wb') as f:
+            np.savez(f, times=np.asarray(times, dtype=np.float64), entries=payload)
+        partition.times = None
+        partition.entries = None
@@ -0,0 +1,162 @@
+from typing import Dict, Any, Callable, Optional, Tuple, Union
+from pathlib import Path
+import hashlib
+import io
+import logging
+import statistics
+import time
+import warnings
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import quantize_dynamic
+
+from .model_export import prepare_for_inference
+
+logger = logging.getLogger('quantization')
+
+# Couches quantifiées : poids en int8, activations quantifiées à la volée (CPU)
+QUANTIZED_LAYERS = {nn.Linear, nn.LSTM}
+
+
+def quantize_model(model: nn.Module) -> nn.Module:
+    """Copie du modèle pour l'inférence CPU, couches Linear et LSTM quantifiées en int8
+
+    Le modèle d'origine reste intact. Les projections internes de MultiheadAttention
+    et les autres couches (BatchNorm, LayerNorm, GRU...) restent en float32.
+    """
+    with warnings.catch_warnings():
+        # torch.ao.quantization est annoncé comme déprécié au profit de torchao
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return quantize_dynamic(prepare_for_inference(model), QUANTIZED_LAYERS, dtype=torch.qint8)
+
+
+def weights_fingerprint(model: nn.Module) -> str:
+    """Empreinte (sha256) des poids float32 d'un modèle : noms, formes et valeurs du state_dict"""
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        digest.update(name.encode())
+        digest.update(str(tuple(tensor.shape)).encode())
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()
+
+
+def save_quantized(quantized: nn.Module, path: Union[str, Path], source: nn.Module) -> Path:
+    """Checkpoint d'un modèle quantifié (poids int8 et échelles), relu par load_quantized
+
+    L'empreinte des poids float32 de source (le modèle quantifié) y est gardée.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_suffix('.tmp')
+    torch.save({
+        'quantized_state_dict': quantized.state_dict(),
+        'dtype': 'qint8',
+        'source_fingerprint': weights_fingerprint(source)
+    }, temporary)
+    temporary.replace(path)
+    return path
+
+
+def load_quantized(model: nn.Module, path: Union[str, Path]) -> nn.Module:
+    """Modèle quantifié relu : model (float32, même architecture) est quantifié puis rechargé
+
+    Le checkpoint doit avoir été construit à partir des poids actuels de model (même
+    empreinte) ; sinon, ou sans empreinte, ValueError : il ne correspond plus au modèle.
+    """
+    checkpoint = torch.load(path, map_location='cpu', weights_only=False)
+    if checkpoint.get('source_fingerprint') != weights_fingerprint(model):
+        raise ValueError(f"{path} n'a pas été construit à partir des poids float32 actuels du modèle")
+    quantized = quantize_model(model)
+    quantized.load_state_dict(checkpoint['quantized_state_dict'])
+    return quantized
+
+
+def model_size_bytes(model: nn.Module) -> int:
+    """Taille du state_dict sérialisé"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell()
+
+
+def validation_error(model: nn.Module, inputs: torch.Tensor, targets: torch.Tensor,
+                     batch_size: int = 256) -> float:
+    """MSE du modèle (mode évaluation) sur un jeu de validation"""
+    model.eval()
+    with torch.inference_mode():
+        predictions = torch.cat([
+            model(inputs[i:i + batch_size]).reshape(len(inputs[i:i + batch_size]), -1)
+            for i in range(0, len(inputs), batch_size)
+        ])
+    return (predictions - targets.reshape(predictions.shape)).pow(2).mean().item()
+
+
+def latency_ms(model: nn.Module, inputs: torch.Tensor, repetitions: int = 20) -> float:
+    """Durée médiane d'un appel du modèle sur inputs"""
+    model.eval()
+    with torch.inference_mode():
+        model(inputs)
+        durations = []
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            model(inputs)
+            durations.append(time.perf_counter() - start)
+    return statistics.median(durations) * 1000
+
+
+def accuracy_gate(reference_error: float, quantized_error: float,
+                  max_degradation: float = 0.05) -> Tuple[bool, float]:
+    """Le modèle quantifié passe si son erreur dépasse au plus de max_degradation (relatif) celle du float32"""
+    degradation = (quantized_error - reference_error) / max(reference_error, 1e-12)
+    return degradation <= max_degradation, degradation
+
+
+def quantize_for_deployment(model: nn.Module, validation_inputs: torch.Tensor, validation_targets: torch.Tensor,
+                            path: Optional[Union[str, Path]] = None, max_degradation: float = 0.05,
+                            benchmark_inputs: Optional[torch.Tensor] = None, min_acceleration: Optional[float] = None,
+                            error: Callable[..., float] = validation_error) -> Tuple[nn.Module, Dict[str, Any]]:
+    """Quantifie le modèle et ne le retient que s'il passe la barrière de précision
+
+    Retourne le modèle à déployer (quantifié, ou la copie float32 d'inférence si l'erreur
+    de validation se dégrade de plus de max_degradation, ou si l'accélération mesurée
+    est inférieure à min_acceleration) et un rapport : erreurs, dégradation, accélération
+    mesurée sur benchmark_inputs (la validation par défaut) et réduction de taille. Le checkpoint n'est écrit que pour un modèle accepté.
+    """
+    reference = prepare_for_inference(model)
+    quantized = quantize_model(model)
+    reference_error = error(reference, validation_inputs, validation_targets)
+    quantized_error = error(quantized, validation_inputs, validation_targets)
+    deploy, degradation = accuracy_gate(reference_error, quantized_error, max_degradation)
+
+    benchmark_inputs = validation_inputs if benchmark_inputs is None else benchmark_inputs
+    reference_latency = latency_ms(reference, benchmark_inputs)
+    quantized_latency = latency_ms(quantized, benchmark_inputs)
+    reference_size, quantized_size = model_size_bytes(reference), model_size_bytes(quantized)
+    report = {
+        'deploy': deploy,
+        'erreur_float32': reference_error,
+        'erreur_int8': quantized_error,
+        'degradation': degradation,
+        'latence_float32_ms': reference_latency,
+        'latence_int8_ms': quantized_latency,
+        'acceleration': reference_latency / quantized_latency if quantized_latency > 0 else 0.0,
+        'taille_float32_octets': reference_size,
+        'taille_int8_octets': quantized_size,
+        'reduction_taille': 1 - quantized_size / reference_size if reference_size else 0.0
+    }
+    if deploy and min_acceleration is not None and report['acceleration'] < min_acceleration:
+        report['deploy'] = False
+        logger.warning(
+            f"Modèle quantifié refusé : accélération x{report['acceleration']:.2f} "
+            f"(minimum x{min_acceleration:.2f}), le modèle float32 est conservé"
+        )
+        return reference, report
+    if not deploy:
+        logger.warning(
+            f"Modèle quantifié refusé : erreur de validation +{degradation:.1%} "
+            f"(seuil {max_degradation:.1%}), le modèle float32 est conservé"
+        )
+        return reference, report
+    if path is not None:
+        report['checkpoint'] = str(save_quantized(quantized, path, model))
+    return quantized, report
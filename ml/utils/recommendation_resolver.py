@@ -1,6 +1,11 @@
-from typing import Dict, Any, List
-from datetime import datetime
+from typing import Dict, Any, List, Optional
+from datetime import datetime, timezone
+from bisect import bisect_left, insort
+import heapq
 import logging
+import numpy as np
+
+from .conflict_index import ConflictIndex, IncrementalConflictIndex
 
 class RecommendationResolver:
     """Manages and resolves conflicts between recommendations"""
@@ -13,22 +18,46 @@ class RecommendationResolver:
             'low': 1
         }
         
-    def resolve_conflicts(self, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Resolves conflicts between recommendations"""
+        # Oppositions used by the consistency checks
+        opposing_pairs = [
+            ('growth', 'retention'),
+            ('aggressive', 'conservative'),
+            ('broad_reach', 'niche_focus'),
+            ('increase_frequency', 'reduce_frequency')
+        ]
+        self.opposing_strategies = {}
+        for strategy1, strategy2 in opposing_pairs:
+            self.opposing_strategies.setdefault(strategy1, set()).add(strategy2)
+            self.opposing_strategies.setdefault(strategy2, set()).add(strategy1)
+        self.opposing_action_prefixes = {
+            'increase_': 'decrease_',
+            'decrease_': 'increase_',
+            'start_': 'stop_',
+            'stop_': 'start_',
+            'add_': 'remove_',
+            'remove_': 'add_'
+        }
+        
+    def resolve_conflicts(self, recommendations: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Resolves conflicts between recommendations (returns the top_k best if given)"""
         try:
+            # Scores are computed once, in one vectorized pass, and reused by every step
+            cache: Dict[int, tuple] = {}
+            self._score_recommendations(recommendations, cache)
+            
             # 1. Group recommendations by category
             categorized = self._categorize_recommendations(recommendations)
             
             # 2. Detect and resolve conflicts
             resolved = {}
             for category, recs in categorized.items():
-                resolved[category] = self._resolve_category_conflicts(recs)
+                resolved[category] = self._resolve_category_conflicts(recs, cache)
                 
             # 3. Merge compatible recommendations
             merged = self._merge_compatible_recommendations(resolved)
             
             # 4. Prioritize final recommendations
-            return self._prioritize_recommendations(merged)
+            return self._prioritize_recommendations(merged, top_k, cache)
             
         except Exception as e:
             self.logger.error(f"Conflict resolution error: {e}")
@@ -44,19 +73,37 @@ class RecommendationResolver:
             categories[category].append(rec)
         return categories
         
-    def _resolve_category_conflicts(self, recommendations: List[Dict]) -> List[Dict]:
+    def _resolve_category_conflicts(self, recommendations: List[Dict],
+                                    cache: Optional[Dict[int, tuple]] = None) -> List[Dict]:
         """Resolves conflicts within a category"""
         conflicts = self._detect_conflicts(recommendations)
         resolved = []
         
         for conflict_group in conflicts:
-            winner = self._select_best_recommendation(conflict_group)
+            winner = self._select_best_recommendation(conflict_group, cache)
             resolved.append(winner)
             
         return resolved
         
     def _detect_conflicts(self, recommendations: List[Dict]) -> List[List[Dict]]:
-        """Detects groups of conflicting recommendations"""
+        """Detects groups of conflicting recommendations (indexed, same groups as the pairwise scan)"""
+        index = ConflictIndex(self, recommendations)
+        conflict_groups = []
+        processed = set()
+        
+        for i, rec1 in enumerate(recommendations):
+            if i in processed:
+                continue
+                
+            conflicting = index.conflicts_of(i)
+            if conflicting:
+                conflict_groups.append([rec1] + [recommendations[j] for j in conflicting])
+                processed.update(conflicting)
+                
+        return conflict_groups
+        
+    def _detect_conflicts_pairwise(self, recommendations: List[Dict]) -> List[List[Dict]]:
+        """Reference O(n²) conflict detection, kept for parity checks"""
         conflict_groups = []
         processed = set()
         
@@ -155,16 +202,46 @@ class RecommendationResolver:
             self.logger.error(f"Consistency conflict check error: {e}")
             return True
 
-    def _select_best_recommendation(self, conflict_group: List[Dict]) -> Dict:
+    def _parse_time(self, value: Any) -> datetime:
+        """Parses a timing bound (datetime, timestamp, ISO string or HH:MM) into a naive UTC datetime"""
+        if isinstance(value, datetime):
+            parsed = value
+        elif isinstance(value, (int, float)):
+            parsed = datetime.fromtimestamp(value, tz=timezone.utc)
+        else:
+            try:
+                parsed = datetime.fromisoformat(str(value))
+            except ValueError:
+                parsed = datetime.strptime(str(value), '%H:%M')
+                
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    def _are_strategies_conflicting(self, strategy1: Any, strategy2: Any) -> bool:
+        """Checks if two strategies are opposed"""
+        return strategy2 in self.opposing_strategies.get(strategy1, ())
+
+    def _opposite_action(self, action: Any) -> Optional[str]:
+        """Returns the opposite of an action (increase_x <-> decrease_x...), None if it has none"""
+        if not isinstance(action, str):
+            return None
+        for prefix, opposite_prefix in self.opposing_action_prefixes.items():
+            if action.startswith(prefix):
+                return opposite_prefix + action[len(prefix):]
+        return None
+
+    def _are_actions_conflicting(self, actions1: set, actions2: set) -> bool:
+        """Checks if one action of the first set is opposed to an action of the second"""
+        return any(self._opposite_action(action) in actions2 for action in actions1)
+
+    def _select_best_recommendation(self, conflict_group: List[Dict],
+                                    cache: Optional[Dict[int, tuple]] = None) -> Dict:
         """Selects the best recommendation from a conflict group"""
         try:
-            scored_recs = []
-            for rec in conflict_group:
-                score = self._calculate_recommendation_score(rec)
-                scored_recs.append((score, rec))
-            
-            # Return recommendation with highest score
-            return max(scored_recs, key=lambda x: x[0])[1]
+            # Return recommendation with highest score (first one on ties)
+            scores = self._score_recommendations(conflict_group, cache)
+            return conflict_group[int(np.argmax(scores))]
             
         except Exception as e:
             self.logger.error(f"Recommendation selection error: {e}")
@@ -189,32 +266,370 @@ class RecommendationResolver:
         
         return score
 
+    def _score_recommendations(self, recs: List[Dict], cache: Optional[Dict[int, tuple]] = None) -> np.ndarray:
+        """Scores recommendations, reusing the scores cached in cache (local to one resolution)"""
+        scores = np.empty(len(recs), dtype=np.float64)
+        if cache is None:
+            scores[:] = self._batch_recommendation_scores(recs)
+            return scores
+            
+        missing = []
+        for i, rec in enumerate(recs):
+            cached = cache.get(id(rec))
+            if cached is None:
+                missing.append(i)
+            else:
+                scores[i] = cached[1]
+                
+        if missing:
+            computed = self._batch_recommendation_scores([recs[i] for i in missing])
+            scores[missing] = computed
+            for i, score in zip(missing, computed):
+                # The recommendation is kept alongside its score so that its id is not reused
+                cache[id(recs[i])] = (recs[i], score)
+                
+        return scores
+
+    def _batch_recommendation_scores(self, recs: List[Dict]) -> np.ndarray:
+        """Vectorized _calculate_recommendation_score (same operations, same order)"""
+        count = len(recs)
+        impacts = [rec.get('expected_impact', {}) for rec in recs]
+        priorities = np.fromiter(
+            (self.priority_weights.get(rec.get('priority', 'low'), 1) for rec in recs),
+            dtype=np.float64, count=count
+        )
+        engagement = np.fromiter((impact.get('engagement', 0) for impact in impacts), dtype=np.float64, count=count)
+        reach = np.fromiter((impact.get('reach', 0) for impact in impacts), dtype=np.float64, count=count)
+        conversion = np.fromiter((impact.get('conversion', 0) for impact in impacts), dtype=np.float64, count=count)
+        confidence = np.fromiter((rec.get('confidence', 0.5) for rec in recs), dtype=np.float64, count=count)
+        
+        return (priorities + engagement * 0.3 + reach * 0.3 + conversion * 0.4) * confidence
+
     def _merge_compatible_recommendations(self, resolved: Dict[str, List[Dict]]) -> List[Dict]:
         """Merges compatible recommendations"""
         merged = []
         for category, recs in resolved.items():
-            current_merged = []
-            
-            for rec in recs:
-                merged_with_existing = False
-                for existing in current_merged:
-                    if self._can_merge_recommendations(existing, rec):
-                        self._merge_into_existing(existing, rec)
-                        merged_with_existing = True
-                        break
-                
-                if not merged_with_existing:
-                    current_merged.append(rec)
-            
-            merged.extend(current_merged)
+            merged.extend(self._merge_category_recommendations(recs))
         
         return merged
 
-    def _prioritize_recommendations(self, merged: List[Dict]) -> List[Dict]:
+    def _merge_category_recommendations(self, recs: List[Dict]) -> List[Dict]:
+        """Merges compatible recommendations of one category (inputs are left untouched)"""
+        current_merged = []
+        
+        for rec in recs:
+            merged_with_existing = False
+            for existing in current_merged:
+                if self._can_merge_recommendations(existing, rec):
+                    self._merge_into_existing(existing, rec)
+                    merged_with_existing = True
+                    break
+            
+            if not merged_with_existing:
+                current_merged.append(dict(rec))
+        
+        return current_merged
+
+    def _merge_key(self, rec: Dict) -> tuple:
+        """Recommendations sharing this key are merged together"""
+        return (rec.get('type'), rec.get('objective'), rec.get('strategy'))
+
+    def _can_merge_recommendations(self, rec1: Dict, rec2: Dict) -> bool:
+        """Two recommendations can be merged if they pursue the same objective with the same strategy"""
+        return self._merge_key(rec1) == self._merge_key(rec2)
+
+    def _merge_into_existing(self, existing: Dict, rec: Dict):
+        """Merges the actions and resources of rec into existing"""
+        for field in ('actions', 'resources'):
+            if field in existing or field in rec:
+                values = list(existing.get(field, []))
+                try:
+                    seen = set(values)
+                    values.extend(value for value in rec.get(field, []) if not (value in seen or seen.add(value)))
+                except TypeError:
+                    values.extend(value for value in rec.get(field, []) if value not in values)
+                existing[field] = values
+        existing['merged_count'] = existing.get('merged_count', 1) + rec.get('merged_count', 1)
+
+    def _prioritize_recommendations(self, merged: List[Dict], top_k: Optional[int] = None,
+                                    cache: Optional[Dict[int, tuple]] = None) -> List[Dict]:
         """Prioritizes final recommendations"""
-        # Sort by score and limit number
-        scored = [(self._calculate_recommendation_score(rec), rec) for rec in merged]
-        scored.sort(reverse=True)
+        if not merged:
+            return []
+            
+        scores = self._score_recommendations(merged, cache)
+        positions = np.arange(len(scores))
         
+        # Top-k: partition around the k-th best score, ties at the boundary are all kept
+        if top_k is not None and top_k < len(scores):
+            if top_k <= 0:
+                return []
+            kth_score = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+            positions = np.flatnonzero(scores >= kth_score)
+            
+        # Sort by score (stable: equal scores keep their order)
+        order = positions[np.lexsort((positions, -scores[positions]))]
+        if top_k is not None:
+            order = order[:top_k]
+            
         # Return sorted recommendations
-        return [rec for _, rec in scored] 
\ No newline at end of file
+        return [merged[i] for i in order]
+
+
+class IncrementalRecommendationResolver:
+    """Online version of RecommendationResolver.resolve_conflicts
+
+    Recommendations are added, removed or updated one at a time. Per category the
+    resolver keeps a conflict index, the conflict groups (a leader and the later
+    recommendations it claims), the group winners, the merge groups (winners
+    sharing a merge key) and, globally, a priority heap over the merged
+    recommendations. Each operation only recomputes the groups it affects;
+    `resolved()` returns exactly what `resolve_conflicts` would return for the
+    live recommendations in arrival order.
+    """
+
+    def __init__(self, resolver: Optional[RecommendationResolver] = None):
+        self.logger = logging.getLogger('incremental_recommendation_resolver')
+        self.resolver = resolver or RecommendationResolver()
+        self.recommendations: Dict[int, Dict[str, Any]] = {}
+        self.categories: Dict[str, Dict[str, Any]] = {}
+        self._key_category: Dict[int, str] = {}
+        self._next_key = 0
+        self._next_version = 0
+        self._heap: List[tuple] = []
+        self._live_entries = 0
+
+    def add(self, rec: Dict[str, Any]) -> int:
+        """Adds a recommendation and returns its key"""
+        key = self._next_key
+        self._next_key += 1
+        self.recommendations[key] = rec
+        self._insert(key, rec)
+        return key
+
+    def remove(self, key: int):
+        """Removes a recommendation"""
+        self.recommendations.pop(key)
+        self._delete(key)
+
+    def update(self, key: int, rec: Dict[str, Any]):
+        """Replaces a recommendation, keeping its arrival position"""
+        self._delete(key)
+        self.recommendations[key] = rec
+        self._insert(key, rec)
+
+    def top_k(self, k: int) -> List[Dict[str, Any]]:
+        """Returns the k best merged recommendations without sorting everything"""
+        try:
+            selected = []
+            while self._heap and len(selected) < k:
+                entry = heapq.heappop(self._heap)
+                if self._is_live(entry):
+                    selected.append(entry)
+            for entry in selected:
+                heapq.heappush(self._heap, entry)
+            return [self._materialize(self.categories[entry[4]], entry[5]) for entry in selected]
+            
+        except Exception as e:
+            self.logger.error(f"Top-k selection error: {e}")
+            return []
+
+    def resolved(self) -> List[Dict[str, Any]]:
+        """Returns every merged recommendation, best first"""
+        return self.top_k(self._live_entries)
+
+    def _insert(self, key: int, rec: Dict[str, Any]):
+        """Inserts a recommendation in its category and reassigns the affected groups"""
+        category = rec.get('category', 'general')
+        state = self.categories.get(category)
+        if state is None:
+            state = self._new_category_state()
+            self.categories[category] = state
+        self._key_category[key] = category
+
+        first_key = state['keys'][0] if state['keys'] else None
+        insort(state['keys'], key)
+        state['index'].add(key, rec)
+        state['claimed_by'][key] = {
+            other for other in state['index'].conflicts_of(key)
+            if other < key and other in state['members']
+        }
+        for leader in state['claimed_by'][key]:
+            state['members'][leader].add(key)
+            state['dirty'].add(leader)
+
+        self._reassign(state, [key])
+        self._refresh_category(category, state, first_key)
+
+    def _delete(self, key: int):
+        """Removes a recommendation from its category and reassigns the affected groups"""
+        category = self._key_category.pop(key)
+        state = self.categories[category]
+        first_key = state['keys'][0]
+        del state['keys'][bisect_left(state['keys'], key)]
+        state['index'].remove(key)
+
+        promoted = []
+        for leader in state['claimed_by'].pop(key):
+            state['members'][leader].discard(key)
+            state['dirty'].add(leader)
+        if key in state['members']:
+            for member in state['members'].pop(key):
+                state['claimed_by'][member].discard(key)
+                if not state['claimed_by'][member]:
+                    promoted.append(member)
+            state['dirty'].add(key)
+
+        self._reassign(state, promoted)
+        if state['keys']:
+            self._refresh_category(category, state, first_key)
+        else:
+            del self.categories[category]
+            self._live_entries -= len(state['versions'])
+
+    def _new_category_state(self) -> Dict[str, Any]:
+        """Per category state"""
+        return {
+            'keys': [],
+            'index': IncrementalConflictIndex(self.resolver),
+            'claimed_by': {},       # key -> earlier leaders conflicting with it
+            'members': {},          # leader -> later keys it claims
+            'winners': {},          # leader -> winner of its conflict group
+            'merge_key_of': {},     # leader -> merge key of its winner
+            'merge_groups': {},     # merge key -> sorted leaders
+            'merged': {},           # merge key -> merged recommendation (None until built)
+            'pending': {},          # merge key -> leaders appended since it was built
+            'versions': {},         # merge key -> version of its heap entry
+            'dirty': set()
+        }
+
+    def _reassign(self, state: Dict[str, Any], keys: List[int]):
+        """Propagates leader status changes in arrival order (same result as the greedy scan)"""
+        heap = list(keys)
+        heapq.heapify(heap)
+        while heap:
+            key = heapq.heappop(heap)
+            if key not in state['claimed_by']:
+                continue
+            was_leader = key in state['members']
+            is_leader = not state['claimed_by'][key]
+            if was_leader == is_leader:
+                continue
+
+            state['dirty'].add(key)
+            if is_leader:
+                later = {other for other in state['index'].conflicts_of(key) if other > key}
+                state['members'][key] = later
+                for other in later:
+                    state['claimed_by'][other].add(key)
+                    if other in state['members']:
+                        heapq.heappush(heap, other)
+            else:
+                for other in state['members'].pop(key):
+                    state['claimed_by'][other].discard(key)
+                    if not state['claimed_by'][other]:
+                        heapq.heappush(heap, other)
+
+    def _refresh_category(self, category: str, state: Dict[str, Any], previous_first_key: Optional[int]):
+        """Recomputes the winners of the dirty conflict groups and the merge groups they touch"""
+        # Merge groups only receiving later leaders are extended, the others are rebuilt
+        dirty_merge_keys = set()
+        rebuilt = set()
+        appended = {}
+        for leader in sorted(state['dirty']):
+            members = state['members'].get(leader)
+            winner = None
+            if members:
+                group = [self.recommendations[leader]] + [self.recommendations[k] for k in sorted(members)]
+                winner = self.resolver._select_best_recommendation(group)
+            if winner is state['winners'].get(leader):
+                continue
+
+            merge_key = state['merge_key_of'].pop(leader, None)
+            if merge_key is not None:
+                state['winners'].pop(leader)
+                leaders = state['merge_groups'][merge_key]
+                del leaders[bisect_left(leaders, leader)]
+                dirty_merge_keys.add(merge_key)
+                rebuilt.add(merge_key)
+
+            if winner is not None:
+                merge_key = self._hashable_merge_key(winner)
+                state['winners'][leader] = winner
+                state['merge_key_of'][leader] = merge_key
+                leaders = state['merge_groups'].setdefault(merge_key, [])
+                if leaders and leader < leaders[-1]:
+                    insort(leaders, leader)
+                    rebuilt.add(merge_key)
+                else:
+                    leaders.append(leader)
+                    appended.setdefault(merge_key, []).append(leader)
+                dirty_merge_keys.add(merge_key)
+        state['dirty'].clear()
+
+        # The category rank (first key) is part of every heap entry of the category
+        if state['keys'][0] != previous_first_key:
+            dirty_merge_keys.update(state['versions'])
+
+        refreshed = []
+        for merge_key in dirty_merge_keys:
+            if state['versions'].pop(merge_key, None) is not None:
+                self._live_entries -= 1
+            leaders = state['merge_groups'].get(merge_key)
+            if not leaders:
+                state['merge_groups'].pop(merge_key, None)
+                state['merged'].pop(merge_key, None)
+                state['pending'].pop(merge_key, None)
+                continue
+
+            # Merged recommendations are built lazily by top_k()
+            if merge_key in rebuilt or state['merged'].get(merge_key) is None:
+                state['merged'][merge_key] = None
+                state['pending'].pop(merge_key, None)
+            elif merge_key in appended:
+                state['pending'].setdefault(merge_key, []).extend(appended[merge_key])
+            refreshed.append((merge_key, leaders))
+
+        # Merging keeps the score fields of the first winner, which gives the group score;
+        # the refreshed groups are scored in one vectorized pass
+        scores = self.resolver._score_recommendations([state['winners'][leaders[0]] for _, leaders in refreshed])
+        for (merge_key, leaders), score in zip(refreshed, scores):
+            self._next_version += 1
+            state['versions'][merge_key] = self._next_version
+            self._live_entries += 1
+            heapq.heappush(self._heap, (
+                -float(score), state['keys'][0], leaders[0], self._next_version, category, merge_key
+            ))
+
+        if len(self._heap) > 2 * self._live_entries + 64:
+            self._heap = [entry for entry in self._heap if self._is_live(entry)]
+            heapq.heapify(self._heap)
+
+    def _materialize(self, state: Dict[str, Any], merge_key: Any) -> Dict[str, Any]:
+        """Builds (or extends) the merged recommendation of a merge group"""
+        rec = state['merged'].get(merge_key)
+        if rec is None:
+            rec = self.resolver._merge_category_recommendations(
+                [state['winners'][leader] for leader in state['merge_groups'][merge_key]]
+            )[0]
+            state['pending'].pop(merge_key, None)
+        elif merge_key in state['pending']:
+            rec = dict(rec)
+            for leader in state['pending'].pop(merge_key):
+                self.resolver._merge_into_existing(rec, state['winners'][leader])
+        state['merged'][merge_key] = rec
+        return rec
+
+    def _hashable_merge_key(self, rec: Dict[str, Any]) -> Any:
+        """Merge key usable as a dict key"""
+        merge_key = self.resolver._merge_key(rec)
+        try:
+            hash(merge_key)
+            return merge_key
+        except TypeError:
+            return repr(merge_key)
+
+    def _is_live(self, entry: tuple) -> bool:
+        """Heap entries are invalidated lazily when their merge group is recomputed"""
+        state = self.categories.get(entry[4])
+        return state is not None and state['versions'].get(entry[5]) == entry[3]
@@ -0,0 +1,247 @@
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+Rows = Union[torch.Tensor, np.ndarray, List[float]]
+
+
+class ReplayMemory:
+    """Mémoire d'expérience en anneau, préallouée et en colonnes
+
+    Un tenseur float32 contigu (capacité x features) et un tenseur des labels
+    (capacité x labels), remplis par un curseur d'écriture : la plus ancienne ligne
+    est écrasée une fois la capacité atteinte. Empreinte mémoire fixe dès la création ;
+    tirage d'un batch en O(batch) quelle que soit la taille de la mémoire.
+    """
+
+    def __init__(self, capacity: int, feature_names: List[str], label_names: Optional[List[str]] = None,
+                 device: Union[str, torch.device] = 'cpu', seed: Optional[int] = None):
+        self.capacity = capacity
+        self.feature_names = list(feature_names)
+        self.label_names = list(label_names or [])
+        self.device = torch.device(device)
+        self.features = torch.zeros(capacity, len(self.feature_names), device=self.device)
+        self.labels = torch.zeros(capacity, len(self.label_names), device=self.device)
+        self.cursor = 0
+        self.size = 0
+        # Lignes acceptées depuis la création (y compris celles déjà écrasées)
+        self.inserted = 0
+        self.generator = torch.Generator(device=self.device)
+        if seed is not None:
+            self.generator.manual_seed(seed)
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        return (self.features.element_size() * self.features.nelement()
+                + self.labels.element_size() * self.labels.nelement())
+
+    def add(self, features: Rows, labels: Optional[Rows] = None) -> bool:
+        """Ajoute une ligne ; refusée (False) si sa forme est fausse ou ses valeurs non finies"""
+        return self.extend(_rows(features, 1), None if labels is None else _rows(labels, 1)) == 1
+
+    def extend(self, features: Rows, labels: Optional[Rows] = None) -> int:
+        """Ajoute des lignes (N x features) ; rend le nombre de lignes valides écrites"""
+        features = _rows(features, 2).to(self.device, torch.float32)
+        if labels is None:
+            labels = torch.zeros(len(features), len(self.label_names), device=self.device)
+        labels = _rows(labels, 2).to(self.device, torch.float32)
+        if features.shape[1:] != self.features.shape[1:] or labels.shape != (len(features), len(self.label_names)):
+            return 0
+        valid = torch.isfinite(features).all(dim=1) & torch.isfinite(labels).all(dim=1)
+        if not bool(valid.all()):
+            features, labels = features[valid], labels[valid]
+        count = len(features)
+        if count > self.capacity:
+            # Seules les capacity dernières lignes survivraient à l'écriture
+            features, labels = features[-self.capacity:], labels[-self.capacity:]
+        written = len(features)
+        positions = (self.cursor + torch.arange(written, device=self.device)) % self.capacity
+        self._write(positions, features, labels)
+        self.cursor = (self.cursor + written) % self.capacity
+        self.size = min(self.size + written, self.capacity)
+        self.inserted += count
+        return count
+
+    def sample_indices(self, batch_size: int) -> torch.Tensor:
+        """Positions tirées uniformément (avec remise) parmi les lignes présentes"""
+        if not self.size:
+            raise ValueError("La mémoire est vide")
+        return torch.randint(self.size, (batch_size,), generator=self.generator, device=self.device)
+
+    def sample(self, batch_size: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Batch (features, labels) tiré uniformément"""
+        indices = self.sample_indices(batch_size)
+        return self.features[indices], self.labels[indices]
+
+    def sample_with_weights(self, batch_size: int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Batch (features, labels, positions, poids d'importance) ; poids unitaires en tirage uniforme"""
+        indices = self.sample_indices(batch_size)
+        return self.features[indices], self.labels[indices], indices, self.importance_weights(indices)
+
+    def importance_weights(self, indices: torch.Tensor) -> torch.Tensor:
+        return torch.ones(len(indices), device=self.device)
+
+    def update_priorities(self, indices: torch.Tensor, errors: torch.Tensor):
+        """Sans objet en tirage uniforme (voir PrioritizedReplayMemory)"""
+
+    def recent(self, count: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Les count dernières lignes écrites ; des vues (sans copie) si elles ne chevauchent pas la fin de l'anneau"""
+        count = min(count, self.size)
+        start = self.cursor - count
+        if start >= 0:
+            return self.features[start:self.cursor], self.labels[start:self.cursor]
+        indices = torch.arange(start, self.cursor, device=self.device) % self.capacity
+        return self.features[indices], self.labels[indices]
+
+    def clear(self):
+        self.cursor = self.size = self.inserted = 0
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Lignes présentes (dans l'ordre d'écriture) et compteurs, pour les sauvegardes"""
+        features, labels = self.recent(self.size)
+        return {
+            'feature_names': self.feature_names,
+            'label_names': self.label_names,
+            'features': features.cpu().clone(),
+            'labels': labels.cpu().clone(),
+            'inserted': self.inserted
+        }
+
+    def load_state_dict(self, state: Dict[str, Any]):
+        self.clear()
+        self.extend(state['features'], state['labels'])
+        self.inserted = state.get('inserted', self.size)
+
+    def _write(self, positions: torch.Tensor, features: torch.Tensor, labels: torch.Tensor):
+        self.features[positions] = features
+        self.labels[positions] = labels
+
+
+class SumTree:
+    """Arbre binaire complet des sommes de priorités, stocké dans un tableau
+
+    Les feuilles (capacité arrondie à la puissance de 2 supérieure) portent les
+    priorités, chaque nœud la somme de ses deux enfants. Mise à jour et tirage
+    proportionnel en O(log n), vectorisés sur un lot de positions ou de valeurs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.leaves = 1 << max(capacity - 1, 0).bit_length()
+        self.tree = np.zeros(2 * self.leaves)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def priorities(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[self.leaves + np.asarray(indices)]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """Priorités des positions indices, puis sommes des ancêtres, niveau par niveau"""
+        nodes = self.leaves + np.asarray(indices, dtype=np.int64)
+        if not len(nodes):
+            return
+        self.tree[nodes] = priorities
+        # Triés une fois : les parents restent triés, les doublons sont adjacents
+        nodes = np.unique(nodes // 2)
+        while len(nodes) and nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = nodes // 2
+            nodes = nodes[np.concatenate(([True], nodes[1:] != nodes[:-1]))]
+            if nodes[0] == 0:
+                break
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Positions des feuilles où tombent les sommes cumulées values (dans [0, total))"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while len(nodes) and nodes[0] < self.leaves:
+            left = self.tree[2 * nodes]
+            right = values >= left
+            values -= np.where(right, left, 0.0)
+            nodes = 2 * nodes + right
+        return np.minimum(nodes - self.leaves, self.capacity - 1)
+
+    def clear(self):
+        self.tree[:] = 0.0
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    """Mémoire d'expérience à tirage proportionnel aux priorités (somme dans un SumTree)
+
+    Priorité d'une ligne : (|erreur| + epsilon) ** alpha, la plus forte priorité connue
+    pour une ligne nouvelle (elle sera tirée au moins une fois). Le tirage est stratifié :
+    une valeur par tranche égale de la somme des priorités. Les poids d'importance
+    (N * P(i)) ** -beta, normalisés par leur maximum dans le batch, corrigent le biais
+    du tirage ; beta croît de beta_increment à chaque batch jusqu'à 1.
+    """
+
+    def __init__(self, capacity: int, feature_names: List[str], label_names: Optional[List[str]] = None,
+                 device: Union[str, torch.device] = 'cpu', seed: Optional[int] = None,
+                 alpha: float = 0.6, beta: float = 0.4, beta_increment: float = 1e-4, epsilon: float = 1e-3):
+        super().__init__(capacity, feature_names, label_names, device, seed)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.rng = np.random.default_rng(seed)
+
+    def sample_indices(self, batch_size: int) -> torch.Tensor:
+        if not self.size:
+            raise ValueError("La mémoire est vide")
+        segment = self.tree.total / batch_size
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+        # Arrondis : une valeur au bord de la somme ne doit pas tomber hors des lignes présentes
+        return torch.from_numpy(np.minimum(self.tree.find(values), self.size - 1)).to(self.device)
+
+    def sample_with_weights(self, batch_size: int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        batch = super().sample_with_weights(batch_size)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return batch
+
+    def importance_weights(self, indices: torch.Tensor) -> torch.Tensor:
+        probabilities = self.tree.priorities(indices.cpu().numpy()) / self.tree.total
+        weights = (self.size * probabilities) ** -self.beta
+        return torch.as_tensor(weights / weights.max(), dtype=torch.float32, device=self.device)
+
+    def update_priorities(self, indices: torch.Tensor, errors: torch.Tensor):
+        """Nouvelles priorités des lignes tirées, d'après leurs erreurs (pertes par exemple)"""
+        priorities = (np.abs(torch.as_tensor(errors).detach().float().cpu().numpy()) + self.epsilon) ** self.alpha
+        self.tree.update(indices.cpu().numpy(), priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def clear(self):
+        super().clear()
+        self.tree.clear()
+        self.max_priority = 1.0
+
+    def state_dict(self) -> Dict[str, Any]:
+        state = super().state_dict()
+        order = (self.cursor - self.size + np.arange(self.size)) % self.capacity
+        state['priorities'] = self.tree.priorities(order).copy()
+        return state
+
+    def load_state_dict(self, state: Dict[str, Any]):
+        super().load_state_dict(state)
+        if 'priorities' in state and len(state['priorities']) == self.size:
+            self.tree.update(np.arange(self.size), state['priorities'])
+            self.max_priority = float(max(state['priorities'].max(), self.max_priority))
+
+    def _write(self, positions: torch.Tensor, features: torch.Tensor, labels: torch.Tensor):
+        super()._write(positions, features, labels)
+        self.tree.update(positions.cpu().numpy(), np.full(len(positions), self.max_priority))
+
+
+def _rows(values: Rows, dimensions: int) -> torch.Tensor:
+    """Valeurs en tenseur float32 ; une ligne seule est mise au format (1 x n) si dimensions == 2"""
+    tensor = torch.as_tensor(values, dtype=torch.float32)
+    if dimensions == 2 and tensor.dim() == 1:
+        tensor = tensor.unsqueeze(0)
+    return tensor
@@ -0,0 +1,224 @@
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+import logging
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+# dtype entier déclaré -> dtype nullable utilisé quand le bloc contient des valeurs manquantes
+_NULLABLE_DTYPES = {
+    'int8': 'Int8',
+    'int16': 'Int16',
+    'int32': 'Int32',
+    'int64': 'Int64'
+}
+_TEXT_DTYPES = ('object', 'str', 'string')
+
+
+class SchemaCsvLoader:
+    """Chargement de CSV piloté par un schéma de types, par blocs
+
+    - seules les colonnes du schéma sont lues (usecols) ; chaque bloc est converti
+      vers les dtypes déclarés (category pour les chaînes peu variées, int32/float32
+      pour les métriques) avant de lire le suivant, les chaînes brutes ne vivent donc
+      que le temps d'un bloc
+    - les doublons sont éliminés dans chaque bloc puis entre blocs, en gardant la première
+      occurrence et son numéro de ligne comme drop_duplicates() : un hash 64 bits des lignes
+      désigne les candidats, dont les valeurs sont ensuite comparées (une collision de hash
+      ne supprime pas de ligne)
+    - les entiers avec valeurs manquantes passent en dtype nullable (Int32...) et les
+      valeurs non numériques deviennent manquantes (comme pd.to_numeric(errors='coerce')) ;
+      le remplacement des manquants est laissé à l'appelant
+    """
+
+    # Lignes par paquet de hash lors du dédoublonnage entre blocs
+    DEDUPE_BUCKET_ROWS = 1 << 21
+
+    def __init__(self, chunksize: int = 1_000_000):
+        self.logger = logging.getLogger('schema_loader')
+        self.chunksize = chunksize
+        self.last_stats: Dict[str, Any] = {}
+
+    def load(self, path: Union[str, Path], schema: Dict[str, str], dedupe: bool = True, **read_kwargs) -> pd.DataFrame:
+        """Charge un CSV selon le schéma (les colonnes absentes du fichier sont ignorées)"""
+        chunks: List[pd.DataFrame] = []
+        hashes: List[np.ndarray] = []
+        rows_read = 0
+        for chunk, rows, row_hashes in self.iter_chunks(path, schema, dedupe, **read_kwargs):
+            rows_read += rows
+            chunks.append(chunk)
+            hashes.append(row_hashes)
+
+        if not chunks:
+            return pd.DataFrame(columns=list(schema))
+
+        # Doublons entre blocs : première occurrence conservée
+        if dedupe:
+            for i, keep in enumerate(self.first_occurrences(hashes, lambda i, positions: chunks[i].iloc[positions])):
+                if keep is not None:
+                    chunks[i] = chunks[i][keep]
+        del hashes
+
+        data = concat_chunks(chunks)
+        del chunks
+
+        self.last_stats = {
+            'path': str(path),
+            'rows_read': rows_read,
+            'rows_kept': len(data),
+            'memory_bytes': int(data.memory_usage(deep=True).sum())
+        }
+        return data
+
+    def iter_chunks(self, path: Union[str, Path], schema: Dict[str, str], dedupe: bool = True,
+                    **read_kwargs) -> Iterator[Tuple[pd.DataFrame, int, Optional[np.ndarray]]]:
+        """Blocs typés du CSV : (bloc sans doublons internes, lignes lues, hash des lignes gardées)
+
+        Les doublons entre blocs restent à retirer avec first_occurrences().
+        """
+        # Les types sont appliqués après le parsing : le parseur C est bien plus
+        # rapide avec ses types par défaut qu'avec des dtypes nullable ou category
+        reader = pd.read_csv(
+            path,
+            usecols=lambda column: column in schema,
+            chunksize=self.chunksize,
+            **read_kwargs
+        )
+
+        for chunk in reader:
+            rows = len(chunk)
+            chunk = self._apply_schema(chunk, schema)
+
+            row_hashes = None
+            if dedupe:
+                row_hashes = self._row_hashes(chunk)
+                unique = ~self._duplicated_rows([chunk], [row_hashes])
+                if not unique.all():
+                    chunk = chunk[unique]
+                    row_hashes = row_hashes[unique]
+            yield chunk, rows, row_hashes
+
+    def first_occurrences(self, hashes: List[np.ndarray],
+                          rows: Optional[Callable[[int, np.ndarray], pd.DataFrame]] = None) -> List[Optional[np.ndarray]]:
+        """Masque des lignes à garder dans chaque bloc (None si le bloc est gardé entier)
+
+        Les hash sont répartis en paquets selon leurs bits de poids fort : deux lignes
+        identiques tombent dans le même paquet, et seul un paquet à la fois est indexé.
+        rows(bloc, positions) rend les lignes d'un bloc : les lignes de même hash sont
+        comparées valeur par valeur (sans rows, l'égalité des hash suffit).
+        """
+        if len(hashes) <= 1:
+            return [None] * len(hashes)
+        total = sum(len(row_hashes) for row_hashes in hashes)
+        bits = max(0, int(np.ceil(np.log2(max(total, 1) / self.DEDUPE_BUCKET_ROWS))))
+        buckets = [(row_hashes >> np.uint64(64 - bits)).astype(np.uint16) if bits else None for row_hashes in hashes]
+
+        keep = [np.ones(len(row_hashes), dtype=bool) for row_hashes in hashes]
+        for bucket in range(1 << bits):
+            positions = [np.flatnonzero(ids == bucket) if bits else np.arange(len(row_hashes))
+                         for ids, row_hashes in zip(buckets, hashes)]
+            values = np.concatenate([row_hashes[p] for row_hashes, p in zip(hashes, positions)])
+            if rows is None:
+                duplicated = pd.Series(values).duplicated().to_numpy()
+            else:
+                duplicated = self._verified_duplicates(values, positions, rows)
+            offset = 0
+            for chunk_keep, p in zip(keep, positions):
+                chunk_keep[p[duplicated[offset:offset + len(p)]]] = False
+                offset += len(p)
+        return [None if chunk_keep.all() else chunk_keep for chunk_keep in keep]
+
+    def _apply_schema(self, chunk: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+        """Convertit les colonnes d'un bloc vers leur dtype déclaré"""
+        columns = {column: self._cast(chunk[column], schema[column]) for column in chunk.columns}
+        return pd.DataFrame(columns, index=chunk.index, copy=False)
+
+    def _cast(self, values: pd.Series, dtype: str) -> pd.Series:
+        """Conversion d'une colonne (un entier non représentable reste en int64/float64)"""
+        if dtype == 'category':
+            return values.astype('category')
+        if dtype in _TEXT_DTYPES:
+            return values
+
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors='coerce')
+        if dtype not in _NULLABLE_DTYPES:
+            return values.astype(dtype)
+
+        limits = np.iinfo(dtype)
+        present = values.dropna()
+        if len(present) and (present.min() < limits.min or present.max() > limits.max):
+            return values
+        if pd.api.types.is_float_dtype(values) and not (present == np.floor(present)).all():
+            return values
+        return values.astype(_NULLABLE_DTYPES[dtype] if len(present) < len(values) else dtype)
+
+    def _verified_duplicates(self, values: np.ndarray, positions: List[np.ndarray],
+                             rows: Callable[[int, np.ndarray], pd.DataFrame]) -> np.ndarray:
+        """Doublons d'un paquet (dans l'ordre des blocs), les lignes de même hash étant comparées"""
+        candidates = pd.Series(values).duplicated(keep=False).to_numpy()
+        duplicated = np.zeros(len(values), dtype=bool)
+        if not candidates.any():
+            return duplicated
+
+        frames, hashes, offset = [], [], 0
+        for i, p in enumerate(positions):
+            selected = p[candidates[offset:offset + len(p)]]
+            if len(selected):
+                frames.append(rows(i, selected))
+                hashes.append(values[offset:offset + len(p)][candidates[offset:offset + len(p)]])
+            offset += len(p)
+        duplicated[candidates] = self._duplicated_rows(frames, hashes)
+        return duplicated
+
+    def _duplicated_rows(self, frames: List[pd.DataFrame], hashes: List[np.ndarray]) -> np.ndarray:
+        """duplicated() des lignes mises bout à bout : hash égal puis valeurs égales"""
+        row_hashes = np.concatenate(hashes)
+        candidates = pd.Series(row_hashes).duplicated(keep=False).to_numpy()
+        duplicated = np.zeros(len(row_hashes), dtype=bool)
+        if not candidates.any():
+            return duplicated
+
+        # Seules les lignes dont le hash se répète sont comparées
+        selected, offset = [], 0
+        for frame in frames:
+            keep = candidates[offset:offset + len(frame)]
+            if keep.any():
+                selected.append(self._canonical(frame[keep]).astype(object))
+            offset += len(frame)
+        values = pd.concat(selected, ignore_index=True)
+        values['__hash__'] = row_hashes[candidates]
+        duplicated[candidates] = values.duplicated().to_numpy()
+        return duplicated
+
+    def _canonical(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Valeurs indépendantes du dtype retenu pour le bloc (1, 1.0 et Int32(1) sont égaux)"""
+        canonical = {
+            column: (values.to_numpy(dtype='float64', na_value=np.nan)
+                     if pd.api.types.is_numeric_dtype(values) else values)
+            for column, values in chunk.items()
+        }
+        return pd.DataFrame(canonical, index=chunk.index, copy=False)
+
+    def _row_hashes(self, chunk: pd.DataFrame) -> np.ndarray:
+        """Hash des lignes (canoniques, voir _canonical)"""
+        return pd.util.hash_pandas_object(self._canonical(chunk), index=False).to_numpy()
+
+
+def concat_chunks(chunks: List[pd.DataFrame], ignore_index: bool = False) -> pd.DataFrame:
+    """Assemble des blocs colonne par colonne (les catégories sont unifiées et triées)"""
+    index = (pd.RangeIndex(sum(len(chunk) for chunk in chunks)) if ignore_index
+             else chunks[0].index.append([chunk.index for chunk in chunks[1:]]))
+    columns = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            try:
+                columns[column] = union_categoricals(parts, sort_categories=True)
+            except TypeError:
+                # Catégories non comparables (ex: texte et 0 de remplissage) : ordre d'apparition
+                columns[column] = union_categoricals(parts)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True).array
+    return pd.DataFrame(columns, index=index, copy=False)
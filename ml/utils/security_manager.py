@@ -7,6 +7,9 @@ import hashlib
 import json
 from pathlib import Path
 
+class SecurityException(Exception):
+    """Exécution interrompue par le SecurityManager (conditions ou sortie jugées dangereuses)"""
+
 class SecurityManager:
     def __init__(self):
         self.logger = logging.getLogger('security_manager')
@@ -0,0 +1,236 @@
+from typing import Dict, Any, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+import torch
+
+# Observations d'un post utilisées par les modèles de tendance (input_size=3)
+SEQUENCE_FEATURES = ('engagement_rate', 'likes', 'comments')
+
+
+class SequenceFeatureStore:
+    """Dernières observations de chaque compte, prêtes à servir d'entrée aux modèles
+
+    Chaque compte occupe une ligne de tableaux float32 préalloués (comptes x longueur x
+    features) utilisés comme tampons circulaires :
+    - ajouter un post plus récent que les autres écrit une seule case, en O(1)
+    - un post plus ancien que le dernier est inséré à sa place, un post déjà vu
+      (même horodatage) remplace son observation ; dans les deux cas O(sequence_length)
+    - les séquences sont rendues dans l'ordre chronologique, complétées à gauche par
+      des zéros tant que le compte a moins de sequence_length posts (voir lengths())
+    """
+
+    def __init__(self, sequence_length: int = 30, features: Sequence[str] = SEQUENCE_FEATURES,
+                 initial_capacity: int = 64):
+        self.logger = logging.getLogger('sequence_store')
+        self.sequence_length = sequence_length
+        self.features = tuple(features)
+        # Ligne 0 : toujours vide, lue pour le remplissage des séquences incomplètes
+        self._slots: Dict[Hashable, int] = {}
+        self._values = np.zeros((initial_capacity, sequence_length, len(self.features)), dtype=np.float32)
+        # Horodatages en secondes depuis l'epoch (float64 : précision à la microseconde)
+        self._timestamps = np.zeros((initial_capacity, sequence_length), dtype=np.float64)
+        # Prochaine case écrite (= plus ancienne observation une fois le tampon plein) et remplissage
+        self._heads = np.zeros(initial_capacity, dtype=np.int64)
+        self._counts = np.zeros(initial_capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, account: Hashable) -> bool:
+        return account in self._slots
+
+    @property
+    def accounts(self) -> List[Hashable]:
+        return list(self._slots)
+
+    def append(self, account: Hashable, observation: Mapping[str, Any], timestamp: Any) -> None:
+        """Ajoute l'observation d'un post (features manquantes à 0)"""
+        values = np.array([_number(observation.get(feature)) for feature in self.features], dtype=np.float32)
+        self._append_values(self._slot(account), values, seconds(timestamp))
+
+    def extend(self, account: Hashable, posts: Any, only_new: bool = False) -> int:
+        """Ajoute plusieurs posts : liste de dicts ou dict de colonnes, avec une clé 'timestamp'
+
+        Avec only_new, les posts datés au plus tard du dernier post du compte (déjà vus,
+        par exemple renvoyés par le spider) sont ignorés sans toucher à la séquence.
+        Retourne le nombre de posts ajoutés.
+        """
+        columns = _as_columns(posts)
+        if 'timestamp' not in columns:
+            raise KeyError('timestamp')
+        timestamps = seconds_array(columns['timestamp'])
+        keep = timestamps > self.latest(account) if only_new else np.ones(len(timestamps), dtype=bool)
+        timestamps = timestamps[keep]
+        values = np.zeros((len(timestamps), len(self.features)), dtype=np.float32)
+        for j, feature in enumerate(self.features):
+            if feature in columns:
+                numbers = pd.to_numeric(pd.Series(columns[feature], dtype=object), errors='coerce')
+                values[:, j] = numbers.fillna(0).to_numpy(dtype=np.float64)[keep]
+
+        slot = self._slot(account)
+        # Dans l'ordre chronologique, tous les ajouts passent par l'écriture O(1)
+        for i in np.argsort(timestamps, kind='stable'):
+            self._append_values(slot, values[i], timestamps[i])
+        return len(timestamps)
+
+    def latest(self, account: Hashable) -> float:
+        """Horodatage (secondes) du dernier post du compte, -inf s'il n'a aucune observation"""
+        slot = self._slots.get(account)
+        if slot is None or not self._counts[slot]:
+            return -np.inf
+        return float(self._timestamps[slot, (self._heads[slot] - 1) % self.sequence_length])
+
+    def sequence(self, account: Hashable) -> np.ndarray:
+        """Séquence (sequence_length x features) d'un compte, ordre chronologique"""
+        return self.batch([account])[0]
+
+    def batch(self, accounts: Iterable[Hashable]) -> np.ndarray:
+        """Séquences de plusieurs comptes (comptes x sequence_length x features)"""
+        slots, columns = self._ordered(accounts)
+        return self._values[slots, columns]
+
+    def timestamps(self, accounts: Iterable[Hashable]) -> np.ndarray:
+        """Horodatages (secondes) alignés sur batch(), 0 pour le remplissage"""
+        slots, columns = self._ordered(accounts)
+        return self._timestamps[slots, columns]
+
+    def lengths(self, accounts: Iterable[Hashable]) -> np.ndarray:
+        """Nombre d'observations réelles de chaque séquence (les dernières positions)"""
+        return self._counts[[self._slots[account] for account in accounts]].copy()
+
+    def tensor(self, accounts: Iterable[Hashable], device: Optional[torch.device] = None) -> torch.Tensor:
+        """Entrée du modèle (comptes x sequence_length x features), sans copie supplémentaire sur CPU"""
+        batch = torch.from_numpy(self.batch(accounts))
+        return batch if device is None else batch.to(device, non_blocking=True)
+
+    def _ordered(self, accounts: Iterable[Hashable]) -> Tuple[np.ndarray, np.ndarray]:
+        """Indices (slot, case) qui remettent les tampons dans l'ordre chronologique"""
+        slots = np.array([self._slots[account] for account in accounts], dtype=np.int64)
+        length = self.sequence_length
+        # Position p (0 = plus ancienne) dans la case (head + p) % length : les
+        # length - count premières positions sont du remplissage, lu dans la ligne 0
+        columns = (self._heads[slots, None] + np.arange(length)) % length
+        padding = np.arange(length) < (length - self._counts[slots])[:, None]
+        rows = np.where(padding, 0, slots[:, None])
+        return rows, columns
+
+    def _slot(self, account: Hashable) -> int:
+        slot = self._slots.get(account)
+        if slot is None:
+            slot = self._slots[account] = self._new_slot()
+        return slot
+
+    def _new_slot(self) -> int:
+        slot = len(self._slots) + 1
+        if slot == len(self._values):
+            # Capacité doublée : coût amorti O(1) par compte
+            capacity = 2 * len(self._values)
+            self._values = _grow(self._values, capacity)
+            self._timestamps = _grow(self._timestamps, capacity)
+            self._heads = _grow(self._heads, capacity)
+            self._counts = _grow(self._counts, capacity)
+        return slot
+
+    def _append_values(self, slot: int, values: np.ndarray, timestamp: float):
+        length = self.sequence_length
+        head, count = self._heads[slot], self._counts[slot]
+        latest = self._timestamps[slot, (head - 1) % length] if count else -np.inf
+
+        if timestamp > latest:
+            # Cas courant : post le plus récent, une seule case écrite
+            self._values[slot, head] = values
+            self._timestamps[slot, head] = timestamp
+            self._heads[slot] = (head + 1) % length
+            self._counts[slot] = min(count + 1, length)
+            return
+
+        # Post déjà vu ou plus ancien : séquence remise à plat, modifiée puis réécrite
+        order = (head - count + np.arange(count)) % length
+        stored_times = self._timestamps[slot, order]
+        stored_values = self._values[slot, order]
+        position = np.searchsorted(stored_times, timestamp)
+        if position < count and stored_times[position] == timestamp:
+            self._values[slot, order[position]] = values
+            return
+        if count == length and position == 0:
+            # Plus ancien que toute la séquence pleine : hors fenêtre
+            return
+
+        times = np.insert(stored_times, position, timestamp)[-length:]
+        rows = np.insert(stored_values, position, values, axis=0)[-length:]
+        self._timestamps[slot, :len(times)] = times
+        self._values[slot, :len(rows)] = rows
+        self._heads[slot] = len(times) % length
+        self._counts[slot] = len(times)
+
+
+def sequence_trends(values: np.ndarray, timestamps: np.ndarray, lengths: np.ndarray,
+                    window_days: Optional[float] = None, feature: int = 0) -> Dict[str, np.ndarray]:
+    """Croissance moyenne et volatilité d'une feature sur chaque séquence d'un batch
+
+    Mêmes définitions que pct_change().mean() et std() / mean() de pandas, calculées sur
+    les observations réelles (et, avec window_days, sur les window_days derniers jours).
+    """
+    series = values[:, :, feature].astype(np.float64)
+    length = series.shape[1]
+    valid = np.arange(length) >= (length - lengths)[:, None]
+    if window_days is not None:
+        # Comme DataFrame.last(f"{window_days}D") : strictement après dernier - window_days
+        latest = timestamps[:, -1:]
+        valid &= timestamps > latest - window_days * 86400.0
+
+    present = np.where(valid, series, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        changes = present[:, 1:] / present[:, :-1] - 1.0
+        changes_valid = ~np.isnan(changes)
+        growth = np.where(changes_valid, changes, 0.0).sum(axis=1) / changes_valid.sum(axis=1)
+        n = valid.sum(axis=1)
+        mean = np.where(valid, series, 0.0).sum(axis=1) / n
+        variance = np.where(valid, (series - mean[:, None]) ** 2, 0.0).sum(axis=1) / (n - 1)
+        volatility = np.sqrt(variance) / mean
+    return {'engagement_growth': growth, 'volatility': volatility, 'observations': n}
+
+
+def _as_columns(posts: Any) -> Dict[str, Any]:
+    """Dict de colonnes à partir d'une liste de dicts, d'un dict de colonnes ou d'un DataFrame"""
+    if isinstance(posts, pd.DataFrame):
+        return {column: posts[column].to_numpy() for column in posts.columns}
+    if isinstance(posts, Mapping):
+        return {key: value if isinstance(value, (list, tuple, np.ndarray, pd.Series)) else [value]
+                for key, value in posts.items()}
+    keys = {key for post in posts for key in post}
+    return {key: [post.get(key) for post in posts] for key in keys}
+
+
+def seconds(timestamp: Any) -> float:
+    """Horodatage (datetime, texte ISO, Timestamp ou nombre de secondes) en secondes"""
+    if isinstance(timestamp, (int, float, np.integer, np.floating)):
+        return float(timestamp)
+    return pd.Timestamp(timestamp).timestamp()
+
+
+def seconds_array(timestamps: Any) -> np.ndarray:
+    """Horodatages (datetimes, textes ISO ou nombres de secondes) en secondes float64"""
+    values = np.asarray(timestamps)
+    if values.dtype.kind in 'iuf':
+        return values.astype(np.float64)
+    # Horodatages sans fuseau lus comme UTC, comme Timestamp.timestamp()
+    times = pd.to_datetime(pd.Series(values, dtype=object), utc=True)
+    return ((times - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)).to_numpy(dtype=np.float64)
+
+
+def _number(value: Any) -> float:
+    """Valeur numérique d'une feature (0 si absente ou non numérique)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if np.isnan(number) else number
+
+
+def _grow(array: np.ndarray, capacity: int) -> np.ndarray:
+    grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
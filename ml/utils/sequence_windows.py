@@ -0,0 +1,98 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from torch.utils.data import DataLoader, Dataset
+
+
+def window_starts(length: int, sequence_length: int, horizon: int = 1,
+                  groups: Optional[np.ndarray] = None) -> np.ndarray:
+    """Débuts des fenêtres (sequence_length lignes puis la cible horizon lignes plus loin)
+
+    Avec groups (un identifiant par ligne, lignes d'un même groupe contiguës), les
+    fenêtres qui mélangeraient deux groupes sont exclues.
+    """
+    count = length - sequence_length - horizon + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.arange(count, dtype=np.int64)
+    if groups is None:
+        return starts
+    groups = np.asarray(groups)
+    # Groupes contigus : même groupe au début et à la cible, donc sur toute la fenêtre
+    return starts[groups[:count] == groups[sequence_length + horizon - 1:]]
+
+
+class SequenceWindows(Dataset):
+    """Fenêtres glissantes (sequence_length x features) d'une série et leurs cibles
+
+    Les fenêtres sont une vue à pas (sliding_window_view) des données : aucune copie
+    tant qu'on ne les lit pas. Un batch est rassemblé en une seule indexation numpy
+    (__getitems__), utilisé directement par DataLoader via loader(). Avec times (un
+    horodatage par ligne), target_times() donne l'horodatage de la cible de chaque fenêtre.
+    """
+
+    def __init__(self, data: Any, sequence_length: int, target_column: int = 0, horizon: int = 1,
+                 groups: Optional[Sequence[Any]] = None, dtype: np.dtype = np.float32,
+                 times: Optional[Sequence[Any]] = None):
+        data = np.asarray(data, dtype=dtype)
+        if data.ndim == 1:
+            data = data[:, None]
+        times = None if times is None else np.asarray(times)
+        if groups is not None:
+            groups = np.asarray(groups)
+            if len(groups) > 1 and np.any(groups[1:] != groups[:-1]):
+                # Lignes regroupées par compte (ordre conservé dans chaque compte)
+                order = np.argsort(groups, kind='stable')
+                data, groups = data[order], groups[order]
+                times = None if times is None else times[order]
+        self.data = np.ascontiguousarray(data)
+        self.times = times
+        self.sequence_length = sequence_length
+        self.horizon = horizon
+        self.starts = window_starts(len(self.data), sequence_length, horizon, groups)
+        # (lignes - sequence_length + 1) x sequence_length x features, sans copie
+        if len(self.data) >= sequence_length:
+            self.windows = sliding_window_view(self.data, sequence_length, axis=0).transpose(0, 2, 1)
+        else:
+            self.windows = np.zeros((0, sequence_length, self.data.shape[1]), dtype=self.data.dtype)
+        self.targets = self.data[:, target_column]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        features, targets = self.__getitems__([index])
+        return features[0], targets[0]
+
+    def __getitems__(self, indices: List[int]) -> Tuple[torch.Tensor, torch.Tensor]:
+        starts = self.starts[np.asarray(indices, dtype=np.int64)]
+        features = self.windows[starts]
+        targets = self.targets[starts + self.sequence_length + self.horizon - 1]
+        return torch.from_numpy(features), torch.from_numpy(np.ascontiguousarray(targets))
+
+    def target_times(self) -> np.ndarray:
+        """Horodatage de la cible de chaque fenêtre (times requis)"""
+        if self.times is None:
+            raise ValueError("SequenceWindows créé sans horodatages (times)")
+        return self.times[self.starts + self.sequence_length + self.horizon - 1]
+
+    def tensors(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Toutes les fenêtres et cibles en tenseurs (une copie vectorisée, pour TensorDataset)"""
+        return self.__getitems__(np.arange(len(self)))
+
+    def loader(self, batch_size: int = 64, shuffle: bool = False, **kwargs) -> DataLoader:
+        """DataLoader dont chaque batch est rassemblé en une indexation (pas de collate par élément)"""
+        return DataLoader(self, batch_size=batch_size, shuffle=shuffle, collate_fn=_batch, **kwargs)
+
+
+def sequence_tensors(data: Any, sequence_length: int, target_column: int = 0, horizon: int = 1,
+                     groups: Optional[Sequence[Any]] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Fenêtres (N x sequence_length x features) et cibles (N) en float32"""
+    return SequenceWindows(data, sequence_length, target_column, horizon, groups).tensors()
+
+
+def _batch(batch: Tuple[torch.Tensor, torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Batch déjà rassemblé par __getitems__"""
+    return batch
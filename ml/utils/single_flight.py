@@ -0,0 +1,116 @@
+from typing import Dict, Any, Callable, Optional, Tuple, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+
+
+def request_fingerprint(request: Dict[str, Any], ignored_keys: Iterable[str] = ()) -> str:
+    """Computes a canonical fingerprint of a request (key order independent)"""
+    ignored = set(ignored_keys)
+    canonical = {k: v for k, v in request.items() if k not in ignored}
+    payload = json.dumps(canonical, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Deduplicates identical concurrent computations and shares their result
+
+    The first caller for a key runs the computation, concurrent callers with the
+    same key wait on it and receive the same result (each caller gets its own deep
+    copy, so mutating it cannot leak into other callers or into the cache).
+    Completed results can be kept for `result_ttl` seconds. Thread and asyncio callers share the same in-flight
+    table, so a coroutine can wait on a computation started by a thread and vice versa.
+    """
+
+    def __init__(self, result_ttl: float = 0.0, max_cached_results: int = 1024, max_workers: Optional[int] = None):
+        self.logger = logging.getLogger('single_flight')
+        self.result_ttl = result_ttl
+        self.max_cached_results = max_cached_results
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._results: Dict[str, Tuple[float, Any]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='single_flight')
+        self.stats = {
+            'executions': 0,
+            'shared': 0,
+            'cache_hits': 0
+        }
+
+    def do(self, key: str, fn: Callable[[], Any], cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Runs fn once per key for all concurrent thread callers"""
+        future, leader = self._acquire(key)
+        if leader:
+            self._run(key, future, fn, cache_if)
+        return copy.deepcopy(future.result())
+
+    async def do_async(self, key: str, fn: Callable[[], Any], cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Same as do() for asyncio callers, the computation runs off the event loop"""
+        future, leader = self._acquire(key)
+        if leader:
+            self._executor.submit(self._run, key, future, fn, cache_if)
+        return copy.deepcopy(await asyncio.wrap_future(future))
+
+    def close(self, wait: bool = True):
+        """Shuts down the worker threads used by do_async"""
+        self._executor.shutdown(wait=wait)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drops one cached result, or all of them"""
+        with self._lock:
+            if key is None:
+                self._results.clear()
+            else:
+                self._results.pop(key, None)
+
+    def _acquire(self, key: str) -> Tuple[Future, bool]:
+        """Returns the future to wait on and whether the caller must compute it"""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                expires_at, result = cached
+                if time.monotonic() < expires_at:
+                    self.stats['cache_hits'] += 1
+                    future = Future()
+                    future.set_result(result)
+                    return future, False
+                del self._results[key]
+
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats['shared'] += 1
+                return future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            self.stats['executions'] += 1
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable[[], Any], cache_if: Optional[Callable[[Any], bool]]):
+        """Executes the computation and publishes its outcome to every waiter"""
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if self.result_ttl > 0 and (cache_if is None or cache_if(result)):
+                if len(self._results) >= self.max_cached_results:
+                    self._evict_expired()
+                if len(self._results) < self.max_cached_results:
+                    self._results[key] = (time.monotonic() + self.result_ttl, result)
+        future.set_result(result)
+
+    def _evict_expired(self):
+        """Removes expired results (caller holds the lock)"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._results.items() if expires_at <= now]:
+            del self._results[key]
@@ -0,0 +1,280 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
+from pathlib import Path
+import copy
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from .lazy_frame import LazyFrame
+
+Frame = Union[pd.DataFrame, LazyFrame]
+
+
+class NormalizationTransform:
+    """Normalisation (x - moyenne) / (écart-type + eps) par colonne, sauvegardée avec le modèle
+
+    Les statistiques s'accumulent bloc par bloc (sommes en float64), sans charger la table.
+    """
+
+    EPSILON = 1e-8
+
+    def __init__(self, columns: List[str], mean: Optional[np.ndarray] = None, std: Optional[np.ndarray] = None):
+        self.columns = list(columns)
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.std = None if std is None else np.asarray(std, dtype=np.float64)
+        self._count = 0
+        self._sums = np.zeros(len(self.columns))
+        self._squares = np.zeros(len(self.columns))
+        self._shift: Optional[np.ndarray] = None
+
+    @classmethod
+    def fit(cls, chunks, columns: List[str]) -> 'NormalizationTransform':
+        transform = cls(columns)
+        for chunk in chunks:
+            transform.partial_fit(chunk)
+        return transform.finalize()
+
+    def partial_fit(self, chunk: pd.DataFrame):
+        values = chunk[self.columns].to_numpy(dtype=np.float64)
+        if not len(values):
+            return
+        if self._shift is None:
+            # Décalage par les premières valeurs : variance précise même pour de grandes moyennes
+            self._shift = values[0].copy()
+        centered = values - self._shift
+        self._count += len(values)
+        self._sums += centered.sum(axis=0)
+        self._squares += (centered ** 2).sum(axis=0)
+
+    def finalize(self) -> 'NormalizationTransform':
+        """Moyenne et écart-type (ddof=1, comme torch.std) des blocs vus"""
+        shift = self._shift if self._shift is not None else np.zeros(len(self.columns))
+        count = max(self._count, 1)
+        self.mean = shift + self._sums / count
+        variance = (self._squares - self._sums ** 2 / count) / max(self._count - 1, 1)
+        self.std = np.sqrt(np.maximum(variance, 0.0))
+        return self
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        """Valeurs (lignes x colonnes, dans l'ordre de columns) normalisées en float32"""
+        return ((values - self.mean) / (self.std + self.EPSILON)).astype(np.float32)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'columns': self.columns, 'mean': self.mean.tolist(), 'std': self.std.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'NormalizationTransform':
+        return cls(data['columns'], data['mean'], data['std'])
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'NormalizationTransform':
+        return cls.from_dict(json.loads(Path(path).read_text()))
+
+
+class _ChunkStream(IterableDataset):
+    """Blocs (features, cibles) normalisés d'une LazyFrame, répartis entre les workers"""
+
+    def __init__(self, frame: LazyFrame, normalization: NormalizationTransform, target: str,
+                 parts: List[int], limits: Dict[int, int], seed: int):
+        self.frame = frame
+        self.normalization = normalization
+        self.target = target
+        self.parts = parts
+        # Lignes gardées des parties dont la fin sert à la validation
+        self.limits = limits
+        self.seed = seed
+
+    def __iter__(self) -> Iterator[Tuple[torch.Tensor, torch.Tensor]]:
+        worker = get_worker_info()
+        parts = self.parts if worker is None else self.parts[worker.id::worker.num_workers]
+        rng = np.random.default_rng(self.seed + (0 if worker is None else worker.id))
+        for index in parts:
+            chunk = self.frame.parts[index]()
+            for function in self.frame.transforms:
+                chunk = function(chunk)
+            if index in self.limits:
+                chunk = chunk.iloc[:self.limits[index]]
+            if not len(chunk):
+                continue
+            features = self.normalization.transform(chunk[self.normalization.columns].to_numpy(dtype=np.float64))
+            targets = chunk[self.target].to_numpy(dtype=np.float32)
+            # Lignes mélangées dans le bloc (les blocs sont mélangés entre eux par époque)
+            order = rng.permutation(len(features))
+            yield torch.from_numpy(features[order]), torch.from_numpy(targets[order])
+
+
+class TabularTrainer:
+    """Entraînement d'un modèle sur des lignes (features numériques -> une cible)
+
+    - table en mémoire : convertie une seule fois, normalisée, placée une seule fois sur
+      le device (TensorDataset), batchs mélangés par des permutations sur le device
+    - LazyFrame (cache colonnaire, moteur arrow) : statistiques de normalisation en un
+      premier passage, puis blocs relus à chaque époque (mémoire bornée par un bloc par
+      worker), éventuellement lus et normalisés par plusieurs workers
+    - validation sur une tranche réservée, arrêt anticipé, durée de chaque époque
+    """
+
+    def __init__(self, model: nn.Module, target: str = 'engagement_rate', batch_size: int = 256,
+                 learning_rate: float = 1e-3, validation_split: float = 0.1, patience: int = 3,
+                 num_workers: int = 0, max_validation_rows: int = 100_000,
+                 device: Optional[torch.device] = None, seed: int = 0):
+        self.logger = logging.getLogger('tabular_training')
+        self.model = model
+        self.target = target
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.validation_split = validation_split
+        self.patience = patience
+        self.num_workers = num_workers
+        self.max_validation_rows = max_validation_rows
+        self.device = device or next(model.parameters()).device
+        self.seed = seed
+        self.criterion = nn.MSELoss()
+        self.normalization: Optional[NormalizationTransform] = None
+
+    def fit(self, data: Frame, epochs: int = 10, columns: Optional[List[str]] = None,
+            normalization: Optional[NormalizationTransform] = None) -> Dict[str, Any]:
+        """Entraîne le modèle ; columns : features (toutes les colonnes sauf la cible par défaut)"""
+        if isinstance(data, LazyFrame):
+            return self._fit_stream(data, epochs, columns, normalization)
+        return self._fit_frame(data, epochs, columns, normalization)
+
+    def _feature_columns(self, columns: List[str]) -> List[str]:
+        """Colonnes par défaut des features : toutes sauf la cible (pas de fuite du label)"""
+        return [column for column in columns if column != self.target]
+
+    def _fit_frame(self, data: pd.DataFrame, epochs: int, columns: Optional[List[str]],
+                   normalization: Optional[NormalizationTransform]) -> Dict[str, Any]:
+        columns = list(columns or self._feature_columns(data.columns))
+        self.normalization = normalization or NormalizationTransform.fit([data], columns)
+        features = torch.from_numpy(self.normalization.transform(data[columns].to_numpy(dtype=np.float64)))
+        targets = torch.from_numpy(data[self.target].to_numpy(dtype=np.float32)).reshape(-1, 1)
+
+        # Une seule copie vers le device ; la validation est la dernière tranche
+        features, targets = features.to(self.device), targets.to(self.device)
+        n_validation = int(len(features) * self.validation_split)
+        n_train = len(features) - n_validation
+        generator = torch.Generator(device='cpu').manual_seed(self.seed)
+
+        def batches():
+            order = torch.randperm(n_train, generator=generator).to(self.device)
+            for start in range(0, n_train, self.batch_size):
+                batch = order[start:start + self.batch_size]
+                yield features[batch], targets[batch]
+
+        validation = (features[n_train:], targets[n_train:]) if n_validation else None
+        return self._train(batches, validation, epochs)
+
+    def _fit_stream(self, frame: LazyFrame, epochs: int, columns: Optional[List[str]],
+                    normalization: Optional[NormalizationTransform]) -> Dict[str, Any]:
+        if columns is None:
+            columns = self._feature_columns(next(frame.iter_chunks(), pd.DataFrame()).columns)
+        self.normalization = normalization or NormalizationTransform.fit(frame.iter_chunks(), columns)
+
+        # Validation : la fin de la dernière partie (bornée), gardée en mémoire sur le device ;
+        # ces lignes sont ensuite retirées de la partie à chaque époque
+        validation, limits = None, {}
+        if self.validation_split and frame.parts:
+            last_index = len(frame.parts) - 1
+            last = LazyFrame([frame.parts[last_index]], transforms=frame.transforms).collect()
+            n_validation = min(int(len(last) * self.validation_split), self.max_validation_rows)
+            if n_validation:
+                held_out = last.iloc[len(last) - n_validation:]
+                validation = (
+                    torch.from_numpy(self.normalization.transform(held_out[columns].to_numpy(dtype=np.float64))).to(self.device),
+                    torch.from_numpy(held_out[self.target].to_numpy(dtype=np.float32)).reshape(-1, 1).to(self.device)
+                )
+                limits[last_index] = len(last) - n_validation
+            del last
+
+        rng = np.random.default_rng(self.seed)
+
+        def batches():
+            order = rng.permutation(len(frame.parts)).tolist()
+            stream = _ChunkStream(frame, self.normalization, self.target, order, limits,
+                                  int(rng.integers(1 << 31)))
+            loader = DataLoader(stream, batch_size=None, num_workers=self.num_workers,
+                                pin_memory=self.device.type == 'cuda')
+            for chunk_features, chunk_targets in loader:
+                chunk_features = chunk_features.to(self.device, non_blocking=True)
+                chunk_targets = chunk_targets.reshape(-1, 1).to(self.device, non_blocking=True)
+                for start in range(0, len(chunk_features), self.batch_size):
+                    yield (chunk_features[start:start + self.batch_size],
+                           chunk_targets[start:start + self.batch_size])
+
+        return self._train(batches, validation, epochs)
+
+    def _train(self, batches, validation: Optional[Tuple[torch.Tensor, torch.Tensor]],
+               epochs: int) -> Dict[str, Any]:
+        optimizer = torch.optim.Adam(self.model.parameters(), lr=self.learning_rate)
+        history = []
+        best_loss, best_state, stale = np.inf, None, 0
+        for epoch in range(epochs):
+            start = time.perf_counter()
+            nn.Module.train(self.model, True)
+            total_loss = torch.zeros((), device=self.device)
+            rows = 0
+            for batch_features, batch_targets in batches():
+                optimizer.zero_grad(set_to_none=True)
+                loss = self.criterion(self.model(batch_features), batch_targets)
+                loss.backward()
+                optimizer.step()
+                # Accumulé sur le device : pas de synchronisation à chaque batch
+                total_loss += loss.detach() * len(batch_features)
+                rows += len(batch_features)
+
+            train_loss = total_loss.item() / max(rows, 1)
+            validation_loss = self._evaluate(*validation) if validation is not None else None
+            duration = time.perf_counter() - start
+            history.append({
+                'epoch': epoch + 1,
+                'train_loss': train_loss,
+                'validation_loss': validation_loss,
+                'duration_s': duration,
+                'rows_per_s': rows / duration if duration > 0 else 0.0
+            })
+            self.logger.info(
+                f"Epoch {epoch + 1}/{epochs}, Loss moyenne: {train_loss:.4f}"
+                + (f", validation: {validation_loss:.4f}" if validation_loss is not None else "")
+                + f" ({duration:.1f} s, {history[-1]['rows_per_s']:.0f} lignes/s)"
+            )
+
+            if validation_loss is None:
+                continue
+            if validation_loss < best_loss:
+                best_loss, best_state, stale = validation_loss, copy.deepcopy(self.model.state_dict()), 0
+            else:
+                stale += 1
+                if stale >= self.patience:
+                    self.logger.info(f"Arrêt anticipé après {epoch + 1} époques")
+                    break
+
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        nn.Module.train(self.model, False)
+        return {
+            'history': history,
+            'best_validation_loss': None if best_state is None else best_loss,
+            'total_duration_s': sum(entry['duration_s'] for entry in history)
+        }
+
+    def _evaluate(self, features: torch.Tensor, targets: torch.Tensor) -> float:
+        nn.Module.train(self.model, False)
+        total = 0.0
+        with torch.no_grad():
+            for start in range(0, len(features), 8192):
+                outputs = self.model(features[start:start + 8192])
+                total += self.criterion(outputs, targets[start:start + 8192]).item() * len(outputs)
+        return total / max(len(features), 1)
+
@@ -0,0 +1,83 @@
+from typing import Any, Callable, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+import logging
+import threading
+
+from .single_flight import SingleFlight
+
+
+class VersionedArtifact:
+    """Résultat coûteux mémorisé pour une version des données
+
+    `get(version)` ne recalcule que si la version a changé ; les appels concurrents
+    pour la même version partagent un seul calcul. Avec `allow_stale=True`, la
+    dernière bonne valeur est rendue immédiatement (même d'une version précédente)
+    et le recalcul part en arrière-plan. Un résultat refusé par `is_valid` (erreur)
+    ne remplace jamais la dernière bonne valeur.
+    """
+
+    def __init__(self, compute: Callable[[], Any], is_valid: Optional[Callable[[Any], bool]] = None, name: str = 'artifact'):
+        self.logger = logging.getLogger('versioned_artifact')
+        self.compute = compute
+        self.is_valid = is_valid or (lambda value: True)
+        self.name = name
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}_refresh")
+        self.version = None
+        self.value = None
+        self.computed_at: Optional[datetime] = None
+        self.stats = {
+            'hits': 0,
+            'recomputes': 0,
+            'stale_reads': 0
+        }
+
+    def get(self, version: Any, allow_stale: bool = False) -> Any:
+        """Valeur pour `version`, ou la dernière bonne valeur si allow_stale et qu'elle existe"""
+        with self._lock:
+            if self.computed_at is not None and self.version == version:
+                self.stats['hits'] += 1
+                return self.value
+            if allow_stale and self.computed_at is not None:
+                self.stats['stale_reads'] += 1
+                stale = self.value
+            else:
+                stale = None
+
+        if stale is not None:
+            self.refresh_async(version)
+            return stale
+        return self._refresh(version)
+
+    def refresh_async(self, version: Any) -> Future:
+        """Recalcule la valeur de `version` en arrière-plan"""
+        return self._background.submit(self._refresh, version)
+
+    def invalidate(self):
+        """Oublie la version mémorisée (la dernière valeur reste lisible avec allow_stale)"""
+        with self._lock:
+            self.version = None
+
+    def _refresh(self, version: Any) -> Any:
+        """Calcule la valeur d'une version, un seul calcul par version à la fois"""
+        return self._flights.do(str(version), lambda: self._compute_and_store(version))
+
+    def _compute_and_store(self, version: Any) -> Any:
+        """Calcule et publie la valeur si elle est valide"""
+        with self._lock:
+            if self.computed_at is not None and self.version == version:
+                return self.value
+
+        self.stats['recomputes'] += 1
+        value = self.compute()
+        if not self.is_valid(value):
+            self.logger.warning(f"{self.name}: calcul invalide pour la version {version}, dernière valeur conservée")
+            return value
+
+        with self._lock:
+            self.version = version
+            self.value = value
+            self.computed_at = datetime.now()
+        return value
@@ -0,0 +1,136 @@
+from typing import Dict, Any, Iterable, Optional, Union
+
+import numpy as np
+
+from .sequence_store import seconds, seconds_array
+
+DAY_SECONDS = 86400.0
+
+
+class TimeWindowStats:
+    """Statistiques d'une série temporelle sur des fenêtres glissantes de n jours
+
+    La série est triée une seule fois à la construction, puis résumée par des sommes
+    cumulées (valeurs, carrés, variations d'un point au suivant). Les bornes d'une
+    fenêtre sont trouvées par recherche dichotomique : chaque fenêtre coûte O(log n),
+    quel que soit le nombre de fenêtres demandées pour la même série.
+
+    Mêmes définitions que pandas sur DataFrame.last(f"{jours}D") : mean(), std(),
+    pct_change().mean() ; les valeurs manquantes (NaN) sont ignorées.
+    """
+
+    def __init__(self, timestamps: Any, values: Any):
+        times = seconds_array(timestamps)
+        values = np.asarray(values, dtype=np.float64)
+        if len(times) != len(values):
+            raise ValueError("timestamps et values doivent avoir la même longueur")
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            times, values = times[order], values[order]
+        self.times = times
+        self.values = values
+
+        valid = ~np.isnan(values)
+        self._valid_positions = np.flatnonzero(valid)
+        # Valeurs centrées : les sommes de carrés restent précises pour la variance
+        self._reference = float(values[valid].mean()) if valid.any() else 0.0
+        centered = np.where(valid, values - self._reference, 0.0)
+        self._counts = _prefix(valid)
+        self._sums = _prefix(centered)
+        self._squares = _prefix(centered ** 2)
+
+        # Variation i : du point i au point i + 1 (NaN si l'un des deux manque)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            changes = values[1:] / values[:-1] - 1.0
+        finite = np.isfinite(changes)
+        # Les variations infinies (division par 0) sont comptées à part pour
+        # ne pas propager inf - inf dans les sommes cumulées
+        self._changes = _prefix(np.where(finite, changes, 0.0))
+        self._change_counts = _prefix(~np.isnan(changes))
+        self._positive_infinite = _prefix(changes == np.inf)
+        self._negative_infinite = _prefix(changes == -np.inf)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def windows(self, days: Union[float, Iterable[float]], end: Any = None) -> Dict[str, np.ndarray]:
+        """Statistiques des fenêtres ]end - jours, end] (end : dernier horodatage par défaut)
+
+        Retourne un tableau par statistique, aligné sur days : mean, std, volatility
+        (std / mean), growth (moyenne des variations), variation (dernière valeur sur
+        première valeur - 1) et observations.
+        """
+        days = np.atleast_1d(np.asarray(days, dtype=np.float64))
+        if not len(self.times):
+            empty = np.full(len(days), np.nan)
+            return {'mean': empty, 'std': empty, 'volatility': empty, 'growth': empty,
+                    'variation': empty, 'observations': np.zeros(len(days), dtype=np.int64)}
+
+        end = self.times[-1] if end is None else seconds(end)
+        stop = np.full(len(days), np.searchsorted(self.times, end, side='right'))
+        start = np.minimum(np.searchsorted(self.times, end - days * DAY_SECONDS, side='right'), stop)
+
+        n = self._counts[stop] - self._counts[start]
+        sums = self._sums[stop] - self._sums[start]
+        squares = self._squares[stop] - self._squares[start]
+
+        # Variations entièrement dans la fenêtre : indices start .. stop - 2
+        last_change = np.maximum(stop - 1, start)
+        change_counts = self._change_counts[last_change] - self._change_counts[start]
+        changes = self._changes[last_change] - self._changes[start]
+        positive = self._positive_infinite[last_change] - self._positive_infinite[start]
+        negative = self._negative_infinite[last_change] - self._negative_infinite[start]
+
+        # Première et dernière valeur présentes dans la fenêtre
+        first = np.searchsorted(self._valid_positions, start)
+        last = np.searchsorted(self._valid_positions, stop) - 1
+        has_values = first <= last
+        positions = self._valid_positions if len(self._valid_positions) else np.zeros(1, dtype=np.int64)
+        first_values = self.values[positions[np.where(has_values, first, 0)]]
+        last_values = self.values[positions[np.where(has_values, last, 0)]]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.where(n > 0, self._reference + sums / n, np.nan)
+            variance = np.maximum(squares - sums ** 2 / n, 0.0) / (n - 1)
+            std = np.where(n > 1, np.sqrt(variance), np.nan)
+            growth = np.where(change_counts > 0, changes / change_counts, np.nan)
+            growth = np.where(positive > 0, np.where(negative > 0, np.nan, np.inf), growth)
+            growth = np.where((negative > 0) & (positive == 0), -np.inf, growth)
+            variation = np.where(has_values, last_values / first_values - 1.0, np.nan)
+            volatility = std / mean
+
+        return {
+            'mean': mean,
+            'std': std,
+            'volatility': volatility,
+            'growth': growth,
+            'variation': variation,
+            'observations': n
+        }
+
+    def window(self, days: float, end: Any = None) -> Dict[str, float]:
+        """Statistiques d'une seule fenêtre, en nombres Python"""
+        return _row(self.windows([days], end), 0)
+
+
+def window_statistics(timestamps: Any, values: Any, days: Iterable[float] = (7, 30, 90),
+                      end: Optional[Any] = None) -> Dict[float, Dict[str, float]]:
+    """Statistiques de plusieurs fenêtres d'une série, triée une seule fois"""
+    stats = TimeWindowStats(timestamps, values)
+    days = list(days)
+    result = stats.windows(days, end)
+    return {day: _row(result, i) for i, day in enumerate(days)}
+
+
+def _row(stats: Dict[str, np.ndarray], index: int) -> Dict[str, float]:
+    return {
+        name: int(values[index]) if name == 'observations' else float(values[index])
+        for name, values in stats.items()
+    }
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    """Sommes cumulées précédées de 0 : somme de [i, j[ = prefix[j] - prefix[i]"""
+    prefix = np.zeros(len(values) + 1, dtype=np.float64 if values.dtype.kind == 'f' else np.int64)
+    np.cumsum(values, out=prefix[1:])
+    return prefix
@@ -0,0 +1,115 @@
+"""TrendPredictor : contrat des prédictions de tendance par batchs de séquences, et analyze_sequences"""
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+import torch.nn as nn
+
+from ml.utils.batched_inference import TrendPredictor, analyze_sequences
+from ml.utils.inference_scheduler import InferenceScheduler
+from ml.utils.sequence_store import SequenceFeatureStore
+
+
+class TinyTrendModel(nn.Module):
+    """Engagement du post suivant à partir d'une séquence (batch x longueur x 3)"""
+
+    def __init__(self):
+        super().__init__()
+        self.gru = nn.GRU(3, 8, batch_first=True)
+        self.head = nn.Linear(8, 1)
+
+    def forward(self, x):
+        _, hidden = self.gru(x)
+        return self.head(hidden[-1]).squeeze(-1)
+
+
+@pytest.fixture
+def predictor():
+    torch.manual_seed(0)
+    return TrendPredictor(TinyTrendModel(), sequence_length=30)
+
+
+def posts(count, start='2024-01-01', seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        'timestamp': list(pd.date_range(start, periods=count, freq='h')),
+        'engagement_rate': rng.random(count).tolist(),
+        'likes': rng.integers(0, 500, count).tolist(),
+        'comments': rng.integers(0, 50, count).tolist()
+    }
+
+
+def test_predict_batch_returns_one_value_per_sequence(predictor):
+    sequences = torch.rand(5, 12, 3)
+    predictions = predictor.predict_batch(sequences)
+
+    assert set(predictions) == {'predicted_engagement', 'trend_direction',
+                                'direction_confidence', 'confidence_score'}
+    assert all(value.shape == (5,) for value in predictions.values())
+    assert set(predictions['trend_direction'].tolist()) <= {-1.0, 0.0, 1.0}
+    assert bool(((predictions['direction_confidence'] >= 0) & (predictions['direction_confidence'] < 1)).all())
+    # 12 observations sur 30 : confiance réduite en proportion
+    assert torch.allclose(predictions['confidence_score'], predictions['direction_confidence'] * 12 / 30)
+
+    # Chaque ligne du batch vaut l'appel sur la séquence seule
+    for i in range(len(sequences)):
+        single = predictor.predict_batch(sequences[i:i + 1])
+        for name, value in single.items():
+            assert value[0].item() == pytest.approx(predictions[name][i].item(), abs=1e-5)
+
+
+def test_predict_batch_rejects_unbatched_input(predictor):
+    with pytest.raises(ValueError):
+        predictor.predict_batch(torch.rand(12, 3))
+
+
+def test_only_new_skips_posts_already_stored():
+    store = SequenceFeatureStore(sequence_length=30)
+    first = posts(10)
+    assert store.extend('a', first, only_new=True) == 10
+    before = store.sequence('a').copy()
+
+    # Renvoi des 10 mêmes posts (valeurs modifiées) et de 3 nouveaux
+    resent = posts(13, seed=1)
+    assert store.extend('a', resent, only_new=True) == 3
+    after = store.sequence('a')
+    assert store.lengths(['a'])[0] == 13
+    np.testing.assert_array_equal(after[-13:-3], before[-10:])
+    assert store.latest('a') == pd.Timestamp(resent['timestamp'][-1], tz='UTC').timestamp()
+    assert store.latest('inconnu') == -np.inf
+
+
+def test_analyze_sequences_batches_accounts_like_single_calls(predictor):
+    store = SequenceFeatureStore(sequence_length=30)
+    # Longueurs variées, dont plusieurs comptes de même longueur et une séquence pleine
+    for i, count in enumerate([3, 7, 7, 30, 45, 12]):
+        store.extend(f"compte_{i}", posts(count, seed=i))
+    accounts = store.accounts + ['absent']
+
+    batched = analyze_sequences(predictor, store, accounts, batch_size=2)
+    assert set(batched) == set(store.accounts)
+    for account in store.accounts:
+        single = analyze_sequences(predictor, store, [account])[account]
+        for name, value in single['predictions'].items():
+            assert batched[account]['predictions'][name] == pytest.approx(value, abs=1e-5)
+        assert batched[account]['current_trends'] == pytest.approx(single['current_trends'])
+        assert batched[account]['analysis_window'] == single['analysis_window']
+
+
+def test_analyze_sequences_requires_the_batched_contract():
+    store = SequenceFeatureStore(sequence_length=30)
+    store.extend('a', posts(5))
+    with pytest.raises(TypeError):
+        analyze_sequences(lambda window: {'trend_direction': 1.0}, store, ['a'])
+
+
+def test_predict_scheduled_matches_predict_batch(predictor):
+    sequences = torch.rand(4, 9, 3)
+    with InferenceScheduler(max_latency_ms=50) as scheduler:
+        scheduled = predictor.predict_scheduled(sequences, scheduler)
+        assert scheduler.metrics()[predictor._served_id]['requests'] == 4
+        predictor.unserve(scheduler)
+        assert not scheduler.metrics()
+    expected = predictor.predict_batch(sequences)
+    for name, value in expected.items():
+        assert torch.allclose(scheduled[name], value, atol=1e-6)
@@ -0,0 +1,169 @@
+"""Parité des moteurs PandasBackend et ArrowBackend (chargement, nettoyage, fusion, cumuls)"""
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml.utils.dataframe_backend import ArrowBackend, DataFrameBackend, PandasBackend
+from ml.utils.indexed_join import IndexedJoin
+from ml.utils.lazy_frame import LazyFrame
+from ml.utils.multi_aggregation import MarketAggregates
+from ml.utils.schema_loader import SchemaCsvLoader
+
+pytest.importorskip('pyarrow')
+
+ACCOUNTS = {
+    'username': 'category',
+    'followers_count': 'int32',
+    'engagement_rate': 'float32'
+}
+REACH = {
+    'username': 'category',
+    'reach': 'int32'
+}
+POSTS = {
+    'username': 'category',
+    'likes': 'int32',
+    'hashtags': 'object',
+    'content_type': 'category',
+    'hour': 'int8'
+}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """CSV à plusieurs blocs, avec doublons, valeurs manquantes et comptes sans post"""
+    rng = np.random.default_rng(0)
+    users = [f"user_{i}" for i in range(40)]
+    accounts = pd.DataFrame({
+        'username': rng.choice(users, 120),
+        'followers_count': rng.integers(0, 10_000, 120),
+        'engagement_rate': rng.random(120).round(3)
+    })
+    accounts.loc[::17, 'engagement_rate'] = np.nan
+    reach = pd.DataFrame({'username': users[::2], 'reach': rng.integers(0, 5_000, 20)})
+    posts = pd.DataFrame({
+        'username': rng.choice(users[:30] + ['inconnu'], 300),
+        'likes': rng.integers(0, 500, 300),
+        'hashtags': rng.choice(['#a #b', '#c', ''], 300),
+        'content_type': rng.choice(['photo', 'video'], 300),
+        'hour': rng.integers(0, 24, 300)
+    })
+    posts = pd.concat([posts, posts.iloc[:25]], ignore_index=True)
+
+    paths = {}
+    for name, frame in [('accounts', accounts), ('reach', reach), ('posts', posts)]:
+        paths[name] = tmp_path / f"{name}.csv"
+        frame.to_csv(paths[name], index=False)
+    return paths
+
+
+@pytest.fixture
+def backends(tmp_path):
+    loader = SchemaCsvLoader(chunksize=64)
+    join = IndexedJoin('username')
+    return PandasBackend(loader, join), ArrowBackend(loader, join, tmp_path / 'spill')
+
+
+def clean(frame):
+    frame = frame.fillna({'engagement_rate': 0.0}) if 'engagement_rate' in frame else frame
+    return frame[frame.iloc[:, 1] >= 0]
+
+
+def rows(frame):
+    """Lignes comparables indépendamment de leur ordre et des catégories"""
+    frame = frame.astype(object).where(frame.notna(), None).astype(str)
+    return frame.sort_values(list(frame.columns)).reset_index(drop=True)
+
+
+def processed(backend, sources):
+    accounts = backend.clean(backend.load(sources['accounts'], ACCOUNTS), clean)
+    reach = backend.clean(backend.load(sources['reach'], REACH), clean)
+    posts = backend.clean(backend.load(sources['posts'], POSTS), clean)
+    return accounts, reach, posts
+
+
+def test_load_keeps_the_same_rows_in_the_same_order(backends, sources):
+    pandas_backend, arrow_backend = backends
+    for name, schema in [('accounts', ACCOUNTS), ('posts', POSTS)]:
+        expected = pandas_backend.collect(pandas_backend.load(sources[name], schema)).reset_index(drop=True)
+        actual = arrow_backend.collect(arrow_backend.load(sources[name], schema))
+        pd.testing.assert_frame_equal(actual.astype(object), expected.astype(object))
+
+
+def test_clean_and_collect_match(backends, sources):
+    pandas_backend, arrow_backend = backends
+    for expected, actual in zip(processed(pandas_backend, sources), processed(arrow_backend, sources)):
+        expected = pandas_backend.collect(expected, ['username', expected.columns[1]]).reset_index(drop=True)
+        actual = arrow_backend.collect(actual, ['username', expected.columns[1]])
+        pd.testing.assert_frame_equal(actual.astype(object), expected.astype(object))
+
+
+def test_merge_has_the_same_rows_and_columns(backends, sources):
+    pandas_backend, arrow_backend = backends
+    expected = pandas_backend.collect(pandas_backend.merge(list(processed(pandas_backend, sources)), [True, True, False]))
+    actual = arrow_backend.collect(arrow_backend.merge(list(processed(arrow_backend, sources)), [True, True, False]))
+
+    assert list(actual.columns) == list(expected.columns)
+    assert len(actual) == len(expected)
+    pd.testing.assert_frame_equal(rows(actual), rows(expected))
+
+
+def test_accumulate_gives_the_same_aggregates(backends, sources):
+    results = []
+    for backend in backends:
+        merged = backend.merge(list(processed(backend, sources)), [True, True, False])
+        aggregates = MarketAggregates(['hour', 'content_type'], ['likes', 'engagement_rate', 'reach'],
+                                      ['likes', 'engagement_rate'])
+        results.append(backend.accumulate(aggregates, merged))
+
+    expected, actual = results
+    assert actual.rows == expected.rows
+    assert actual.mean('likes') == pytest.approx(expected.mean('likes'))
+    for key in ['hour', 'content_type']:
+        expected_means = expected.group_means(key, 'engagement_rate')
+        actual_means = actual.group_means(key, 'engagement_rate')
+        assert actual_means.keys() == expected_means.keys()
+        assert list(actual_means.values()) == pytest.approx(list(expected_means.values()))
+    expected_corr = expected.corr(['likes', 'engagement_rate'])
+    actual_corr = actual.corr(['likes', 'engagement_rate'])
+    for column, row in expected_corr.items():
+        assert actual_corr[column] == pytest.approx(row)
+
+
+def test_reset_only_removes_its_own_spill_directories(tmp_path, sources):
+    loader = SchemaCsvLoader(chunksize=64)
+    first = ArrowBackend(loader, IndexedJoin('username'), tmp_path / 'spill')
+    second = ArrowBackend(loader, IndexedJoin('username'), tmp_path / 'spill')
+    kept = second.load(sources['posts'], POSTS)
+    first.load(sources['posts'], POSTS)
+    removed = list(first.run_dirs)
+
+    first.reset()
+
+    assert removed and not any(run_dir.exists() for run_dir in removed)
+    assert all(run_dir.exists() for run_dir in second.run_dirs)
+    assert len(second.collect(kept)) == sum(kept.rows)
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        DataFrameBackend(SchemaCsvLoader(), IndexedJoin('username'))
+
+
+def test_lazy_frame_reads_parts_in_parallel_and_in_order():
+    # Les deux premières lectures ne se terminent que si elles tournent en même temps
+    barrier = threading.Barrier(2, timeout=5)
+
+    def part(index):
+        if index < 2:
+            barrier.wait()
+        return pd.DataFrame({'part': [index] * 3})
+
+    frame = LazyFrame([lambda index=index: part(index) for index in range(6)], prefetch=2)
+    frame = frame.transform(lambda chunk: chunk.assign(double=chunk['part'] * 2))
+
+    assert frame.prefetch == 2
+    assert frame.collect()['part'].tolist() == [index for index in range(6) for _ in range(3)]
+    assert next(frame.iter_chunks(['double']))['double'].tolist() == [0, 0, 0]
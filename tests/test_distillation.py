@@ -0,0 +1,61 @@
+"""TrendModelRouter : sauvegarde de l'élève et du seuil, service par TrendPredictor"""
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+
+from ml.utils.batched_inference import TrendPredictor
+from ml.utils.distillation import TrendModelRouter, distill
+
+
+class Teacher(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.lstm = nn.LSTM(3, 16, batch_first=True)
+        self.head = nn.Linear(16, 1)
+
+    def forward(self, x):
+        _, (hidden, _) = self.lstm(x)
+        return self.head(hidden[-1]).squeeze(-1)
+
+
+class Student(nn.Module):
+    """Même interface que CompactTrendGRU : prédiction et log-variance"""
+
+    def __init__(self):
+        super().__init__()
+        self.gru = nn.GRU(3, 4, batch_first=True)
+        self.head = nn.Linear(4, 2)
+
+    def forward(self, x):
+        return self.predict_with_uncertainty(x)[0]
+
+    def predict_with_uncertainty(self, x):
+        _, hidden = self.gru(x)
+        out = self.head(hidden[-1])
+        return out[:, 0], out[:, 1]
+
+
+def test_router_round_trip_serves_the_same_predictions(tmp_path):
+    torch.manual_seed(0)
+    features = torch.randn(200, 10, 3)
+    teacher = Teacher()
+    student = Student()
+    distill(teacher, student, features[:160], epochs=2)
+    router = TrendModelRouter(student, teacher)
+    threshold = router.calibrate(features[160:], escalation_rate=0.25)
+
+    path = tmp_path / 'models' / 'trend_router.pt'
+    router.save(path)
+    loaded = TrendModelRouter.load(path, Student(), teacher)
+
+    assert loaded.threshold == pytest.approx(threshold)
+    expected, expected_escalated = router.predict(features)
+    actual, escalated = loaded.predict(features)
+    assert torch.equal(escalated, expected_escalated)
+    assert torch.allclose(actual, expected)
+    assert 0 < escalated.float().mean().item() < 1
+
+    # Servi comme modèle de tendance : une prédiction par séquence
+    predictions = TrendPredictor(loaded, sequence_length=10).predict_batch(features[:7])
+    assert np.allclose(predictions['predicted_engagement'].numpy(), expected[:7].numpy())
@@ -0,0 +1,50 @@
+"""InferenceScheduler : modèles à plusieurs entrées et retrait des modèles"""
+import pytest
+import torch
+import torch.nn as nn
+
+from ml.utils.inference_scheduler import InferenceScheduler
+
+
+class TwoInputs(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.text = nn.Embedding(50, 4)
+        self.head = nn.Linear(4 + 3, 1)
+
+    def forward(self, ids, features):
+        return self.head(torch.cat([self.text(ids).mean(dim=1), features], dim=1))
+
+
+@pytest.fixture
+def scheduler():
+    with InferenceScheduler(max_batch_size=8, max_latency_ms=200) as scheduler:
+        yield scheduler
+
+
+def test_tuple_examples_are_stacked_input_by_input(scheduler):
+    torch.manual_seed(0)
+    model = TwoInputs().eval()
+    scheduler.register('deux_entrees', model)
+    ids, features = torch.randint(0, 50, (8, 6)), torch.randn(8, 3)
+
+    futures = [scheduler.submit('deux_entrees', (ids[i], features[i])) for i in range(8)]
+    results = torch.stack([future.result(timeout=5) for future in futures])
+
+    with torch.inference_mode():
+        expected = model(ids, features)
+    assert torch.allclose(results, expected, atol=1e-6)
+    assert scheduler.metrics()['deux_entrees']['batch_sizes'] == {8: 1}
+
+
+def test_unregister_fails_pending_requests_and_forgets_the_model(scheduler):
+    scheduler.register('lent', lambda batch: batch.sum(dim=1), max_latency_ms=60_000)
+    pending = scheduler.submit('lent', torch.ones(3))
+
+    assert scheduler.unregister('lent')
+    with pytest.raises(KeyError):
+        pending.result(timeout=5)
+    with pytest.raises(KeyError):
+        scheduler.submit('lent', torch.ones(3))
+    assert 'lent' not in scheduler.metrics()
+    assert not scheduler.unregister('lent')
@@ -0,0 +1,123 @@
+"""LightweightLearner : replay prioritaire par modèle, entraîné contre les labels stockés"""
+import json
+
+import numpy as np
+import pytest
+import torch
+
+from ml.core import lightweight_learner
+from ml.core.lightweight_learner import LightweightLearner
+from ml.utils.quantization import quantize_model, save_quantized
+
+FEATURES = ['f0', 'f1', 'f2', 'f3', 'rare']
+
+
+class PassThroughSecurity:
+    def validate_input(self, data):
+        return data
+
+    def monitor_execution(self, func):
+        return func
+
+
+class NoBackup:
+    def create_backup(self, state, backup_type='auto'):
+        return True
+
+
+@pytest.fixture
+def learner(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(lightweight_learner, 'SecurityManager', PassThroughSecurity)
+    monkeypatch.setattr(lightweight_learner, 'BackupManager', NoBackup)
+    config = {
+        'memory_size': 4000,
+        'initial_batch_size': 32,
+        'learning_frequency': 10 ** 9,
+        'prioritized_replay': True,
+        'feature_configs': {name: {'default': 0.0, 'mean': 0.0, 'std': 1.0} for name in FEATURES},
+        'label_names': ['y'],
+        'model_configs': {
+            'engagement': {'input_size': 5, 'hidden_sizes': [16], 'output_size': 1},
+            'trends': {'input_size': 5, 'hidden_sizes': [16], 'output_size': 1}
+        },
+        'learning_rates': {'engagement': 1e-3, 'trends': 1e-3}
+    }
+    path = tmp_path / 'ml_config.json'
+    path.write_text(json.dumps(config))
+    torch.manual_seed(0)
+    return LightweightLearner(str(path))
+
+
+def samples(count, rare_share, seed=0):
+    """Cible linéaire ; les événements rares portent un marqueur et un fort décalage de la cible"""
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((count, 4))
+    rare = rng.random(count) < rare_share
+    y = x @ np.array([0.5, -0.3, 0.2, 0.1]) + np.where(rare, 6.0, 0.0)
+    rows = [dict(zip(FEATURES[:4], values), rare=float(flag) * 3, y=target)
+            for values, flag, target in zip(x.tolist(), rare, y.tolist())]
+    return rows, rare
+
+
+def test_rare_rows_get_up_weighted_in_their_model_tree(learner):
+    rows, rare = samples(2000, 0.02)
+    for row in rows:
+        learner._update_memory(learner._preprocess_data(row))
+
+    for _ in range(300):
+        metrics = learner._replay_step('engagement')
+    assert np.isfinite(metrics['loss'])
+
+    engagement = learner.memories['engagement'].tree.priorities(np.arange(len(rows)))
+    assert engagement[rare].mean() > 3 * engagement[~rare].mean()
+    # La perte d'un modèle ne déplace pas le tirage des autres
+    trends = learner.memories['trends'].tree.priorities(np.arange(len(rows)))
+    assert np.allclose(trends, trends[0])
+
+
+def test_learn_stores_labelled_samples_and_trains_each_model(learner, caplog):
+    learner.learning_frequency = 1
+    rows, _ = samples(40, 0.1)
+    results = [learner.learn(row) for row in rows]
+
+    assert results[-1]['status'] == 'success'
+    assert set(results[-1]['metrics']) == {'engagement', 'trends'}
+    assert learner.stats['training_iterations'] == 2 * (len(rows) - learner.batch_size + 1)
+
+    unlabelled = dict(rows[0])
+    del unlabelled['y']
+    learner.learn(unlabelled)
+    assert "Missing labels ['y']" in caplog.text
+    assert len(learner.memories['engagement']) == len(rows)
+
+
+def test_int8_models_follow_the_float_weights(learner, tmp_path):
+    model = learner.models['engagement']
+    save_quantized(quantize_model(model), tmp_path / 'engagement_int8.pt', model)
+    learner._load_quantized_models(str(tmp_path))
+    assert 'engagement' in learner.quantized_models
+
+    # Un entraînement retire l'int8, qui ne correspond plus aux poids servis
+    learner.learning_frequency = 1
+    rows, _ = samples(40, 0.1)
+    for row in rows:
+        learner.learn(row)
+    assert 'engagement' not in learner.quantized_models
+    served = learner.inference_models['engagement']
+    assert not any('quantized' in type(module).__module__ for module in served.modules())
+
+    # Le checkpoint int8 des anciens poids est refusé au rechargement
+    learner._load_quantized_models(str(tmp_path))
+    assert 'engagement' not in learner.quantized_models
+
+
+def test_close_removes_the_learner_models_from_the_scheduler(learner):
+    ids = [learner.scheduler_prefix + name for name in learner.models]
+    assert set(ids) <= set(learner.scheduler.metrics())
+
+    learner.close()
+
+    assert not set(ids) & set(learner.scheduler.metrics())
+    with pytest.raises(KeyError):
+        learner.predict('engagement', torch.zeros(5))